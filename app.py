@@ -1,14 +1,31 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
 from extensions import db, login_manager
 from models import User, Case
-from flask_login import login_user, login_required, logout_user, current_user
+from dates import parse_date
+from cache import TTLCache
+from pagination import keyset_paginate, case_count, invalidate_case_count, encode_cursor, decode_cursor
+from search import search_cases, ensure_search_index, like_escape
+from summary import get_summary
+from digest import start_digest_scheduler
+from audit import audit_log, case_history
+from row_cache import row_cache
+from changes import fetch_changes, decode_change_cursor, latest_cursor
+from broadcast import broker, ChangeRelay, BrokerFull, replay_events, event_stream, MAX_SUBSCRIBERS
+from metrics import metrics
+from exporter import export_statement, export_headers, iter_export_rows, stream_csv, stream_xlsx
+from deadlines import get_limits, deadline_column, STAGE_SOURCE_FIELDS, STAGE_LABELS
+from sqlalchemy import select, union_all, literal, func, tuple_
+from flask_login import UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
-from dateutil import parser
+from datetime import datetime, date, timedelta
 from sqlalchemy.pool import NullPool
+from sqlalchemy.engine import make_url
 from urllib.parse import quote_plus
-import re
 import os
+import json
+import hashlib
+import hmac
+import re
 
 # Load environment variables from .env file for local development
 from dotenv import load_dotenv
@@ -67,39 +84,138 @@ def get_database_url():
         "  2. SUPABASE_DB_PASSWORD and SUPABASE_PROJECT_REF\n"
     )
 
+def get_deployment_mode():
+    """
+    Detect how the app is running:
+      - 'serverless': Vercel (sets VERCEL=1) - every invocation may be a fresh process
+      - 'desktop': desktop.py / the .exe build - one long-running local process
+      - 'server': gunicorn (Procfile) or `python app.py` - long-running workers
+    DEPLOYMENT_MODE overrides the detection.
+    """
+    mode = os.environ.get('DEPLOYMENT_MODE', '').lower()
+    if mode in ('serverless', 'desktop', 'server'):
+        return mode
+    if os.environ.get('VERCEL'):
+        return 'serverless'
+    return 'server'
+
+def get_engine_options(database_url, mode):
+    """
+    SQLAlchemy engine options per deployment mode.
+    
+    Serverless uses NullPool as per Supabase best practices for the Transaction Mode Pooler:
+    connections must not outlive the invocation. Long-running processes keep a small
+    bounded QueuePool so requests reuse connections instead of paying TCP+TLS+auth each time.
+    """
+    if mode == 'serverless':
+        return {'poolclass': NullPool}  # Required for Supabase Transaction Mode Pooler
+    
+    if make_url(database_url).get_backend_name() == 'sqlite':
+        # Local file, no handshake to amortize; keep SQLAlchemy's default pool
+        return {}
+    
+    desktop = mode == 'desktop'
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 2 if desktop else 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 2 if desktop else 5)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        # Recycle before the Supabase pooler / NAT drops idle connections
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 300)),
+        # Detect connections dropped while idle (laptop sleep, network change)
+        'pool_pre_ping': True,
+    }
+
+def get_replica_url():
+    """Local SQLite replica for desktop offline mode (REPLICA_PATH overrides the location)"""
+    path = os.environ.get('REPLICA_PATH') or os.path.join(os.path.expanduser('~'), '.e-kejaksaan', 'replica.db')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return f"sqlite:///{os.path.abspath(path)}"
+
 # Database Configuration
-# Use NullPool for serverless/transaction mode as per Supabase best practices
-app.config['SQLALCHEMY_DATABASE_URI'] = get_database_url()
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'poolclass': NullPool,  # Required for Supabase Transaction Mode Pooler
-}
+DEPLOYMENT_MODE = get_deployment_mode()
+# Desktop offline mode: the app reads/writes a local SQLite replica and sync.py keeps it
+# in sync with the central database in the background. Disable with DESKTOP_OFFLINE=0.
+OFFLINE_REPLICA = DEPLOYMENT_MODE == 'desktop' and os.environ.get('DESKTOP_OFFLINE', '1') != '0'
+if OFFLINE_REPLICA:
+    app.config['REMOTE_DATABASE_URI'] = get_database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = get_replica_url()
+else:
+    app.config['SQLALCHEMY_DATABASE_URI'] = get_database_url()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_engine_options(app.config['SQLALCHEMY_DATABASE_URI'], DEPLOYMENT_MODE)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Total perkara untuk pagination: 'exact' (COUNT(*)) atau 'approximate' (estimasi planner PostgreSQL),
+# disimpan di cache selama CASE_COUNT_CACHE_TTL detik dan di-invalidate saat data ditambah/dihapus
+app.config['CASE_COUNT_MODE'] = os.environ.get('CASE_COUNT_MODE', 'exact')
+app.config['CASE_COUNT_CACHE_TTL'] = int(os.environ.get('CASE_COUNT_CACHE_TTL', 30))
+
+# Ringkasan per JPU (/summary): hasil GROUP BY di-cache beberapa detik, di-invalidate saat perkara ditulis
+app.config['SUMMARY_CACHE_TTL'] = int(os.environ.get('SUMMARY_CACHE_TTL', 60))
+
+# Cache fragmen HTML baris dashboard per (perkara, updated_at, hari); ROW_CACHE_URL=redis://... untuk berbagi antar worker
+app.config['ROW_CACHE_SIZE'] = int(os.environ.get('ROW_CACHE_SIZE', 5000))
+app.config['ROW_CACHE_URL'] = os.environ.get('ROW_CACHE_URL')
+
+# Push perubahan ke dashboard yang terbuka lewat SSE (/events, broadcast.py). Di serverless koneksi
+# tidak bisa dibiarkan terbuka; klien otomatis beralih ke polling /api/changes
+app.config['LIVE_UPDATES'] = os.environ.get('LIVE_UPDATES', '0' if DEPLOYMENT_MODE == 'serverless' else '1') != '0'
+# Satu stream SSE menahan satu thread worker sampai ditutup: batasi di bawah jumlah --threads gunicorn
+# supaya request biasa tetap dilayani. Jika penuh /events membalas 503 dan klien beralih ke polling
+app.config['LIVE_MAX_STREAMS'] = int(os.environ.get('LIVE_MAX_STREAMS', MAX_SUBSCRIBERS))
+broker.max_subscribers = app.config['LIVE_MAX_STREAMS']
+
+# Digest harian tenggat yang akan jatuh (digest.py): SMTP jika DIGEST_SMTP_HOST diisi, file jika DIGEST_DIR
+app.config['DIGEST_DAYS'] = int(os.environ.get('DIGEST_DAYS', 3))
+app.config['DIGEST_HOUR'] = int(os.environ.get('DIGEST_HOUR', 7))
+app.config['DIGEST_DIR'] = os.environ.get('DIGEST_DIR')
+app.config['DIGEST_SMTP_HOST'] = os.environ.get('DIGEST_SMTP_HOST')
+app.config['DIGEST_SMTP_PORT'] = int(os.environ.get('DIGEST_SMTP_PORT', 587))
+app.config['DIGEST_SMTP_USER'] = os.environ.get('DIGEST_SMTP_USER')
+app.config['DIGEST_SMTP_PASSWORD'] = os.environ.get('DIGEST_SMTP_PASSWORD')
+app.config['DIGEST_SMTP_STARTTLS'] = os.environ.get('DIGEST_SMTP_STARTTLS', '1') != '0'
+app.config['DIGEST_FROM'] = os.environ.get('DIGEST_FROM')
+app.config['DIGEST_TO'] = os.environ.get('DIGEST_TO')
+
+# Metrik Prometheus di /metrics (metrics.py), hanya dengan header Authorization: Bearer <METRICS_TOKEN>;
+# tanpa METRICS_TOKEN endpoint-nya 404 (metrik tetap dicatat)
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') != '0'
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
 db.init_app(app)
 login_manager.init_app(app)
+metrics.init_app(app)
+
+# Audit trail perubahan perkara: ditulis per batch oleh thread background; di serverless
+# tidak ada proses yang hidup terus, jadi buffer ditulis di akhir setiap request
+audit_log.init_app(app, background=DEPLOYMENT_MODE != 'serverless')
+row_cache.init_app(app)
+change_relay = ChangeRelay(app, broker)
+
+# Cache user yang login supaya setiap request @login_required tidak query tabel user.
+# Per worker; di-invalidate saat user diubah/dihapus (mis. ganti password) lewat ORM.
+app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 300))
+_user_cache = TTLCache(ttl=app.config['USER_CACHE_TTL'])
+# Replika (sync.py) mengosongkannya setelah pull mengubah/menghapus user lewat Core (tanpa event ORM)
+app.extensions['user_cache'] = _user_cache
+
+class SessionUser(UserMixin):
+    """Detached snapshot of a User for current_user, safe to share across requests"""
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    def fetch():
+        user = db.session.get(User, user_id)
+        return SessionUser(user.id, user.username) if user else None
+    return _user_cache.get_or_set(user_id, fetch)
 
-def parse_date(date_str):
-    """
-    Robust date parser using dateutil.
-    Handles YYYY-MM-DD (ISO) and DD-MM-YYYY formats.
-    """
-    if not date_str or not isinstance(date_str, str):
-        return None
-    
-    try:
-        # Check for ISO format YYYY-MM-DD via regex to avoid ambiguity
-        if isinstance(date_str, str) and re.match(r'^\d{4}-\d{2}-\d{2}$', date_str):
-            return parser.parse(date_str, yearfirst=True, dayfirst=False)
-            
-        # Fallback: parser is smart enough to handle most formats
-        # dayfirst=True ensures 01/02/2023 is treated as 1st Feb
-        return parser.parse(date_str, dayfirst=True)
-    except (ValueError, TypeError):
-        return None
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    _user_cache.invalidate(target.id)
 
 def is_date_overdue(date_obj, days_limit):
     if not date_obj:
@@ -121,28 +237,7 @@ def check_overdue(value, field_name, kategori_umur='Dewasa'):
     if not date_obj:
         return ""
     
-    # Logic untuk Dewasa (default)
-    limits_dewasa = {
-        'spdp': 25,             # Overdue jika: Hari Ini > (Tgl Input + 24 hari) - SPDP 25 hari kalender
-        'berkas_tahap_1': 6,    # Overdue jika: Hari Ini > (Tgl Input + 5 hari) - Berkas Tahap I 6 hari kalender  
-        'p18_p19': 10,          # Overdue jika: Hari Ini > (Tgl Input + 9 hari) - P-18/P-19 10 hari kalender
-        'p21': 12,              # Overdue jika: Hari Ini > (Tgl Input + 11 hari) - P-21 12 hari kalender
-        'tahap_2': 7            # Overdue jika: Hari Ini > (Tgl Input + 6 hari) - Tahap II 7 hari kalender
-    }
-    
-    # Logic untuk Anak
-    limits_anak = {
-        'spdp': 25,             # SPDP tetap 25 hari
-        'berkas_tahap_1': 3,    # Berkas Tahap I 3 hari kalender
-        'p18_p19': 7,           # P-18/P-19 7 hari kalender
-        'p21': 10,              # P-21 10 hari kalender
-        'tahap_2': 5            # Tahap II 5 hari kalender
-    }
-    
-    # Pilih limits berdasarkan kategori umur
-    limits = limits_anak if kategori_umur == 'Anak' else limits_dewasa
-    
-    limit = limits.get(field_name)
+    limit = get_limits(kategori_umur).get(field_name)
     if limit and is_date_overdue(date_obj, limit):
         return "overdue-cell"
     return ""
@@ -188,20 +283,40 @@ def dashboard():
         if page < 1:
             page = 1
         
-        # Query with pagination
+        # Cursor mode: keyset pagination on (created_at, id), cost independent of depth
+        if request.args.get('paging') == 'cursor':
+            pagination = keyset_paginate(
+                Case.query, Case, per_page,
+                after=request.args.get('after'),
+                before=request.args.get('before'),
+                start=request.args.get('start', 0, type=int)
+            )
+            return render_template('dashboard.html',
+                                 cases=pagination.items,
+                                 rows=row_cache.render(pagination.items),
+                                 pagination=pagination,
+                                 per_page=per_page,
+                                 paging='cursor')
+        
+        # Query with pagination; the total comes from the count cache instead of COUNT(*) per request
         pagination = Case.query.order_by(Case.created_at.desc()).paginate(
             page=page, 
             per_page=per_page, 
-            error_out=False
+            error_out=False,
+            count=False
         )
+        pagination.total = case_count(app.config['CASE_COUNT_MODE'], app.config['CASE_COUNT_CACHE_TTL'])
         
         return render_template('dashboard.html', 
                              cases=pagination.items,
+                             rows=row_cache.render(pagination.items),
                              pagination=pagination,
-                             per_page=per_page)
+                             per_page=per_page,
+                             paging='page')
     except Exception as e:
         # Log error for debugging
         print(f"Dashboard error: {str(e)}")
+        metrics.record_error()
         # Fallback to simple query without pagination
         cases = Case.query.order_by(Case.created_at.desc()).limit(10).all()
         # Create a simple pagination object
@@ -220,8 +335,10 @@ def dashboard():
         pagination = SimplePagination(cases)
         return render_template('dashboard.html', 
                              cases=cases,
+                             rows=row_cache.render(cases),
                              pagination=pagination,
-                             per_page=10)
+                             per_page=10,
+                             paging='page')
 
 @app.route('/add_case', methods=['POST'])
 @login_required
@@ -253,9 +370,76 @@ def add_case():
     )
     db.session.add(new_case)
     db.session.commit()
+    invalidate_case_count()
     flash('Data berhasil ditambahkan!')
     return redirect(url_for('dashboard'))
 
+def render_case_row(case, row_number=''):
+    """Render one dashboard <tr> (with its overdue classes) for partial refresh"""
+    return render_template('_case_row.html',
+                           case=case,
+                           cells=row_cache.render([case])[case.id],
+                           row_number=row_number)
+
+# Security: fields that inline editing may change
+# Allowed: Existing stages + New SPDP fields
+ALLOWED_FIELDS = [
+    'berkas_tahap_1', 'p18_p19', 'p21', 'tahap_2', 'limpah_pn', 'keterangan',
+    'spdp_tgl_terima', 'spdp_tgl_polisi', # Allow editing dates via modal
+    'nama_tersangka', 'umur_tersangka', 'kategori_umur', 'pasal', 'jpu' # Allow editing text fields
+]
+MAX_BATCH_EDITS = 200
+MAX_UMUR = 150
+KATEGORI_UMUR_CHOICES = ('Dewasa', 'Anak')
+
+def coerce_edit_value(field, value):
+    """
+    Convert an inline edit to what the column stores.
+    
+    Raises:
+        ValueError: with a message for the user if the value doesn't fit the column
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError('must be text')
+    text = str(value)
+    if field == 'umur_tersangka':
+        text = text.strip()
+        if not text:
+            return None
+        if not re.fullmatch(r'\d{1,3}', text) or int(text) > MAX_UMUR:
+            raise ValueError(f'must be a whole number between 0 and {MAX_UMUR}')
+        return int(text)
+    if field == 'kategori_umur':
+        text = text.strip()
+        if not text:
+            return None
+        for choice in KATEGORI_UMUR_CHOICES:
+            if text.lower() == choice.lower():
+                return choice
+        raise ValueError('must be Dewasa or Anak')
+    length = Case.__table__.c[field].type.length
+    if length and len(text) > length:
+        raise ValueError(f'must be at most {length} characters')
+    return text
+
+def parse_edit(edit):
+    """(case id, field, converted value) of one /update_cells edit; ValueError if it is invalid"""
+    if not isinstance(edit, dict) or not edit.get('id') or not edit.get('field'):
+        raise ValueError('Invalid data')
+    if edit['field'] not in ALLOWED_FIELDS:
+        raise ValueError('Field not editable')
+    try:
+        case_id = int(edit['id'])
+    except (TypeError, ValueError):
+        raise ValueError('Invalid data')
+    try:
+        value = coerce_edit_value(edit['field'], edit.get('value'))
+    except ValueError as e:
+        raise ValueError(f"{edit['field']} {e}")
+    return case_id, edit['field'], value
+
 @app.route('/update_cell', methods=['POST'])
 @login_required
 def update_cell():
@@ -272,19 +456,80 @@ def update_cell():
         return jsonify({'success': False, 'error': 'Case not found'}), 404
         
     # Security: Ensure field is allowed
-    # Allowed: Existing stages + New SPDP fields
-    allowed_fields = [
-        'berkas_tahap_1', 'p18_p19', 'p21', 'tahap_2', 'limpah_pn', 'keterangan',
-        'spdp_tgl_terima', 'spdp_tgl_polisi', # Allow editing dates via modal
-        'nama_tersangka', 'umur_tersangka', 'kategori_umur', 'pasal', 'jpu' # Allow editing text fields
-    ]
-    if field not in allowed_fields:
+    if field not in ALLOWED_FIELDS:
         return jsonify({'success': False, 'error': 'Field not editable'}), 403
+    
+    try:
+        value = coerce_edit_value(field, value)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'{field} {e}'}), 400
         
     setattr(case, field, value)
     db.session.commit()
+    if data.get('render'):
+        # Partial refresh: send the re-rendered row instead of making the client reload the page
+        return jsonify({'success': True, 'row_html': render_case_row(case)})
     return jsonify({'success': True})
 
+@app.route('/update_cells', methods=['POST'])
+@login_required
+def update_cells():
+    """
+    Apply a batch of inline edits in one transaction.
+    Body: {"edits": [{"id": 1, "field": "pasal", "value": "..."}, ...]}
+    Edits are applied in order, so the last edit of a cell wins. Every edit is validated
+    and converted first; if any is malformed, targets a field outside ALLOWED_FIELDS or
+    has a value the column can't hold, nothing is saved and the 400 response lists them
+    in "errors" ([{index, id, field, error}]) so the client can resend the valid ones.
+    Optional "render": [ids] returns the re-rendered <tr> of those cases in "rows".
+    """
+    data = request.get_json(silent=True) or {}
+    edits = data.get('edits')
+    if not isinstance(edits, list) or not edits or len(edits) > MAX_BATCH_EDITS:
+        return jsonify({'success': False, 'error': 'Invalid data'}), 400
+    
+    parsed, errors = [], []
+    for index, edit in enumerate(edits):
+        try:
+            parsed.append(parse_edit(edit))
+        except ValueError as e:
+            errors.append({
+                'index': index,
+                'id': edit.get('id') if isinstance(edit, dict) else None,
+                'field': edit.get('field') if isinstance(edit, dict) else None,
+                'error': str(e),
+            })
+    if errors:
+        return jsonify({'success': False, 'error': 'Invalid edits', 'errors': errors}), 400
+    
+    # One query for every case touched by the batch
+    ids = {case_id for case_id, _, _ in parsed}
+    cases = {case.id: case for case in Case.query.filter(Case.id.in_(ids))}
+    
+    updated = 0
+    for case_id, field, value in parsed:
+        case = cases.get(case_id)
+        if case is not None:
+            setattr(case, field, value)
+            updated += 1
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    result = {
+        'success': True,
+        'updated': updated,
+        'missing': sorted(ids - set(cases))  # e.g. deleted by someone else meanwhile
+    }
+    render_ids = {int(i) for i in data.get('render') or [] if str(i).isdigit()} & set(cases)
+    if render_ids:
+        # Reload the committed rows in one query, then render only those <tr>s
+        rendered = Case.query.filter(Case.id.in_(render_ids)).all()
+        result['rows'] = {str(case.id): render_case_row(case) for case in rendered}
+    return jsonify(result)
+
 @app.route('/delete_case/<int:case_id>', methods=['DELETE'])
 @login_required
 def delete_case(case_id):
@@ -295,11 +540,454 @@ def delete_case(case_id):
     try:
         db.session.delete(case)
         db.session.commit()
-        return jsonify({'success': True, 'message': 'Data berhasil dihapus'})
+        invalidate_case_count()
+        # The client removes the row itself; no page reload needed
+        return jsonify({'success': True, 'id': case_id, 'message': 'Data berhasil dihapus'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Worklist: hanya perkara yang sudah lewat / mendekati deadline
+WORKLIST_DEFAULT_WITHIN = 3
+WORKLIST_MAX_WITHIN = 60
+
+def get_worklist(stage=None, kategori_umur=None, within_days=WORKLIST_DEFAULT_WITHIN,
+                 page=1, per_page=30, today=None):
+    """
+    Fetch open cases whose stage deadline is past or falls within `within_days` days.
+    
+    Filtering and ordering run in SQL against the indexed <stage>_deadline columns;
+    one row is returned per (case, stage), ordered by time remaining.
+    
+    Returns:
+        tuple: (list of item dicts, has_next)
+    """
+    today = today or datetime.now().date()
+    horizon = today + timedelta(days=within_days)
+    stages = [stage] if stage else list(STAGE_SOURCE_FIELDS)
+    
+    selects = []
+    for name in stages:
+        deadline = getattr(Case, deadline_column(name))
+        stmt = select(
+            Case.id.label('case_id'),
+            literal(name, db.String).label('stage'),
+            deadline.label('deadline')
+        ).where(deadline <= horizon, ~Case.is_complete)
+        if kategori_umur:
+            stmt = stmt.where(func.coalesce(Case.kategori_umur, 'Dewasa') == kategori_umur)
+        selects.append(stmt)
+    
+    due = (union_all(*selects) if len(selects) > 1 else selects[0]).subquery()
+    # Fetch one extra row to know whether there is a next page without a COUNT(*)
+    rows = db.session.execute(
+        select(Case, due.c.stage, due.c.deadline)
+        .join(due, Case.id == due.c.case_id)
+        .order_by(due.c.deadline, Case.id, due.c.stage)
+        .limit(per_page + 1)
+        .offset((page - 1) * per_page)
+    ).all()
+    
+    items = []
+    for case, stage_name, deadline in rows[:per_page]:
+        days_left = (deadline - today).days
+        items.append({
+            'case': case,
+            'stage': stage_name,
+            'stage_label': STAGE_LABELS[stage_name],
+            'deadline': deadline,
+            'days_left': days_left,
+            'overdue': days_left < 0,
+        })
+    return items, len(rows) > per_page
+
+def _worklist_args():
+    """Read and validate worklist filters from the query string"""
+    stage = request.args.get('stage', '')
+    if stage not in STAGE_SOURCE_FIELDS:
+        stage = ''
+    kategori_umur = request.args.get('kategori_umur', '')
+    if kategori_umur not in ('Dewasa', 'Anak'):
+        kategori_umur = ''
+    within = request.args.get('within', WORKLIST_DEFAULT_WITHIN, type=int)
+    within = min(max(within, 0), WORKLIST_MAX_WITHIN)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = request.args.get('per_page', 30, type=int)
+    if per_page not in [10, 30, 50, 100]:
+        per_page = 30
+    return stage, kategori_umur, within, page, per_page
+
+@app.route('/worklist')
+@login_required
+def worklist():
+    stage, kategori_umur, within, page, per_page = _worklist_args()
+    items, has_next = get_worklist(stage or None, kategori_umur or None, within, page, per_page)
+    return render_template('worklist.html',
+                           items=items,
+                           has_next=has_next,
+                           page=page,
+                           per_page=per_page,
+                           stage=stage,
+                           kategori_umur=kategori_umur,
+                           within=within,
+                           stage_labels=STAGE_LABELS)
+
+@app.route('/api/worklist')
+@login_required
+def worklist_api():
+    stage, kategori_umur, within, page, per_page = _worklist_args()
+    items, has_next = get_worklist(stage or None, kategori_umur or None, within, page, per_page)
+    return jsonify({
+        'success': True,
+        'page': page,
+        'per_page': per_page,
+        'has_next': has_next,
+        'within': within,
+        'items': [{
+            'id': item['case'].id,
+            'stage': item['stage'],
+            'deadline': item['deadline'].isoformat(),
+            'days_left': item['days_left'],
+            'overdue': item['overdue'],
+            'case': item['case'].to_dict(),
+        } for item in items]
+    })
+
+# Read-only cases API: /api/cases?fields=id,nama_tersangka&jpu=...&after=<cursor>
+API_CASE_FIELDS = (
+    'id', 'uid', 'nama_tersangka', 'umur_tersangka', 'kategori_umur', 'pasal', 'jpu', 'spdp',
+    'spdp_tgl_terima', 'spdp_ket_terima', 'spdp_tgl_polisi', 'spdp_ket_polisi',
+    'berkas_tahap_1', 'p18_p19', 'p21', 'tahap_2', 'limpah_pn', 'keterangan',
+    'spdp_deadline', 'berkas_tahap_1_deadline', 'p18_p19_deadline', 'p21_deadline', 'tahap_2_deadline',
+    'created_at', 'updated_at'
+)
+# Same shape as Case.to_dict()
+API_DEFAULT_FIELDS = (
+    'id', 'nama_tersangka', 'umur_tersangka', 'kategori_umur', 'pasal', 'jpu', 'spdp',
+    'berkas_tahap_1', 'p18_p19', 'p21', 'tahap_2', 'limpah_pn', 'keterangan'
+)
+API_DEFAULT_LIMIT = 50
+API_MAX_LIMIT = 500
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def _api_case_fields():
+    """Parse ?fields=; returns (fields, unknown). id is always included."""
+    raw = request.args.get('fields')
+    if not raw:
+        return list(API_DEFAULT_FIELDS), []
+    fields = ['id'] + [f for f in dict.fromkeys(raw.split(',')) if f and f != 'id']
+    return fields, [f for f in fields if f not in API_CASE_FIELDS]
+
+def apply_case_filters(stmt, filters=None, today=None):
+    """Add the WHERE clauses for the filters read by _api_case_filters()"""
+    filters = filters or {}
+    if filters.get('jpu'):
+        stmt = stmt.where(Case.jpu == filters['jpu'])
+    if filters.get('kategori_umur'):
+        stmt = stmt.where(func.coalesce(Case.kategori_umur, 'Dewasa') == filters['kategori_umur'])
+    if filters.get('q'):
+        stmt = stmt.where(Case.nama_tersangka.ilike(f"%{like_escape(filters['q'])}%", escape='\\'))
+    if filters.get('overdue'):
+        stmt = stmt.where(Case.overdue_at(filters['overdue'], today))
+    if filters.get('updated_since'):
+        stmt = stmt.where(Case.updated_at > filters['updated_since'])
+    return stmt
+
+def query_case_rows(fields, filters=None, after=None, limit=API_DEFAULT_LIMIT, today=None):
+    """
+    Select only `fields` (plus the cursor/version columns) newest-first, as plain Row tuples.
+    
+    No ORM objects are built, so a page costs one SELECT of exactly the requested columns.
+    
+    Returns:
+        tuple: (rows, has_next)
+    """
+    extra = [c for c in ('created_at', 'updated_at') if c not in fields]
+    stmt = apply_case_filters(select(*[getattr(Case, f) for f in fields + extra]), filters, today)
+    
+    position = decode_cursor(after)
+    if position:
+        stmt = stmt.where(tuple_(Case.created_at, Case.id) < tuple_(*position))
+    rows = db.session.execute(
+        stmt.order_by(Case.created_at.desc(), Case.id.desc()).limit(limit + 1)
+    ).all()
+    return rows[:limit], len(rows) > limit
+
+def _api_case_filters():
+    """Read and validate /api/cases filters; returns (filters, error)"""
+    filters = {
+        'jpu': request.args.get('jpu', ''),
+        'q': request.args.get('q', '').strip(),
+        'kategori_umur': request.args.get('kategori_umur', ''),
+        'overdue': request.args.get('overdue', ''),
+    }
+    if filters['kategori_umur'] not in ('', 'Dewasa', 'Anak'):
+        return None, 'kategori_umur must be Dewasa or Anak'
+    if filters['overdue'] and filters['overdue'] not in STAGE_SOURCE_FIELDS:
+        return None, f"overdue must be one of: {', '.join(STAGE_SOURCE_FIELDS)}"
+    since = request.args.get('updated_since')
+    if since:
+        try:
+            filters['updated_since'] = datetime.fromisoformat(since)
+        except ValueError:
+            return None, 'updated_since must be an ISO datetime'
+    return filters, None
+
+@app.route('/api/cases')
+@login_required
+def cases_api():
+    """
+    Read-only case listing for scripts and the desktop client.
+    
+    Query: fields (comma separated, see API_CASE_FIELDS), limit, after (cursor from
+    next_cursor), filters jpu, kategori_umur, q, overdue=<stage>, updated_since.
+    Send If-None-Match with the last ETag to get a 304 when the page hasn't changed.
+    """
+    fields, unknown = _api_case_fields()
+    if unknown:
+        return jsonify({'success': False, 'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    filters, error = _api_case_filters()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    limit = min(max(request.args.get('limit', API_DEFAULT_LIMIT, type=int), 1), API_MAX_LIMIT)
+    
+    rows, has_next = query_case_rows(fields, filters, request.args.get('after'), limit)
+    
+    # ETag from the query plus each row's (id, updated_at): every edit bumps updated_at,
+    # so an unchanged page is detected without serializing it
+    version = hashlib.sha1(request.query_string)
+    for row in rows:
+        version.update(f'|{row.id}:{row.updated_at}'.encode())
+    etag = version.hexdigest()
+    headers = {'Cache-Control': 'private, no-cache'}
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304, headers=headers)
+        response.set_etag(etag)
+        return response
+    
+    body = json.dumps({
+        'success': True,
+        'fields': fields,
+        'has_next': has_next,
+        'next_cursor': encode_cursor(rows[-1].created_at, rows[-1].id) if has_next else None,
+        'items': [dict(zip(fields, row)) for row in rows],
+    }, default=_json_default, separators=(',', ':'))
+    response = app.response_class(body, mimetype='application/json', headers=headers)
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/changes')
+@login_required
+def changes_api():
+    """
+    Change feed for incremental refresh: cases inserted/updated (op "upsert") and deleted
+    (op "delete") after `since`, oldest first.
+    
+    Query: since (next_cursor of the previous response; omitted = from the beginning,
+    "latest" = an empty page with a cursor at the head), fields (as /api/cases), limit.
+    Keep polling with next_cursor; has_more means the next page is available right away.
+    """
+    fields, unknown = _api_case_fields()
+    if unknown:
+        return jsonify({'success': False, 'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    since = request.args.get('since')
+    if since == 'latest':
+        return jsonify({'success': True, 'changes': [], 'next_cursor': latest_cursor(), 'has_more': False})
+    position = None
+    if since:
+        position = decode_change_cursor(since)
+        if position is None:
+            return jsonify({'success': False, 'error': 'Invalid since cursor'}), 400
+    limit = min(max(request.args.get('limit', API_MAX_LIMIT, type=int), 1), API_MAX_LIMIT)
+    
+    changes, next_cursor, has_more = fetch_changes(fields, position, limit)
+    body = json.dumps({
+        'success': True,
+        'changes': changes,
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+    }, default=_json_default, separators=(',', ':'))
+    return app.response_class(body, mimetype='application/json', headers={'Cache-Control': 'no-store'})
+
+@app.route('/events')
+@login_required
+def events():
+    """
+    Server-Sent Events stream of case changes: "case" events {"op": "upsert"|"delete", "id", "v"}
+    and "resync" when the client missed too much and should reload its visible rows.
+    
+    A reconnecting EventSource sends Last-Event-ID (a change feed cursor) and gets the
+    changes it missed replayed. 204 when live updates are off and 503 when this worker already
+    holds LIVE_MAX_STREAMS streams; either way the client falls back to polling /api/changes.
+    """
+    if not app.config['LIVE_UPDATES']:
+        return '', 204
+    try:
+        subscription = broker.subscribe()
+    except BrokerFull:
+        return jsonify({'success': False, 'error': 'Too many open event streams'}), 503
+    try:
+        replay = replay_events(request.headers.get('Last-Event-ID'))
+    except Exception:
+        broker.unsubscribe(subscription)
+        raise
+    change_relay.ensure_running()
+    # The stream outlives the request's work: give the connection back to the pool now
+    db.session.close()
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return app.response_class(event_stream(broker, subscription, replay),
+                              mimetype='text/event-stream', headers=headers)
+
+MAX_RENDER_ROWS = 100
+
+@app.route('/rows')
+@login_required
+def rows():
+    """
+    Re-rendered dashboard <tr>s for live updates. Query: ids=1,2,3 (max MAX_RENDER_ROWS).
+    Cases that no longer exist are listed in "missing".
+    """
+    try:
+        ids = {int(i) for i in request.args.get('ids', '').split(',') if i}
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid ids'}), 400
+    if not ids or len(ids) > MAX_RENDER_ROWS:
+        return jsonify({'success': False, 'error': 'Invalid ids'}), 400
+    cases = Case.query.filter(Case.id.in_(ids)).all()
+    return jsonify({
+        'success': True,
+        'rows': {str(case.id): render_case_row(case) for case in cases},
+        'missing': sorted(ids - {case.id for case in cases}),
+    })
+
+@app.route('/api/cases/<int:case_id>/history')
+@login_required
+def case_history_api(case_id):
+    """
+    Audit trail of one case, newest first: who changed which field from what to what.
+    
+    Query: limit, before (next_before of the previous page). Works for deleted cases too.
+    """
+    # Read-your-writes: entries of this worker still in the buffer are written first
+    audit_log.flush()
+    limit = min(max(request.args.get('limit', API_DEFAULT_LIMIT, type=int), 1), API_MAX_LIMIT)
+    rows, has_next = case_history(case_id, request.args.get('before', type=int), limit)
+    body = json.dumps({
+        'success': True,
+        'case_id': case_id,
+        'has_next': has_next,
+        'next_before': rows[-1].id if has_next else None,
+        'items': [{
+            'id': row.id,
+            'action': row.action,
+            'field': row.field,
+            'old_value': row.old_value,
+            'new_value': row.new_value,
+            'username': row.username,
+            'changed_at': row.changed_at,
+        } for row in rows],
+    }, default=_json_default, separators=(',', ':'))
+    return app.response_class(body, mimetype='application/json')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Prometheus scrape target: per-endpoint request, latency, SQL, pool and template metrics.
+    Needs "Authorization: Bearer <METRICS_TOKEN>"; 404 when no token is configured.
+    """
+    token = app.config['METRICS_TOKEN']
+    if not metrics.enabled or not token:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    return app.response_class(metrics.render(db.engine), mimetype='text/plain; version=0.0.4',
+                              headers={'Cache-Control': 'no-store'})
+
+@app.route('/summary')
+@login_required
+def summary():
+    data = get_summary(ttl=app.config['SUMMARY_CACHE_TTL'])
+    return render_template('summary.html', summary=data, stage_labels=STAGE_LABELS)
+
+@app.route('/api/summary')
+@login_required
+def summary_api():
+    data = get_summary(ttl=app.config['SUMMARY_CACHE_TTL'])
+    return jsonify({
+        'success': True,
+        'generated_at': data['generated_at'].isoformat(),
+        'totals': data['totals'],
+        'rows': data['rows'],
+    })
+
+SEARCH_PER_PAGE = 20
+
+@app.route('/search')
+@login_required
+def search():
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    result = search_cases(query, page, SEARCH_PER_PAGE)
+    return render_template('search.html',
+                           query=query,
+                           page=page,
+                           per_page=SEARCH_PER_PAGE,
+                           items=result['items'],
+                           has_next=result['has_next'],
+                           fuzzy=result['fuzzy'])
+
+@app.route('/api/search')
+@login_required
+def search_api():
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', SEARCH_PER_PAGE, type=int), 1), 100)
+    result = search_cases(query, page, per_page)
+    return jsonify({
+        'success': True,
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'has_next': result['has_next'],
+        'fuzzy': result['fuzzy'],
+        'items': [dict(case.to_dict(), score=round(score, 4)) for case, score in result['items']],
+    })
+
+@app.route('/export')
+@login_required
+def export_cases():
+    """
+    Stream the filtered cases as CSV (default) or XLSX in the FORMAT.xlsx layout.
+    Query: format=csv|xlsx, flags=1 for computed overdue columns, same filters as /api/cases.
+    """
+    filters, error = _api_case_filters()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'xlsx'):
+        return jsonify({'success': False, 'error': 'format must be csv or xlsx'}), 400
+    with_flags = request.args.get('flags') == '1'
+    
+    stmt = export_statement(lambda s: apply_case_filters(s, filters), with_flags)
+    headers = export_headers(with_flags)
+    rows = iter_export_rows(stmt, with_flags)
+    filename = f"perkara_{datetime.now():%Y%m%d_%H%M}.{fmt}"
+    if fmt == 'xlsx':
+        body = stream_xlsx(headers, rows)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = stream_csv(headers, rows)
+        mimetype = 'text/csv'
+    # stream_with_context keeps the app context (and db session) alive while the body is generated
+    return app.response_class(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+    })
+
 def create_admin():
     """Create default admin user if not exists"""
     if not User.query.filter_by(username='admin').first():
@@ -314,10 +1002,18 @@ def init_db():
     try:
         with app.app_context():
             db.create_all()
-            create_admin()
+            ensure_search_index()
+            # Replika offline mengambil user dari database pusat saat pull pertama
+            if not OFFLINE_REPLICA:
+                create_admin()
     except Exception as e:
         print(f"DB Init Error: {e}")
 
+# Scheduler digest di dalam proses (bukan untuk serverless: tidak ada proses yang hidup terus).
+# Dengan beberapa worker gunicorn tiap worker menjalankan satu, tapi digest tetap terkirim sekali sehari.
+if os.environ.get('DIGEST_SCHEDULER') == '1' and DEPLOYMENT_MODE != 'serverless':
+    start_digest_scheduler(app)
+
 if __name__ == '__main__':
     # Initialize DB (Create tables + admin user)
     init_db()
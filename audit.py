@@ -0,0 +1,231 @@
+"""
+Audit trail perubahan perkara: siapa mengubah kolom apa, dari nilai apa ke nilai apa, kapan.
+
+Perubahan lewat ORM (update_cell, update_cells, add_case, delete_case) dikumpulkan dari
+session saat flush dan baru diserahkan ke buffer setelah commit berhasil (rollback dibuang).
+Buffer ditulis ke tabel case_audit dalam batch (executemany) oleh thread background, jadi
+request edit tidak menunggu INSERT audit. Di serverless (tanpa proses yang hidup terus)
+buffer ditulis di akhir request.
+
+Importer menulis audit-nya langsung per chunk di transaksi import yang sama (write_entries),
+supaya ratusan ribu baris tidak perlu ditampung di memori.
+"""
+import atexit
+import json
+import threading
+from datetime import datetime
+from flask import g, has_request_context
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from models import Case, CaseAudit
+
+FLUSH_INTERVAL = 1.0        # detik maksimal sebuah entri menunggu di buffer
+BATCH_SIZE = 500
+# Jika database tidak bisa ditulis sekian lama, penulis ikut menunggu daripada audit hilang
+MAX_PENDING = 20000
+
+# Kolom yang dicatat; kolom turunan (*_dt, *_deadline) dan metadata tidak
+_SKIPPED = {'id', 'uid', 'created_at', 'updated_at', 'import_key', 'import_key_fields', 'import_hash'}
+AUDIT_FIELDS = tuple(
+    column.name for column in Case.__table__.columns
+    if column.name not in _SKIPPED and not column.name.endswith(('_dt', '_deadline'))
+)
+
+audit_table = CaseAudit.__table__
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def current_username():
+    """Username of the logged-in user, without triggering a user load inside a flush"""
+    if has_request_context():
+        user = g.get('_login_user')
+        if user is not None and user.is_authenticated:
+            return user.username
+    return None
+
+
+def entry(case_id, action, field=None, old_value=None, new_value=None, username=None, changed_at=None):
+    return {
+        'case_id': case_id,
+        'action': action,
+        'field': field,
+        'old_value': _text(old_value),
+        'new_value': _text(new_value),
+        'username': username,
+        'changed_at': changed_at or datetime.now(),
+    }
+
+
+def snapshot(values):
+    """JSON of the audited fields of a case (mapping or Case), kept when the case is deleted"""
+    get = values.get if isinstance(values, dict) else lambda f: getattr(values, f, None)
+    return json.dumps({f: get(f) for f in AUDIT_FIELDS if get(f) not in (None, '')}, default=str)
+
+
+def write_entries(connection, entries):
+    """Insert audit entries with executemany, BATCH_SIZE rows per statement"""
+    for i in range(0, len(entries), BATCH_SIZE):
+        connection.execute(audit_table.insert(), entries[i:i + BATCH_SIZE])
+
+
+def case_entries(session):
+    """Audit entries for the Case inserts/updates/deletes of the current flush"""
+    username = current_username()
+    now = datetime.now()
+    entries = []
+    for obj in session.new:
+        if isinstance(obj, Case):
+            entries.append(entry(obj.id, 'create', username=username, changed_at=now))
+    for obj in session.dirty:
+        if not isinstance(obj, Case) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        for field in AUDIT_FIELDS:
+            history = state.attrs[field].history
+            if not history.has_changes():
+                continue
+            old = history.deleted[0] if history.deleted else None
+            new = history.added[0] if history.added else None
+            if _text(old) != _text(new):
+                entries.append(entry(obj.id, 'update', field, old, new, username, now))
+    for obj in session.deleted:
+        if isinstance(obj, Case):
+            entries.append(entry(obj.id, 'delete', old_value=snapshot(obj), username=username, changed_at=now))
+    return entries
+
+
+class AuditLog:
+    """Buffer of committed audit entries, written in batches off the request path"""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.background = True
+        self.app = None
+        self.last_error = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._engine = None
+
+    def init_app(self, app, background=True):
+        """background=False (serverless): write the buffer when the request's app context ends"""
+        self.app = app
+        self.background = background
+        app.teardown_appcontext(self._flush_in_foreground)
+        atexit.register(self._flush_quietly)
+
+    def set_background(self, background):
+        """Switch between the writer thread and writing at the end of each app context"""
+        self.background = background
+        if not background:
+            self.stop()
+
+    def stop(self):
+        """Stop the writer thread, if one is running, and write what is left in the buffer"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join()
+            self._stop.clear()
+        self._flush_quietly()
+
+    def add(self, entries):
+        if not entries:
+            return
+        with self._lock:
+            if self._engine is None:
+                self._engine = db.engine
+            self._pending.extend(entries)
+            pending = len(self._pending)
+            # Started lazily, so forked gunicorn workers each get their own writer
+            if self.background and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+        if pending >= self.max_pending:
+            self.flush()  # writer is falling behind: apply backpressure instead of dropping entries
+        elif pending >= BATCH_SIZE:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of entries written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                with self._engine.begin() as conn:
+                    write_entries(conn, batch)
+            except SQLAlchemyError:
+                with self._lock:
+                    self._pending[:0] = batch  # keep order, retry on the next flush
+                raise
+            return len(batch)
+
+    def _flush_in_foreground(self, exc):
+        if not self.background:
+            self.flush()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except SQLAlchemyError:
+            pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                self.last_error = None
+            except SQLAlchemyError as e:
+                self.last_error = str(e).splitlines()[0]
+
+
+audit_log = AuditLog()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect(session, flush_context):
+    entries = case_entries(session)
+    if entries:
+        session.info.setdefault('audit_pending', []).extend(entries)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _release(session):
+    audit_log.add(session.info.pop('audit_pending', None))
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard(session):
+    session.info.pop('audit_pending', None)
+
+
+def case_history(case_id, before=None, limit=50):
+    """
+    Audit entries of one case, newest first (uses the (case_id, id) index).
+
+    Returns:
+        tuple: (list of CaseAudit, has_next)
+    """
+    query = CaseAudit.query.filter(CaseAudit.case_id == case_id)
+    if before:
+        query = query.filter(CaseAudit.id < before)
+    rows = query.order_by(CaseAudit.id.desc()).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,208 @@
+"""
+Push perubahan perkara ke semua dashboard yang terbuka lewat Server-Sent Events (/events).
+
+- LocalBroker: pub/sub di dalam proses (pengganti broker eksternal seperti Redis). Setiap
+  koneksi SSE punya antrean terbatas; klien yang terlalu lambat tidak menumpuk memori, tapi
+  antreannya dibuang dan ia menerima event "resync" untuk memuat ulang baris yang tampil.
+  Setiap koneksi menahan satu thread worker, jadi jumlahnya dibatasi (LIVE_MAX_STREAMS) di bawah
+  jumlah thread; klien yang ditolak (503) beralih ke polling /api/changes.
+- ChangeRelay: satu thread per worker yang membaca change feed (changes.py) dari database
+  setiap RELAY_INTERVAL detik selama ada klien terhubung, lalu mem-publish event ke broker.
+  Database menjadi "bus" antar worker gunicorn: edit di worker mana pun sampai ke semua klien.
+
+Event-nya ringkas: {"op": "upsert"|"delete", "id": <case id>, "v": <timestamp>}. Klien mengambil
+baris yang berubah lewat /rows (di-render dari row_cache) dan hanya mengganti sel yang berbeda.
+Setiap event membawa cursor change feed sebagai id SSE, jadi setelah reconnect (Last-Event-ID)
+perubahan yang terlewat dikirim ulang.
+"""
+import json
+import queue
+import threading
+import time
+from datetime import timedelta
+from sqlalchemy.exc import SQLAlchemyError
+from cache import LRUCache
+from changes import fetch_changes, latest_cursor, decode_change_cursor
+
+RELAY_INTERVAL = 1.0        # detik antar poll change feed
+HEARTBEAT = 15              # detik; komentar SSE supaya proxy tidak menutup koneksi diam
+SUBSCRIBER_QUEUE = 200      # event maksimal yang menunggu per klien
+MAX_SUBSCRIBERS = 4         # koneksi SSE per worker, di bawah --threads (Procfile: 8) agar request biasa tetap jalan
+STREAM_MAX_SECONDS = 600    # koneksi ditutup berkala; EventSource otomatis reconnect
+REPLAY_LIMIT = 500          # event terlewat yang dikirim ulang saat reconnect, lebih dari itu: resync
+RETRY_MS = 3000
+# Saat relay mulai: perubahan sesaat sebelum klien pertama terhubung (setelah halamannya di-render) ikut dikirim
+RELAY_START_BACKLOG = timedelta(seconds=5)
+
+
+class BrokerFull(Exception):
+    """Too many open event streams on this worker"""
+
+
+class Subscription:
+    """Bounded event queue of one connected client"""
+
+    def __init__(self, maxsize=SUBSCRIBER_QUEUE):
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Slow client: drop what it hasn't read and make it resync instead of buffering more
+            self.overflowed = True
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def get(self, timeout):
+        """Next event, or None after `timeout` seconds without one"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LocalBroker:
+    """In-process fan-out to every subscription of this worker"""
+
+    def __init__(self, max_subscribers=MAX_SUBSCRIBERS, queue_size=SUBSCRIBER_QUEUE):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def subscribe(self):
+        with self._lock:
+            if len(self._subscriptions) >= self.max_subscribers:
+                raise BrokerFull()
+            subscription = Subscription(self.queue_size)
+            self._subscriptions.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, events):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            for event in events:
+                subscription.put(event)
+
+
+def change_events(changes, cursor):
+    """Compact events for change feed items; each carries the feed cursor after its batch"""
+    events = []
+    for change in changes:
+        version = change['updated_at'] if change['op'] == 'upsert' else change['deleted_at']
+        events.append({'op': change['op'], 'id': change['id'], 'v': version.isoformat(), 'cursor': cursor})
+    return events
+
+
+class ChangeRelay:
+    """Polls the change feed while clients are connected and publishes new changes to the broker"""
+
+    def __init__(self, app, broker, interval=RELAY_INTERVAL):
+        self.app = app
+        self.broker = broker
+        self.interval = interval
+        self.position = None
+        self.last_error = None
+        # The feed re-sends its last seconds until they settle; publish each version only once
+        self._seen = LRUCache(10000)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def ensure_running(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='change-relay', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def poll_once(self):
+        """Publish the changes since the last poll; returns how many events were published"""
+        if self.position is None:
+            self.position = decode_change_cursor(latest_cursor(settle=RELAY_START_BACKLOG))
+        published = 0
+        while True:
+            changes, cursor, has_more = fetch_changes(['id'], self.position, limit=REPLAY_LIMIT)
+            self.position = decode_change_cursor(cursor)
+            versions = {(e['op'], e['id'], e['v']): e for e in change_events(changes, cursor)}
+            seen = self._seen.get_many(versions)
+            events = [e for key, e in versions.items() if key not in seen]
+            self._seen.set_many(dict.fromkeys(versions, True))
+            if events:
+                self.broker.publish(events)
+                published += len(events)
+            if not has_more:
+                return published
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not len(self.broker):
+                self.position = None  # nobody listening: start from the head again when someone connects
+                continue
+            try:
+                with self.app.app_context():
+                    self.poll_once()
+                self.last_error = None
+            except SQLAlchemyError as e:
+                self.last_error = str(e).splitlines()[0]
+
+
+def format_event(event, name='case'):
+    data = {key: value for key, value in event.items() if key != 'cursor'}
+    lines = [f"id: {event['cursor']}"] if event.get('cursor') else []
+    lines += [f'event: {name}', f'data: {json.dumps(data, separators=(",", ":"))}']
+    return '\n'.join(lines) + '\n\n'
+
+
+def replay_events(last_event_id):
+    """
+    Events missed since `last_event_id` (a feed cursor), for a reconnecting client.
+
+    Returns:
+        list of events, or None if too much was missed and the client should resync
+    """
+    position = decode_change_cursor(last_event_id) if last_event_id else None
+    if position is None:
+        return []
+    changes, cursor, has_more = fetch_changes(['id'], position, limit=REPLAY_LIMIT)
+    return None if has_more else change_events(changes, cursor)
+
+
+def event_stream(broker, subscription, replay=(), heartbeat=HEARTBEAT, max_seconds=STREAM_MAX_SECONDS):
+    """Generator of SSE text for one client; always unsubscribes when the client goes away"""
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        if replay is None:
+            yield format_event({}, 'resync')
+            return
+        for event in replay:
+            yield format_event(event)
+        while time.monotonic() < deadline:
+            event = subscription.get(timeout=heartbeat)
+            if subscription.overflowed:
+                yield format_event({}, 'resync')
+                return
+            yield format_event(event) if event is not None else ': ping\n\n'
+    finally:
+        broker.unsubscribe(subscription)
+
+
+broker = LocalBroker()
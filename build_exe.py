@@ -64,10 +64,15 @@ def create_desktop_embedded():
     """Buat desktop_embedded.py yang import dari app_embedded"""
     print("📝 Membuat desktop_embedded.py...")
     
-    desktop_content = """import webview
+    desktop_content = """import os
+import webview
 import sys
 import threading
-from app_embedded import app
+
+# Long-running local process: use the pooled engine strategy (see app.get_engine_options)
+os.environ.setdefault('DEPLOYMENT_MODE', 'desktop')
+
+from app_embedded import app, init_db, OFFLINE_REPLICA
 import time
 import socket
 
@@ -102,6 +107,12 @@ def start_server(port):
         sys.exit(1)
 
 if __name__ == '__main__':
+    # Offline mode: local SQLite replica + background sync with the central database
+    if OFFLINE_REPLICA:
+        from sync import start_replica
+        start_replica(app)
+    init_db()
+
     # Find a free port
     port = find_free_port()
     print(f"Using port: {port}")
@@ -189,6 +200,8 @@ a = Analysis(
         'flask_login',
         'dateutil',
         'dateutil.parser',
+        'sync',
+        'sqlalchemy.dialects.sqlite',
     ],
     hookspath=[],
     hooksconfig={{}},
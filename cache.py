@@ -0,0 +1,93 @@
+"""
+Cache in-process sederhana dengan TTL, dipakai untuk data kecil yang sering dibaca
+(total perkara, dsb). Setiap worker gunicorn punya cache sendiri; TTL membatasi
+berapa lama worker lain bisa melihat nilai lama setelah ada penulisan.
+
+LRUCache tanpa TTL untuk nilai yang tidak pernah basi karena kuncinya sudah memuat versinya
+(mis. fragmen HTML per versi perkara di row_cache.py).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe dict whose entries expire `ttl` seconds after being set"""
+
+    def __init__(self, ttl=30, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            if len(self._data) >= self.maxsize and key not in self._data:
+                # Drop the entry closest to expiry to stay bounded
+                oldest = min(self._data, key=lambda k: self._data[k][1])
+                del self._data[oldest]
+            self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Return the cached value, computing and storing it with factory() on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class LRUCache:
+    """Thread-safe dict bounded to `maxsize` entries; the least recently used entry is evicted first"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_many(self, keys):
+        """{key: value} for the keys that are cached"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._data.get(key, _MISSING)
+                if value is not _MISSING:
+                    self._data.move_to_end(key)
+                    found[key] = value
+        return found
+
+    def set_many(self, mapping):
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
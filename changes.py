@@ -0,0 +1,102 @@
+"""
+Change feed perkara untuk refresh inkremental (/api/changes?since=<cursor>).
+
+Dua aliran dibaca dengan keyset dan digabung berurutan waktu:
+  - perkara yang ditambah/diubah: (updated_at, id) > posisi cursor, index ix_case_updated_at_id
+  - perkara yang dihapus: tombstone (deleted_at, id) > posisi cursor
+Biaya satu poll sebanding dengan jumlah perubahan sejak cursor, bukan dengan ukuran tabel.
+
+updated_at diisi saat penulisan, bukan saat commit, jadi transaksi yang commit terlambat bisa
+membawa timestamp yang lebih tua dari cursor. Karena itu cursor yang sudah "mengejar" tidak
+dimajukan melewati now - CHANGE_SETTLE: perubahan beberapa detik terakhir dikirim ulang pada
+poll berikutnya. Klien menerapkan perubahan sebagai upsert/delete per uid (idempoten).
+"""
+import base64
+from datetime import datetime, timedelta
+from sqlalchemy import select, tuple_
+from extensions import db
+from models import Case, CaseTombstone
+
+CHANGE_SETTLE = timedelta(seconds=30)
+
+_START = (datetime.min, 0)
+
+
+def encode_change_cursor(case_position, tombstone_position):
+    """Opaque cursor holding the (timestamp, id) position of both streams"""
+    raw = '|'.join(f'{ts.isoformat()}|{row_id}' for ts, row_id in (case_position, tombstone_position))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_change_cursor(cursor):
+    """Inverse of encode_change_cursor; None for a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        case_ts, case_id, tomb_ts, tomb_id = raw.split('|')
+        return ((datetime.fromisoformat(case_ts), int(case_id)),
+                (datetime.fromisoformat(tomb_ts), int(tomb_id)))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def latest_cursor(now=None, settle=CHANGE_SETTLE):
+    """Cursor at the head of the feed (minus the settle window), for clients that just loaded everything"""
+    head = ((now or datetime.now()) - settle, 0)
+    return encode_change_cursor(head, head)
+
+
+def _next_position(previous, last, caught_up, hold_back):
+    if last is None:
+        return previous
+    if not caught_up:
+        return last  # mid catch-up: keep paging forward
+    return max(previous, min(last, hold_back))
+
+
+def fetch_changes(fields, since=None, limit=500, now=None, settle=CHANGE_SETTLE):
+    """
+    Changes after the `since` positions (None = from the beginning).
+
+    Args:
+        fields: Case columns to return for upserts (id, uid and updated_at are always included)
+        since: decoded cursor, ((ts, case id), (ts, tombstone id))
+
+    Returns:
+        tuple: (changes, next_cursor, has_more); changes are dicts with op 'upsert' or 'delete',
+               oldest first
+    """
+    case_position, tombstone_position = since or (_START, _START)
+    columns = list(dict.fromkeys(['id', 'uid', 'updated_at'] + list(fields)))
+
+    cases = db.session.execute(
+        select(*[getattr(Case, f) for f in columns])
+        .where(Case.updated_at.isnot(None), tuple_(Case.updated_at, Case.id) > tuple_(*case_position))
+        .order_by(Case.updated_at, Case.id).limit(limit + 1)
+    ).all()
+    tombstones = db.session.execute(
+        select(CaseTombstone.id, CaseTombstone.uid, CaseTombstone.case_id, CaseTombstone.deleted_at)
+        .where(tuple_(CaseTombstone.deleted_at, CaseTombstone.id) > tuple_(*tombstone_position))
+        .order_by(CaseTombstone.deleted_at, CaseTombstone.id).limit(limit + 1)
+    ).all()
+
+    merged = sorted(
+        [((row.updated_at, 0, row.id), 'upsert', row) for row in cases] +
+        [((row.deleted_at, 1, row.id), 'delete', row) for row in tombstones],
+        key=lambda item: item[0])
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    changes, last_case, last_tombstone = [], None, None
+    for _, op, row in merged:
+        if op == 'upsert':
+            changes.append(dict(zip(columns, row), op='upsert'))
+            last_case = (row.updated_at, row.id)
+        else:
+            changes.append({'op': 'delete', 'id': row.case_id, 'uid': row.uid, 'deleted_at': row.deleted_at})
+            last_tombstone = (row.deleted_at, row.id)
+
+    hold_back = ((now or datetime.now()) - settle, 0)
+    next_cursor = encode_change_cursor(
+        _next_position(case_position, last_case, not has_more, hold_back),
+        _next_position(tombstone_position, last_tombstone, not has_more, hold_back))
+    return changes, next_cursor, has_more
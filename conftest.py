@@ -0,0 +1,15 @@
+"""
+Shared pytest setup.
+
+The audit trail is written at the end of each app context during tests (as in serverless mode)
+instead of by the writer thread, so INSERTs from that thread never show up in the SQL
+statements a test is counting.
+"""
+import pytest
+from audit import audit_log
+
+
+@pytest.fixture(scope='session', autouse=True)
+def audit_in_foreground():
+    audit_log.set_background(False)
+    yield
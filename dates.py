@@ -0,0 +1,95 @@
+"""
+Helper parsing tanggal yang dipakai bersama oleh app.py, models.py dan script import.
+"""
+from datetime import date, datetime
+from functools import lru_cache
+from dateutil import parser
+import re
+
+# Jumlah string tanggal berbeda yang disimpan hasil parse-nya
+PARSE_CACHE_SIZE = 4096
+
+_ISO_RE = re.compile(r'^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2})?)?$')
+
+
+def _parse_date_dateutil(date_str):
+    """
+    Robust date parser using dateutil.
+    Handles YYYY-MM-DD (ISO) and DD-MM-YYYY formats.
+    """
+    try:
+        # Check for ISO format YYYY-MM-DD (optionally with the time the date modal
+        # appends, e.g. 'YYYY-MM-DD HH:MM') via regex to avoid ambiguity
+        if _ISO_RE.match(date_str):
+            return parser.parse(date_str, yearfirst=True, dayfirst=False)
+            
+        # Fallback: parser is smart enough to handle most formats
+        # dayfirst=True ensures 01/02/2023 is treated as 1st Feb
+        return parser.parse(date_str, dayfirst=True)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def _parse_date_fast(s):
+    """
+    Hand-rolled parsing for the formats the app actually stores:
+    YYYY-MM-DD, YYYY-MM-DD HH:MM[:SS] (space or 'T'), DD-MM-YYYY and DD/MM/YYYY.
+    Returns None for anything else (including invalid dates) so the caller
+    falls back to dateutil and keeps its exact behavior.
+    """
+    n = len(s)
+    try:
+        if n >= 10 and s[4] == '-' and s[7] == '-':
+            if not (s[:4].isdigit() and s[5:7].isdigit() and s[8:10].isdigit()):
+                return None
+            if n == 10:
+                return datetime(int(s[:4]), int(s[5:7]), int(s[8:10]))
+            if (n == 16 or (n == 19 and s[16] == ':')) and s[10] in ' T' and s[13] == ':':
+                if not (s[11:13].isdigit() and s[14:16].isdigit()):
+                    return None
+                second = 0
+                if n == 19:
+                    if not s[17:19].isdigit():
+                        return None
+                    second = int(s[17:19])
+                return datetime(int(s[:4]), int(s[5:7]), int(s[8:10]),
+                                int(s[11:13]), int(s[14:16]), second)
+            return None
+
+        if n == 10 and s[2] in '-/' and s[5] == s[2]:
+            if not (s[:2].isdigit() and s[3:5].isdigit() and s[6:].isdigit()):
+                return None
+            # dayfirst: DD-MM-YYYY. Month > 12 is left to dateutil, which swaps day/month
+            if int(s[3:5]) > 12:
+                return None
+            return datetime(int(s[6:]), int(s[3:5]), int(s[:2]))
+    except ValueError:
+        # Out-of-range values (e.g. 31-02-2024): let dateutil decide
+        return None
+    return None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_date_str(date_str):
+    return _parse_date_fast(date_str) or _parse_date_dateutil(date_str)
+
+
+def parse_date(date_str):
+    """
+    Parse a stored date string into a datetime (None if empty or unparseable).
+
+    Common formats take a hand-rolled fast path; odd legacy strings fall back to
+    dateutil (dayfirst). Results are memoized in a bounded LRU cache.
+    Values that are already datetime/date objects (typed columns) are passed through.
+    """
+    if isinstance(date_str, datetime):
+        return date_str
+    if isinstance(date_str, date):
+        return datetime(date_str.year, date_str.month, date_str.day)
+    if not date_str or not isinstance(date_str, str):
+        return None
+    return _parse_date_str(date_str)
+
+
+parse_date.cache_info = _parse_date_str.cache_info
+parse_date.cache_clear = _parse_date_str.cache_clear
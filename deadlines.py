@@ -0,0 +1,121 @@
+"""
+Batas waktu (SOP) per tahapan perkara, dipakai bersama oleh filter overdue,
+kolom deadline di models.py dan script backfill.
+"""
+from datetime import datetime, timedelta
+from dates import parse_date
+
+# Logic untuk Dewasa (default)
+LIMITS_DEWASA = {
+    'spdp': 25,             # Overdue jika: Hari Ini > (Tgl Input + 24 hari) - SPDP 25 hari kalender
+    'berkas_tahap_1': 6,    # Overdue jika: Hari Ini > (Tgl Input + 5 hari) - Berkas Tahap I 6 hari kalender
+    'p18_p19': 10,          # Overdue jika: Hari Ini > (Tgl Input + 9 hari) - P-18/P-19 10 hari kalender
+    'p21': 12,              # Overdue jika: Hari Ini > (Tgl Input + 11 hari) - P-21 12 hari kalender
+    'tahap_2': 7            # Overdue jika: Hari Ini > (Tgl Input + 6 hari) - Tahap II 7 hari kalender
+}
+
+# Logic untuk Anak
+LIMITS_ANAK = {
+    'spdp': 25,             # SPDP tetap 25 hari
+    'berkas_tahap_1': 3,    # Berkas Tahap I 3 hari kalender
+    'p18_p19': 7,           # P-18/P-19 7 hari kalender
+    'p21': 10,              # P-21 10 hari kalender
+    'tahap_2': 5            # Tahap II 5 hari kalender
+}
+
+# Tahapan yang punya batas waktu -> kolom tanggal sumbernya di Case
+STAGE_SOURCE_FIELDS = {
+    'spdp': 'spdp_tgl_terima',
+    'berkas_tahap_1': 'berkas_tahap_1',
+    'p18_p19': 'p18_p19',
+    'p21': 'p21',
+    'tahap_2': 'tahap_2',
+}
+
+# Label tahapan untuk tampilan
+STAGE_LABELS = {
+    'spdp': 'SPDP',
+    'berkas_tahap_1': 'Berkas Tahap I',
+    'p18_p19': 'P-18 / P-19',
+    'p21': 'P-21',
+    'tahap_2': 'Tahap II',
+}
+
+# Kolom tanggal sumber -> tahapan
+SOURCE_FIELD_STAGES = {field: stage for stage, field in STAGE_SOURCE_FIELDS.items()}
+
+
+def get_limits(kategori_umur):
+    """Pilih limits berdasarkan kategori umur (default Dewasa)"""
+    return LIMITS_ANAK if kategori_umur == 'Anak' else LIMITS_DEWASA
+
+
+def deadline_column(stage):
+    """Nama kolom deadline untuk sebuah tahapan, e.g. 'p21' -> 'p21_deadline'"""
+    return f'{stage}_deadline'
+
+
+def compute_deadline(date_obj, stage, kategori_umur='Dewasa'):
+    """
+    Hitung tanggal deadline: tanggal input + (days_limit - 1) hari,
+    karena hari input sudah dihitung sebagai hari ke-1.
+    Returns a date, or None if there is no date or no limit for the stage.
+    """
+    limit = get_limits(kategori_umur).get(stage)
+    if not date_obj or not limit:
+        return None
+    if isinstance(date_obj, datetime):
+        date_obj = date_obj.date()
+    return date_obj + timedelta(days=limit - 1)
+
+
+class CaseStatus:
+    """
+    Precomputed display status for one case row on the dashboard.
+    
+    Attributes:
+        complete: all five stages filled (Case.is_complete)
+        css: stage -> CSS class for its cell ('text-success-bold', 'overdue-cell' or '')
+        days_left: stage -> days until the deadline (negative when late), None without a date
+    """
+    __slots__ = ('complete', 'css', 'days_left')
+
+    def __init__(self, complete, css, days_left):
+        self.complete = complete
+        self.css = css
+        self.days_left = days_left
+
+
+def evaluate_cases(cases, today=None):
+    """
+    Evaluate overdue status for a whole page of cases in one pass.
+    
+    "Today" is computed once, limits are looked up once per case, and the
+    materialized <stage>_deadline columns are used when present (rows that were
+    not backfilled yet fall back to parsing the stage date).
+    
+    Returns:
+        dict: case id -> CaseStatus
+    """
+    today = today or datetime.now().date()
+    statuses = {}
+    for case in cases:
+        complete = bool(case.is_complete)
+        kategori_umur = case.kategori_umur or 'Dewasa'
+        css = {}
+        days_left = {}
+        for stage, field in STAGE_SOURCE_FIELDS.items():
+            deadline = getattr(case, deadline_column(stage), None)
+            if deadline is None:
+                date_obj = parse_date(getattr(case, field + '_dt', None) or getattr(case, field))
+                deadline = compute_deadline(date_obj, stage, kategori_umur)
+            remaining = (deadline - today).days if deadline else None
+            days_left[stage] = remaining
+            if complete:
+                css[stage] = 'text-success-bold'
+            elif remaining is not None and remaining < 0:
+                css[stage] = 'overdue-cell'
+            else:
+                css[stage] = ''
+        statuses[case.id] = CaseStatus(complete, css, days_left)
+    return statuses
@@ -1,7 +1,12 @@
+import os
 import webview
 import sys
 import threading
-from app import app
+
+# Long-running local process: use the pooled engine strategy (see app.get_engine_options)
+os.environ.setdefault('DEPLOYMENT_MODE', 'desktop')
+
+from app import app, init_db, OFFLINE_REPLICA
 import time
 import socket
 
@@ -36,6 +41,12 @@ def start_server(port):
         sys.exit(1)
 
 if __name__ == '__main__':
+    # Offline mode: local SQLite replica + background sync with the central database
+    if OFFLINE_REPLICA:
+        from sync import start_replica
+        start_replica(app)
+    init_db()
+
     # Find a free port
     port = find_free_port()
     print(f"Using port: {port}")
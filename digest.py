@@ -0,0 +1,286 @@
+"""
+Digest harian perkara yang batas waktunya (SOP) jatuh dalam N hari ke depan, dikelompokkan per JPU.
+
+Daftar tenggat yang akan jatuh disimpan di tabel deadline_alert dan diperbarui secara
+inkremental: setiap refresh hanya mengevaluasi ulang perkara yang berubah (updated_at /
+tombstone) sejak refresh terakhir, ditambah tenggat yang baru masuk jendela karena tanggal
+bergeser. Refresh pertama (atau setelah N diubah) membangun ulang semuanya dalam satu
+INSERT ... SELECT.
+
+Digest dikirim lewat SMTP atau ditulis ke file (untuk testing / tanpa server email).
+Bisa dijalankan dari cron (scripts/send_digest.py) atau sebagai thread di dalam proses
+(DIGEST_SCHEDULER=1). Setiap hari hanya dikirim sekali, juga jika ada beberapa worker.
+"""
+import os
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from sqlalchemy import select, insert, delete, update, union_all, literal, or_
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from models import Case, CaseTombstone, DeadlineAlert, DigestState
+from deadlines import STAGE_SOURCE_FIELDS, STAGE_LABELS, deadline_column
+
+DIGEST_DAYS = 3
+DIGEST_HOUR = 7             # jam pengiriman untuk scheduler di dalam proses
+CHECK_INTERVAL = 600        # detik antar pengecekan scheduler
+BATCH_SIZE = 500
+# Evaluasi ulang sedikit ke belakang untuk menutup selisih jam dan transaksi yang commit terlambat
+CHANGE_OVERLAP = timedelta(minutes=5)
+
+STATE_ID = 1
+
+
+def due_statement(start, end, case_ids=None):
+    """(case_id, stage, deadline) of open cases whose stage deadline is within [start, end]"""
+    selects = []
+    for stage in STAGE_SOURCE_FIELDS:
+        column = getattr(Case, deadline_column(stage))
+        stmt = (select(Case.id.label('case_id'), literal(stage).label('stage'), column.label('deadline'))
+                .where(column >= start, column <= end, ~Case.is_complete))
+        if case_ids is not None:
+            stmt = stmt.where(Case.id.in_(case_ids))
+        selects.append(stmt)
+    return union_all(*selects)
+
+
+def _insert_due(start, end, case_ids=None):
+    stmt = insert(DeadlineAlert).from_select(
+        ['case_id', 'stage', 'deadline'], due_statement(start, end, case_ids))
+    return db.session.execute(stmt).rowcount
+
+
+def _chunks(values, size=BATCH_SIZE):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def refresh_alerts(today=None, days=DIGEST_DAYS):
+    """
+    Bring deadline_alert up to date for the window [today, today + days].
+
+    Returns:
+        dict: mode ('full' or 'incremental'), evaluated (changed cases re-checked)
+    """
+    today = today or datetime.now().date()
+    window_end = today + timedelta(days=days)
+    started = datetime.now()
+    state = db.session.get(DigestState, STATE_ID)
+    if state is None:
+        state = DigestState(id=STATE_ID)
+        db.session.add(state)
+
+    full = (state.refreshed_at is None or state.days != days
+            or state.window_end is None or state.window_end > window_end)
+    evaluated = 0
+    if full:
+        db.session.execute(delete(DeadlineAlert))
+        _insert_due(today, window_end)
+    else:
+        # Date boundary: drop deadlines that are now in the past, add the days that entered the window.
+        # Rows in the new range cannot exist yet, everything stored ends at the old window_end.
+        db.session.execute(delete(DeadlineAlert).where(DeadlineAlert.deadline < today))
+        if window_end > state.window_end:
+            _insert_due(state.window_end + timedelta(days=1), window_end)
+
+        # Cases written (or deleted) since the last refresh are re-evaluated from scratch
+        since = state.refreshed_at - CHANGE_OVERLAP
+        changed = db.session.execute(select(Case.id).where(Case.updated_at > since)).scalars().all()
+        deleted = db.session.execute(
+            select(CaseTombstone.case_id).where(CaseTombstone.deleted_at > since)).scalars().all()
+        for chunk in _chunks(list(set(changed) | set(deleted))):
+            db.session.execute(delete(DeadlineAlert).where(DeadlineAlert.case_id.in_(chunk)))
+        for chunk in _chunks(changed):
+            _insert_due(today, window_end, chunk)
+        evaluated = len(changed) + len(deleted)
+
+    state.days = days
+    state.window_end = window_end
+    state.refreshed_at = started
+    db.session.commit()
+    return {'mode': 'full' if full else 'incremental', 'evaluated': evaluated}
+
+
+def collect_digest(today=None):
+    """
+    Returns:
+        list: [{'jpu': ..., 'items': [{case_id, nama_tersangka, kategori_umur, stage, deadline, days_left}]}]
+              sorted by JPU, items by deadline
+    """
+    today = today or datetime.now().date()
+    stmt = (select(Case.id, Case.jpu, Case.nama_tersangka, Case.kategori_umur,
+                   DeadlineAlert.stage, DeadlineAlert.deadline)
+            .join(Case, Case.id == DeadlineAlert.case_id)
+            .where(DeadlineAlert.deadline >= today)
+            .order_by(Case.jpu, DeadlineAlert.deadline, Case.nama_tersangka, Case.id))
+    groups = {}
+    for row in db.session.execute(stmt):
+        groups.setdefault(row.jpu or '', []).append({
+            'case_id': row.id,
+            'nama_tersangka': row.nama_tersangka,
+            'kategori_umur': row.kategori_umur or 'Dewasa',
+            'stage': row.stage,
+            'deadline': row.deadline,
+            'days_left': (row.deadline - today).days,
+        })
+    return [{'jpu': jpu, 'items': items} for jpu, items in sorted(groups.items())]
+
+
+def format_digest(groups, today, days=DIGEST_DAYS):
+    """Plain-text digest: (subject, body)"""
+    total = sum(len(group['items']) for group in groups)
+    subject = f"[E-Kejaksaan] {total} tenggat dalam {days} hari ke depan ({today.strftime('%d-%m-%Y')})"
+    lines = [f"Tenggat SOP yang jatuh antara {today.strftime('%d-%m-%Y')} dan "
+             f"{(today + timedelta(days=days)).strftime('%d-%m-%Y')}:", '']
+    for group in groups:
+        lines.append(f"JPU: {group['jpu'] or '(belum ditentukan)'} ({len(group['items'])})")
+        for item in group['items']:
+            when = 'hari ini' if item['days_left'] == 0 else f"{item['days_left']} hari lagi"
+            lines.append(f"  - {item['nama_tersangka'] or '-'} [{item['kategori_umur']}] "
+                         f"{STAGE_LABELS[item['stage']]}: {item['deadline'].strftime('%d-%m-%Y')} ({when})")
+        lines.append('')
+    return subject, '\n'.join(lines)
+
+
+class FileSink:
+    """Writes each digest to <directory>/digest-YYYY-MM-DD.txt (testing, no mail server)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def send(self, subject, body, today):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"digest-{today.isoformat()}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"Subject: {subject}\n\n{body}")
+        return path
+
+
+class SmtpSink:
+    """Sends each digest as one plain-text email"""
+
+    def __init__(self, host, port=587, username=None, password=None, sender=None, recipients=(),
+                 starttls=True, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.recipients = list(recipients)
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send(self, subject, body, today):
+        message = EmailMessage()
+        message['Subject'] = subject
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message.set_content(body)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+        return ', '.join(self.recipients)
+
+
+def sink_from_config(config):
+    """SMTP sink when DIGEST_SMTP_HOST is set, file sink when DIGEST_DIR is set, else None"""
+    if config.get('DIGEST_SMTP_HOST'):
+        return SmtpSink(config['DIGEST_SMTP_HOST'], config.get('DIGEST_SMTP_PORT', 587),
+                        config.get('DIGEST_SMTP_USER'), config.get('DIGEST_SMTP_PASSWORD'),
+                        config.get('DIGEST_FROM'),
+                        [r.strip() for r in (config.get('DIGEST_TO') or '').split(',') if r.strip()],
+                        starttls=config.get('DIGEST_SMTP_STARTTLS', True))
+    if config.get('DIGEST_DIR'):
+        return FileSink(config['DIGEST_DIR'])
+    return None
+
+
+def _claim_day(today, force=False):
+    """Atomically mark `today` as sent; False if another run (or worker) already did"""
+    stmt = update(DigestState).where(DigestState.id == STATE_ID)
+    if not force:
+        stmt = stmt.where(or_(DigestState.sent_for.is_(None), DigestState.sent_for < today))
+    claimed = db.session.execute(stmt.values(sent_for=today)).rowcount == 1
+    db.session.commit()
+    return claimed
+
+
+def run_digest(sink, today=None, days=DIGEST_DAYS, force=False):
+    """
+    Refresh the alerts and deliver today's digest once.
+
+    Returns:
+        dict: mode, evaluated, cases, jpus, delivered_to (None when nothing was due)
+        None if today's digest was already sent
+    """
+    today = today or datetime.now().date()
+    state = db.session.get(DigestState, STATE_ID)
+    if not force and state is not None and state.sent_for is not None and state.sent_for >= today:
+        return None
+
+    report = refresh_alerts(today, days)
+    previous = db.session.get(DigestState, STATE_ID).sent_for
+    if not _claim_day(today, force):
+        return None
+
+    groups = collect_digest(today)
+    report.update(cases=sum(len(g['items']) for g in groups), jpus=len(groups), delivered_to=None)
+    if not groups:
+        return report
+    try:
+        report['delivered_to'] = sink.send(*format_digest(groups, today, days), today)
+    except Exception:
+        # Not delivered: release the day so the next run retries
+        db.session.execute(update(DigestState).where(DigestState.id == STATE_ID).values(sent_for=previous))
+        db.session.commit()
+        raise
+    return report
+
+
+class DigestScheduler:
+    """In-process daily digest: checks every CHECK_INTERVAL seconds, sends once a day after `hour`"""
+
+    def __init__(self, app, sink, days=DIGEST_DAYS, hour=DIGEST_HOUR, interval=CHECK_INTERVAL):
+        self.app = app
+        self.sink = sink
+        self.days = days
+        self.hour = hour
+        self.interval = interval
+        self.status = {'last_run': None, 'last_report': None, 'last_error': None}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='deadline-digest', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if datetime.now().hour >= self.hour:
+                try:
+                    with self.app.app_context():
+                        report = run_digest(self.sink, days=self.days)
+                    if report is not None:
+                        self.status.update(last_run=datetime.now(), last_report=report, last_error=None)
+                except (SQLAlchemyError, OSError, smtplib.SMTPException) as e:
+                    self.status['last_error'] = str(e).splitlines()[0] if str(e) else repr(e)
+            self._stop.wait(self.interval)
+
+
+def start_digest_scheduler(app):
+    """Start the in-process scheduler from app.config; returns None when no sink is configured"""
+    sink = sink_from_config(app.config)
+    if sink is None:
+        return None
+    scheduler = DigestScheduler(app, sink, days=app.config.get('DIGEST_DAYS', DIGEST_DAYS),
+                                hour=app.config.get('DIGEST_HOUR', DIGEST_HOUR))
+    scheduler.start()
+    app.extensions['deadline_digest'] = scheduler
+    return scheduler
@@ -0,0 +1,222 @@
+"""
+Export perkara ke CSV / XLSX secara streaming.
+
+Baris diambil dari database per batch (yield_per -> server-side cursor di PostgreSQL) dan
+langsung ditulis ke response, jadi memori tetap datar berapa pun jumlah barisnya.
+
+XLSX ditulis langsung sebagai zip berisi SpreadsheetML minimal (inline string, tanpa shared
+strings) ke stream yang tidak bisa di-seek, sehingga juga bisa di-stream tanpa openpyxl.
+Header kolom mengikuti FORMAT.xlsx dan bisa diimpor ulang dengan import_data.py.
+
+Di CSV, teks yang diawali = + - @ (atau tab/CR) diberi awalan ' supaya spreadsheet tidak
+menjalankannya sebagai formula (CSV/formula injection); importer membuang awalan itu lagi saat
+impor ulang. Sel inline string di XLSX tidak pernah dievaluasi, jadi ditulis apa adanya.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime, date
+from xml.sax.saxutils import escape
+from sqlalchemy import select, case as sql_case
+from extensions import db
+from models import Case
+from deadlines import STAGE_SOURCE_FIELDS, STAGE_LABELS
+
+EXPORT_BATCH_SIZE = 1000
+
+# (header, kolom Case) - urutan dan nama kolom seperti FORMAT.xlsx
+EXPORT_COLUMNS = (
+    ('NAMA TERSANGKA', 'nama_tersangka'),
+    ('UMUR', 'umur_tersangka'),
+    ('KATEGORI UMUR', 'kategori_umur'),
+    ('PASAL YANG DISANGKAKAN', 'pasal'),
+    ('JPU', 'jpu'),
+    ('SPDP', 'spdp'),
+    ('TGL TERIMA SPDP', 'spdp_tgl_terima'),
+    ('SPDP_KET_TERIMA', 'spdp_ket_terima'),
+    ('TGL SPDP', 'spdp_tgl_polisi'),
+    ('SPDP_KET_POLISI', 'spdp_ket_polisi'),
+    ('BERKAS TAHAP I', 'berkas_tahap_1'),
+    ('P-18 / P-19', 'p18_p19'),
+    ('P-21', 'p21'),
+    ('TAHAP II', 'tahap_2'),
+    ('LIMPAH PN', 'limpah_pn'),
+    ('KETERANGAN', 'keterangan'),
+)
+
+# Characters XML 1.0 does not allow (Excel refuses the file if they slip in)
+_XML_ILLEGAL_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Leading characters that make Excel / LibreOffice evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def neutralize_formula(value):
+    """Prefix text a spreadsheet would run as a formula with ' so it is shown as text"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def restore_formula(text):
+    """Undo neutralize_formula() for a value read back from an exported file"""
+    if text.startswith("'") and text[1:].startswith(FORMULA_PREFIXES):
+        return text[1:]
+    return text
+
+
+def export_headers(with_flags=False):
+    headers = ['NO'] + [header for header, _ in EXPORT_COLUMNS]
+    if with_flags:
+        headers += [f'TERLAMBAT {STAGE_LABELS[stage].upper()}' for stage in STAGE_SOURCE_FIELDS]
+    return headers
+
+
+def export_statement(filter_stmt=None, with_flags=False, today=None):
+    """
+    SELECT of the export columns, newest first. Overdue flags are computed in SQL from
+    the stored deadline columns, so no Case objects are built.
+
+    Args:
+        filter_stmt: callable(stmt) -> stmt adding WHERE clauses
+    """
+    columns = [getattr(Case, field) for _, field in EXPORT_COLUMNS]
+    if with_flags:
+        columns += [sql_case((Case.overdue_at(stage, today), 1), else_=0).label(f'{stage}_overdue')
+                    for stage in STAGE_SOURCE_FIELDS]
+    stmt = select(*columns)
+    if filter_stmt:
+        stmt = filter_stmt(stmt)
+    return stmt.order_by(Case.created_at.desc(), Case.id.desc())
+
+
+def iter_export_rows(stmt, with_flags=False, batch_size=EXPORT_BATCH_SIZE):
+    """Yield export rows as lists (NO first), fetching `batch_size` rows at a time"""
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    n_fields = len(EXPORT_COLUMNS)
+    number = 0
+    for partition in result.partitions():
+        for row in partition:
+            number += 1
+            values = [number] + ['' if v is None else v for v in row[:n_fields]]
+            if with_flags:
+                values += ['Ya' if flag else '' for flag in row[n_fields:]]
+            yield values
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_csv(headers, rows, batch_size=EXPORT_BATCH_SIZE):
+    """Yield CSV text: a BOM (so Excel reads UTF-8) + header, then one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    for batch in _batched(rows, batch_size):
+        writer.writerows([neutralize_formula(v) for v in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only, unseekable sink: zipfile falls back to data descriptors and we drain the bytes"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_XLSX_STATIC = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+        'relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Perkara" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+        'relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool):
+        value = 'Ya' if value else ''
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        value = value.strftime('%Y-%m-%d %H:%M')
+    elif isinstance(value, date):
+        value = value.isoformat()
+    text = escape(_XML_ILLEGAL_RE.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(v) for v in values) + '</row>'
+
+
+def stream_xlsx(headers, rows, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the bytes of a single-sheet .xlsx, one chunk per batch of rows"""
+    sink = _ZipStream()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetData>' + _xlsx_row(headers)
+            ).encode())
+            yield sink.drain()
+            for batch in _batched(rows, batch_size):
+                sheet.write(''.join(_xlsx_row(values) for values in batch).encode())
+                yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
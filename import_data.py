@@ -1,50 +1,104 @@
-import pandas as pd
+"""
+Import data perkara dari Excel/CSV.
+
+Usage:
+    python import_data.py [FILE] [--dry-run] [--key nama_tersangka,spdp] [--chunk-size N] [--errors errors.csv]
+    python import_data.py [FILE] --append
+
+FILE default: FORMAT.xlsx (butuh openpyxl untuk .xlsx). Default-nya re-import inkremental:
+baris dicocokkan ke perkara yang ada lewat kunci natural, hanya baris baru/berubah yang ditulis.
+--append menambahkan semua baris tanpa pencocokan (paling cepat untuk database kosong).
+"""
+import argparse
+import csv
+import sys
+import time
 from app import app, db
-from models import Case
+from importer import import_file, reimport_file, DEFAULT_CHUNK_SIZE, DEFAULT_KEY_FIELDS
+
+MAX_PRINTED_ERRORS = 20
+MAX_PRINTED_CHANGES = 20
+
+
+def _print_progress(started):
+    def progress(report):
+        elapsed = time.perf_counter() - started
+        rate = report.read / elapsed if elapsed else 0
+        print(f"\r  {report.read} baris dibaca, {report.inserted} baru, {report.updated} berubah, "
+              f"{len(report.errors)} error ({rate:,.0f} baris/detik)", end='', flush=True)
+    return progress
+
 
-def import_excel():
-    excel_file = 'FORMAT.xlsx'
+def _print_diff(report):
+    label = 'akan' if report.dry_run else 'sudah'
+    print(f"  Baru: {report.inserted}, berubah: {report.updated}, tidak berubah: {report.unchanged} ({label} diterapkan)")
+    for row_number, nama in report.new_rows[:MAX_PRINTED_CHANGES]:
+        print(f"  + baris {row_number}: {nama}")
+    for row_number, case_id, fields in report.changes[:MAX_PRINTED_CHANGES]:
+        print(f"  ~ baris {row_number} -> perkara #{case_id}: {', '.join(fields)}")
+    hidden = max(len(report.new_rows) - MAX_PRINTED_CHANGES, 0) + max(len(report.changes) - MAX_PRINTED_CHANGES, 0)
+    if hidden:
+        print(f"  ... dan {hidden} perubahan lainnya")
+
+
+def import_excel(path='FORMAT.xlsx', chunk_size=DEFAULT_CHUNK_SIZE, errors_path=None,
+                 append=False, dry_run=False, key_fields=DEFAULT_KEY_FIELDS):
+    print(f"Importing data from {path}{' (dry run)' if dry_run else ''}...")
+    started = time.perf_counter()
     try:
-        df = pd.read_excel(excel_file)
-        
-        # Check if DB is empty
-        if Case.query.first():
-            print("Database already contains data. Skipping import.")
-            return
-
-        print("Importing data from Excel...")
-        for _, row in df.iterrows():
-            # Handle NaN values
-            def clean(val):
-                if pd.isna(val):
-                    return ""
-                return str(val).strip()
-
-            new_case = Case(
-                nama_tersangka=clean(row.get('NAMA TERSANGKA')),
-                pasal=clean(row.get('PASAL YANG DISANGKAKAN')),
-                spdp=clean(row.get('SPDP')),
-                berkas_tahap_1=clean(row.get('BERKAS TAHAP I')),
-                p18_p19=clean(row.get('P-18 / P-19')),
-                p21=clean(row.get('P-21')),
-                tahap_2=clean(row.get('TAHAP II')),
-                limpah_pn=clean(row.get('LIMPAH PN')),
-                keterangan=clean(row.get('KETERANGAN'))
-            )
-            db.session.add(new_case)
-        
-        db.session.commit()
-        print("Import successful!")
-        
+        if append:
+            report = import_file(path, chunk_size=chunk_size, progress=_print_progress(started))
+        else:
+            report = reimport_file(path, key_fields=key_fields, chunk_size=chunk_size,
+                                   dry_run=dry_run, progress=_print_progress(started))
     except FileNotFoundError:
-        print(f"File {excel_file} not found.")
+        print(f"File {path} not found.")
+        return None
     except Exception as e:
-        print(f"Error during import: {e}")
+        print(f"\nError during import: {e}")
+        return None
+
+    print(f"\n✓ {report.read} baris diproses dalam {time.perf_counter() - started:.1f} detik"
+          f" ({report.blank} baris kosong dilewati)")
+    if append:
+        print(f"  {report.inserted} perkara ditambahkan")
+    else:
+        _print_diff(report)
+    if report.date_warnings:
+        print(f"  {len(report.date_warnings)} sel tanggal tidak bisa di-parse (disimpan sebagai teks)")
+    if report.errors:
+        print(f"✗ {len(report.errors)} baris tidak diimpor:")
+        for row_number, message in report.errors[:MAX_PRINTED_ERRORS]:
+            print(f"  baris {row_number}: {message}")
+        if len(report.errors) > MAX_PRINTED_ERRORS:
+            print(f"  ... dan {len(report.errors) - MAX_PRINTED_ERRORS} lainnya")
+    if errors_path and (report.errors or report.date_warnings):
+        with open(errors_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['baris', 'jenis', 'pesan'])
+            writer.writerows((row, 'error', msg) for row, msg in report.errors)
+            writer.writerows((row, 'tanggal', msg) for row, msg in report.date_warnings)
+        print(f"  Detail ditulis ke {errors_path}")
+    return report
+
 
 if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser(description='Import data perkara dari Excel/CSV')
+    args_parser.add_argument('file', nargs='?', default='FORMAT.xlsx')
+    args_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args_parser.add_argument('--append', action='store_true', help='tambahkan semua baris tanpa pencocokan')
+    args_parser.add_argument('--dry-run', action='store_true', help='tampilkan diff tanpa menulis ke database')
+    args_parser.add_argument('--key', default=','.join(DEFAULT_KEY_FIELDS),
+                             help='kolom kunci natural, dipisah koma (default: %(default)s)')
+    args_parser.add_argument('--errors', help='tulis semua error per baris ke file CSV ini')
+    args = args_parser.parse_args()
+
     with app.app_context():
         db.create_all()
         # Create admin here too just in case
         from app import create_admin
         create_admin()
-        import_excel()
+        report = import_excel(args.file, args.chunk_size, args.errors,
+                              append=args.append, dry_run=args.dry_run,
+                              key_fields=tuple(f.strip() for f in args.key.split(',') if f.strip()))
+    sys.exit(0 if report is not None else 1)
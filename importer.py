@@ -0,0 +1,489 @@
+"""
+Bulk import perkara dari file Excel (.xlsx) atau CSV.
+
+File dibaca baris per baris (openpyxl read-only / csv reader), diproses per chunk sehingga
+memori tetap kecil berapa pun jumlah barisnya. Tiap chunk:
+  - divalidasi dan dinormalisasi (tanggal unik di chunk di-parse sekali saja),
+  - kolom turunan (<field>_dt, <stage>_deadline) dihitung langsung,
+  - di-insert dengan satu statement bulk: COPY di PostgreSQL, executemany di database lain.
+
+Semua chunk berjalan dalam satu transaksi: import gagal = tidak ada data yang masuk.
+Baris yang tidak valid dilewati dan dilaporkan (nomor baris + alasan) di ImportReport.
+
+Re-import (reimport_file): setiap baris dicocokkan ke Case lewat kunci natural
+(default nama tersangka + SPDP, disimpan sebagai hash di Case.import_key) dan hash isi baris
+(Case.import_hash). Baris baru di-insert, baris yang isinya berubah di-update, sisanya dilewati,
+jadi file mingguan yang sama bisa diimpor ulang tanpa duplikat. dry_run=True hanya melaporkan diff.
+
+Setiap perkara baru dan kolom yang berubah dicatat di audit trail (case_audit), per chunk di
+transaksi yang sama.
+"""
+import csv
+import hashlib
+import io
+import os
+import re
+import uuid
+from datetime import date, datetime
+from extensions import db
+from sqlalchemy import select, bindparam, or_
+from models import Case, STAGE_DATE_FIELDS, IMPORT_FIELDS, compute_stage_columns, natural_key
+from dates import parse_date
+from deadlines import STAGE_SOURCE_FIELDS, compute_deadline, deadline_column
+from pagination import invalidate_case_count
+from summary import invalidate_summary
+from sync import record_bulk_changes
+from audit import entry as audit_entry, write_entries, current_username
+from exporter import restore_formula
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # optional: only needed for .xlsx
+    load_workbook = None
+
+DEFAULT_CHUNK_SIZE = 1000
+# Kolom yang mengidentifikasi satu perkara di file import (kunci natural)
+DEFAULT_KEY_FIELDS = ('nama_tersangka', 'spdp')
+
+# Header kolom di file -> kolom Case. Nama kolom Case sendiri (mis. export CSV) juga diterima.
+COLUMN_ALIASES = {
+    'NAMA TERSANGKA': 'nama_tersangka',
+    'UMUR': 'umur_tersangka',
+    'UMUR TERSANGKA': 'umur_tersangka',
+    'KATEGORI': 'kategori_umur',
+    'KATEGORI UMUR': 'kategori_umur',
+    'PASAL': 'pasal',
+    'PASAL YANG DISANGKAKAN': 'pasal',
+    'JPU': 'jpu',
+    'SPDP': 'spdp',
+    'TGL TERIMA SPDP': 'spdp_tgl_terima',
+    'TGL SPDP': 'spdp_tgl_polisi',
+    'BERKAS TAHAP I': 'berkas_tahap_1',
+    'P-18 / P-19': 'p18_p19',
+    'P-21': 'p21',
+    'TAHAP II': 'tahap_2',
+    'LIMPAH PN': 'limpah_pn',
+    'KETERANGAN': 'keterangan',
+}
+for _field in IMPORT_FIELDS:
+    COLUMN_ALIASES.setdefault(_field.upper(), _field)
+
+TEXT_FIELDS = tuple(f for f in IMPORT_FIELDS if f != 'umur_tersangka')
+# Maximum length of each String column, checked here so one bad row can't abort a COPY
+FIELD_LENGTHS = {
+    f: Case.__table__.c[f].type.length for f in TEXT_FIELDS if getattr(Case.__table__.c[f].type, 'length', None)
+}
+INSERT_COLUMNS = (
+    list(IMPORT_FIELDS)
+    + [f + '_dt' for f in STAGE_DATE_FIELDS]
+    + [deadline_column(stage) for stage in STAGE_SOURCE_FIELDS]
+    + ['uid', 'created_at', 'updated_at', 'import_key', 'import_key_fields', 'import_hash']
+)
+
+_WS_RE = re.compile(r'\s+')
+_UMUR_RE = re.compile(r'^(\d{1,3})(\.0+)?(\s*(th|thn|tahun))?$', re.IGNORECASE)
+
+
+class ImportReport:
+    """Outcome of import_file: counters plus (row number, message) for every skipped row"""
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.blank = 0
+        self.errors = []
+        self.date_warnings = []  # date cells kept as text because they couldn't be parsed
+        # Re-import only
+        self.updated = 0
+        self.unchanged = 0
+        self.new_rows = []  # (row number, nama_tersangka)
+        self.changes = []   # (row number, case id, [changed fields])
+        self.dry_run = False
+
+    def error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    def __repr__(self):
+        return (f'<ImportReport read={self.read} inserted={self.inserted} updated={self.updated} '
+                f'unchanged={self.unchanged} blank={self.blank} errors={len(self.errors)}>')
+
+
+def normalize_header(value):
+    return _WS_RE.sub(' ', str(value or '')).strip().upper()
+
+
+def _iter_xlsx(path):
+    if load_workbook is None:
+        raise RuntimeError('Import .xlsx butuh openpyxl: pip install openpyxl')
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def iter_records(path):
+    """
+    Stream (row_number, {field: raw value}) from an .xlsx/.csv file, row 1 being the header.
+    Unknown columns are ignored.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    rows = _iter_xlsx(path) if ext in ('.xlsx', '.xlsm') else _iter_csv(path)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = [(i, COLUMN_ALIASES.get(normalize_header(name))) for i, name in enumerate(header)]
+    columns = [(i, field) for i, field in columns if field]
+    if not columns:
+        raise ValueError(f'Tidak ada kolom yang dikenali di header: {list(header)}')
+    for row_number, row in enumerate(rows, start=2):
+        yield row_number, {field: row[i] if i < len(row) else None for i, field in columns}
+
+
+def _text(value):
+    """Cell value -> stripped string ('' for empty), dates written the way the date modal does"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d' if value.time() == datetime.min.time() else '%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return restore_formula(str(value)).strip()
+
+
+def _clean_record(raw):
+    """Normalize one record; returns (values, error message or None)"""
+    values = {field: _text(raw.get(field)) for field in TEXT_FIELDS}
+    if not any(values.values()) and not _text(raw.get('umur_tersangka')):
+        return None, None  # blank line
+
+    umur = _text(raw.get('umur_tersangka'))
+    if umur:
+        match = _UMUR_RE.match(umur)
+        if not match:
+            return None, f'umur_tersangka tidak valid: {umur!r}'
+        values['umur_tersangka'] = int(match.group(1))
+    else:
+        values['umur_tersangka'] = None
+
+    kategori = values['kategori_umur'].capitalize() or 'Dewasa'
+    if kategori not in ('Dewasa', 'Anak'):
+        return None, f'kategori_umur harus Dewasa atau Anak: {values["kategori_umur"]!r}'
+    values['kategori_umur'] = kategori
+
+    for field, length in FIELD_LENGTHS.items():
+        if len(values[field]) > length:
+            return None, f'{field} lebih dari {length} karakter'
+    return values, None
+
+
+def row_key(values, key_fields=DEFAULT_KEY_FIELDS):
+    """Hash of the natural key, ignoring case and repeated whitespace"""
+    return natural_key(_text(values.get(f)) for f in key_fields)
+
+
+def row_hash(values, fields):
+    """Hash of a normalized row's content over the columns present in the file"""
+    raw = '\x1f'.join(f'{f}={"" if values[f] is None else values[f]}' for f in fields)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def clean_chunk(records, report, key_fields=DEFAULT_KEY_FIELDS, seen_keys=None):
+    """
+    Validate a chunk of (row_number, raw) records; returns (row_number, values) pairs
+    with import_key/import_hash set. With `seen_keys`, a row whose natural key already
+    appeared earlier in the file is reported and skipped.
+    """
+    rows = []
+    for row_number, raw in records:
+        report.read += 1
+        values, error = _clean_record(raw)
+        if error:
+            report.error(row_number, error)
+        elif values is None:
+            report.blank += 1
+        else:
+            values['import_key'] = row_key(values, key_fields)
+            values['import_key_fields'] = ','.join(key_fields)
+            values['import_hash'] = row_hash(values, [f for f in IMPORT_FIELDS if f in raw])
+            if seen_keys is not None:
+                if values['import_key'] in seen_keys:
+                    report.error(row_number, f'duplikat kunci {"/".join(key_fields)} di file')
+                    continue
+                seen_keys.add(values['import_key'])
+            rows.append((row_number, values))
+    return rows
+
+
+def derive_columns(rows, report, now=None):
+    """
+    Add the derived date/deadline columns and insert metadata to cleaned rows.
+
+    Distinct date strings in the chunk are parsed once and shared by all rows
+    (historical files repeat the same dates a lot).
+    """
+    now = now or datetime.now()
+    distinct = {values[f] for _, values in rows for f in STAGE_DATE_FIELDS if values[f]}
+    parsed = {text: parse_date(text) for text in distinct}
+
+    for row_number, values in rows:
+        for field in STAGE_DATE_FIELDS:
+            text = values[field]
+            values[field + '_dt'] = parsed.get(text) if text else None
+            if text and values[field + '_dt'] is None:
+                report.date_warnings.append((row_number, f'{field} bukan tanggal: {text!r}'))
+        for stage, field in STAGE_SOURCE_FIELDS.items():
+            values[deadline_column(stage)] = compute_deadline(
+                values[field + '_dt'], stage, values['kategori_umur'])
+        values['uid'] = uuid.uuid4().hex
+        values['created_at'] = values['updated_at'] = now
+    return rows
+
+
+def prepare_chunk(records, report, now=None):
+    """Validate a chunk of (row_number, raw) records; returns insert-ready (row_number, values) pairs"""
+    return derive_columns(clean_chunk(records, report), report, now)
+
+
+def _copy_rows(connection, rows):
+    """PostgreSQL: stream the chunk through COPY ... FROM STDIN (CSV)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for values in rows:
+        writer.writerow(['\\N' if values[c] is None else values[c] for c in INSERT_COLUMNS])
+    buffer.seek(0)
+    table = connection.dialect.identifier_preparer.format_table(Case.__table__)
+    columns = ', '.join(INSERT_COLUMNS)
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    finally:
+        cursor.close()
+
+
+def insert_rows(connection, rows):
+    """Insert prepared rows with one bulk statement"""
+    if not rows:
+        return
+    if connection.dialect.name == 'postgresql':
+        _copy_rows(connection, rows)
+    else:
+        connection.execute(Case.__table__.insert(), rows)  # executemany
+
+
+def _chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _audit_username(username):
+    return username or current_username() or 'import'
+
+
+def _audit_inserts(connection, rows, username, now):
+    """One 'create' audit entry per inserted case (ids looked up by uid, COPY returns none)"""
+    if not rows:
+        return
+    table = Case.__table__
+    ids = connection.execute(
+        select(table.c.id).where(table.c.uid.in_([values['uid'] for values in rows]))).scalars().all()
+    write_entries(connection, [audit_entry(case_id, 'create', username=username, changed_at=now)
+                               for case_id in ids])
+
+
+def import_file(path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, username=None):
+    """
+    Import every valid row of `path` in one transaction.
+
+    Args:
+        progress: optional callable(report) called after each chunk
+        username: recorded in the audit trail (default: logged-in user, else 'import')
+
+    Returns:
+        ImportReport
+    """
+    report = ImportReport()
+    username = _audit_username(username)
+    connection = db.session.connection()
+    try:
+        for chunk in _chunks(iter_records(path), chunk_size):
+            rows = [values for _, values in prepare_chunk(chunk, report)]
+            insert_rows(connection, rows)
+            _audit_inserts(connection, rows, username, datetime.now())
+            record_bulk_changes(db.session, [values['uid'] for values in rows])
+            report.inserted += len(rows)
+            if progress:
+                progress(report)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    invalidate_case_count()
+    invalidate_summary()
+    return report
+
+
+def assign_import_keys(connection, key_fields=DEFAULT_KEY_FIELDS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Fill Case.import_key for cases created outside the importer, and rebuild keys that were
+    hashed from other key columns (an earlier --key), so re-import can match every case
+    """
+    table = Case.__table__
+    definition = ','.join(key_fields)
+    stmt = table.update().where(table.c.id == bindparam('_id'))
+    stale = or_(table.c.import_key.is_(None), table.c.import_key_fields.is_(None),
+                table.c.import_key_fields != definition)
+    assigned = 0
+    while True:
+        rows = connection.execute(
+            select(table.c.id, *[table.c[f] for f in key_fields])
+            .where(stale).order_by(table.c.id).limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            return assigned
+        connection.execute(stmt, [
+            {'_id': row['id'], 'import_key': row_key(row, key_fields), 'import_key_fields': definition}
+            for row in rows
+        ])
+        assigned += len(rows)
+
+
+def _normalized_db_value(field, value):
+    if field == 'umur_tersangka':
+        return value
+    if field == 'kategori_umur':
+        return (value or 'Dewasa').capitalize()
+    return _text(value)
+
+
+def _apply_chunk(connection, rows, report, present, now, username):
+    """Split prepared rows into inserts, updates and unchanged; write them unless dry run"""
+    table = Case.__table__
+    matches = {}
+    for match in connection.execute(
+        select(table.c.id, table.c.uid, table.c.import_key, table.c.import_hash)
+        .where(table.c.import_key.in_({values['import_key'] for _, values in rows}))
+        .order_by(table.c.id)
+    ):
+        matches.setdefault(match.import_key, match)  # duplicates in the DB: oldest case wins
+
+    inserts, candidates = [], []
+    for row_number, values in rows:
+        match = matches.get(values['import_key'])
+        if match is None:
+            inserts.append((row_number, values))
+            report.new_rows.append((row_number, values['nama_tersangka']))
+        elif match.import_hash == values['import_hash']:
+            report.unchanged += 1
+        else:
+            candidates.append((row_number, match, values))
+
+    updates, stamps, audits = [], [], []
+    if candidates:
+        # Only rows whose hash differs are loaded, to find out which columns really changed
+        current = {row['id']: row for row in connection.execute(
+            select(table.c.id, *[table.c[f] for f in IMPORT_FIELDS])
+            .where(table.c.id.in_([match.id for _, match, _ in candidates]))
+        ).mappings()}
+        for row_number, match, values in candidates:
+            existing = current[match.id]
+            changed = [f for f in present if _normalized_db_value(f, existing[f]) != values[f]]
+            if not changed:
+                # Same content, just never imported from this file layout: remember the hash
+                stamps.append({'_id': match.id, 'import_hash': values['import_hash']})
+                report.unchanged += 1
+                continue
+            merged = dict(existing)
+            merged.update({f: values[f] for f in present})
+            params = {f: values[f] for f in present}
+            params.update(compute_stage_columns(merged))
+            params.update({'_id': match.id, 'import_hash': values['import_hash'], 'updated_at': now})
+            updates.append((match.uid, params))
+            audits += [audit_entry(match.id, 'update', f, existing[f], values[f], username, now) for f in changed]
+            report.changes.append((row_number, match.id, changed))
+        report.updated += len(updates)
+
+    # Dates are parsed only for rows that will actually be written
+    inserts = [values for _, values in derive_columns(inserts, report, now)]
+    report.inserted += len(inserts)
+    if report.dry_run:
+        return
+    insert_rows(connection, inserts)
+    update = table.update().where(table.c.id == bindparam('_id'))
+    if updates:
+        connection.execute(update, [params for _, params in updates])  # executemany
+    if stamps:
+        connection.execute(update, stamps)
+    _audit_inserts(connection, inserts, username, now)
+    write_entries(connection, audits)
+    record_bulk_changes(db.session, [values['uid'] for values in inserts] + [uid for uid, _ in updates])
+
+
+def reimport_file(path, key_fields=DEFAULT_KEY_FIELDS, chunk_size=DEFAULT_CHUNK_SIZE,
+                  dry_run=False, progress=None, username=None):
+    """
+    Incrementally sync `path` into the database: insert new rows, update changed rows,
+    skip unchanged rows. Only the columns present in the file are compared and written.
+
+    Args:
+        key_fields: columns forming the natural key of a case
+        dry_run: compute the diff (report.new_rows / report.changes) without writing
+        username: recorded in the audit trail (default: logged-in user, else 'import')
+
+    Returns:
+        ImportReport
+    """
+    unknown = [f for f in key_fields if f not in IMPORT_FIELDS]
+    if unknown:
+        raise ValueError(f'Kolom kunci tidak dikenal: {unknown}')
+
+    report = ImportReport()
+    report.dry_run = dry_run
+    username = _audit_username(username)
+    connection = db.session.connection()
+    seen_keys = set()
+    present = None
+    try:
+        assign_import_keys(connection, key_fields, chunk_size)
+        for chunk in _chunks(iter_records(path), chunk_size):
+            if present is None:
+                present = [f for f in IMPORT_FIELDS if f in chunk[0][1]]
+                missing = [f for f in key_fields if f not in present]
+                if missing:
+                    raise ValueError(f'Kolom kunci tidak ada di file: {missing}')
+            rows = clean_chunk(chunk, report, key_fields, seen_keys)
+            if rows:
+                _apply_chunk(connection, rows, report, present, datetime.now(), username)
+            if progress:
+                progress(report)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    if report.inserted and not dry_run:
+        invalidate_case_count()
+    if (report.inserted or report.updated) and not dry_run:
+        invalidate_summary()
+    return report
@@ -0,0 +1,288 @@
+"""
+Metrik aplikasi dalam format teks Prometheus (/metrics).
+
+Per endpoint Flask dicatat: jumlah request per status, histogram latensi, dan dari event
+SQLAlchemy jumlah query, total waktu SQL, checkout koneksi pool serta waktu membuka koneksi
+baru (handshake ke database / pooler). Waktu render template Jinja dicatat dari signal Flask.
+Dengan begitu waktu request bisa dipecah: pooler (connect), SQL, Jinja, sisanya Python.
+
+Biayanya kecil: beberapa perf_counter dan penambahan dictionary per request/query, tanpa
+library tambahan. Nilai disimpan per proses; dengan beberapa worker gunicorn setiap scrape
+melihat worker yang kebetulan melayaninya (label `pid` membedakannya).
+"""
+import os
+import threading
+import time
+from flask import request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+# Batas bucket histogram latensi request (detik)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Query per request: N+1 terlihat sebagai pergeseran ke bucket atas
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+BACKGROUND = '(background)'    # query di luar request: audit writer, relay, digest
+UNMATCHED = '(unmatched)'      # 404 / method tidak cocok dengan route mana pun
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.type = 'counter'
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, _labels(self.labels, key), value) for key, value in items]
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.type = 'histogram'
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._values = {}  # labels -> [bucket counts..., sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-1] += value
+
+    def count(self, labels=()):
+        counts = self._values.get(labels)
+        return sum(counts[:-1]) if counts else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(counts)) for key, counts in self._values.items())
+        samples = []
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', _labels(self.labels, key, [('le', _number(bound))]), cumulative))
+            samples.append((f'{self.name}_sum', _labels(self.labels, key), counts[-1]))
+            samples.append((f'{self.name}_count', _labels(self.labels, key), cumulative))
+        return samples
+
+
+class RequestStats:
+    """Work done on behalf of the current request (one per request thread)"""
+    __slots__ = ('started', 'status', 'queries', 'sql_seconds', 'checkouts', 'connects',
+                 'connect_seconds', 'template_seconds', 'template_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.status = None
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.checkouts = 0
+        self.connects = 0
+        self.connect_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_started = []
+
+
+class Metrics:
+    """Flask + SQLAlchemy instrumentation; render() produces the Prometheus exposition text"""
+
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self._local = threading.local()
+        self.requests = Counter('http_requests_total', 'Requests by endpoint, method and status',
+                                ('endpoint', 'method', 'status'))
+        self.latency = Histogram('http_request_duration_seconds', 'Request latency by endpoint',
+                                 ('endpoint',))
+        self.queries = Counter('db_queries_total', 'SQL statements executed', ('endpoint',))
+        self.queries_per_request = Histogram('db_queries_per_request', 'SQL statements per request',
+                                             ('endpoint',), QUERY_BUCKETS)
+        self.sql_seconds = Counter('db_query_duration_seconds_total', 'Time spent executing SQL',
+                                   ('endpoint',))
+        self.checkouts = Counter('db_connection_checkouts_total', 'Connections checked out of the pool',
+                                 ('endpoint',))
+        self.connects = Counter('db_connections_opened_total', 'New database connections opened',
+                                ('endpoint',))
+        self.connect_seconds = Counter('db_connect_duration_seconds_total',
+                                       'Time spent opening new database connections (handshake, pooler)',
+                                       ('endpoint',))
+        self.template_seconds = Counter('template_render_duration_seconds_total',
+                                        'Time spent rendering Jinja templates', ('endpoint',))
+        self.errors = Counter('app_handled_errors_total',
+                              'Exceptions caught by a route that fell back instead of failing', ('endpoint',))
+        self.families = [self.requests, self.latency, self.queries, self.queries_per_request,
+                         self.sql_seconds, self.checkouts, self.connects, self.connect_seconds,
+                         self.template_seconds, self.errors]
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        # Class-level listeners cover every engine and pool, including ones created later
+        event.listen(Engine, 'before_cursor_execute', self._before_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_execute)
+        event.listen(Engine, 'do_connect', self._before_connect)
+        event.listen(Pool, 'connect', self._after_connect)
+        event.listen(Pool, 'checkout', self._checkout)
+
+    # --- request lifecycle -------------------------------------------------
+
+    def _stats(self):
+        return getattr(self._local, 'stats', None)
+
+    def _before_request(self):
+        self._local.stats = RequestStats()
+
+    def _after_request(self, response):
+        stats = self._stats()
+        if stats is not None:
+            stats.status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        stats = self._stats()
+        if stats is None:
+            return
+        self._local.stats = None
+        endpoint = request.endpoint or UNMATCHED
+        status = stats.status or 500
+        key = (endpoint,)
+        self.requests.inc((endpoint, request.method, str(status)))
+        self.latency.observe(time.perf_counter() - stats.started, key)
+        self.queries_per_request.observe(stats.queries, key)
+        if stats.queries:
+            self.queries.inc(key, stats.queries)
+            self.sql_seconds.inc(key, stats.sql_seconds)
+        if stats.checkouts:
+            self.checkouts.inc(key, stats.checkouts)
+        if stats.connects:
+            self.connects.inc(key, stats.connects)
+            self.connect_seconds.inc(key, stats.connect_seconds)
+        if stats.template_seconds:
+            self.template_seconds.inc(key, stats.template_seconds)
+
+    def record_error(self):
+        """Count an exception a route handled itself (it would otherwise only be printed)"""
+        self.errors.inc((request.endpoint or UNMATCHED,))
+
+    # --- templates ---------------------------------------------------------
+
+    def _template_started(self, sender, template, context, **extra):
+        stats = self._stats()
+        if stats is not None:
+            stats.template_started.append(time.perf_counter())
+
+    def _template_finished(self, sender, template, context, **extra):
+        stats = self._stats()
+        if stats is not None and stats.template_started:
+            elapsed = time.perf_counter() - stats.template_started.pop()
+            if not stats.template_started:  # nested includes are part of the outer render
+                stats.template_seconds += elapsed
+
+    # --- SQLAlchemy --------------------------------------------------------
+    # Outside a request (background threads, scripts) the work is counted right away under
+    # BACKGROUND; inside a request it is summed on RequestStats and recorded at teardown.
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        stats = self._stats()
+        if stats is None:
+            self.queries.inc((BACKGROUND,))
+            self.sql_seconds.inc((BACKGROUND,), elapsed)
+        else:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+
+    def _before_connect(self, dialect, conn_rec, cargs, cparams):
+        conn_rec.info['metrics_connect_started'] = time.perf_counter()
+
+    def _after_connect(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop('metrics_connect_started', None)
+        elapsed = time.perf_counter() - started if started is not None else 0.0
+        stats = self._stats()
+        if stats is None:
+            self.connects.inc((BACKGROUND,))
+            self.connect_seconds.inc((BACKGROUND,), elapsed)
+        else:
+            stats.connects += 1
+            stats.connect_seconds += elapsed
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        stats = self._stats()
+        if stats is None:
+            self.checkouts.inc((BACKGROUND,))
+        else:
+            stats.checkouts += 1
+
+    # --- exposition --------------------------------------------------------
+
+    def render(self, engine=None):
+        """Prometheus text format (version 0.0.4)"""
+        lines = []
+        pid = (('pid', os.getpid()),)
+        for family in self.families:
+            lines.append(f'# HELP {family.name} {family.help}')
+            lines.append(f'# TYPE {family.name} {family.type}')
+            for name, labels, value in family.samples():
+                lines.append(f'{name}{labels} {_number(value)}')
+        pool = engine.pool if engine is not None else None
+        # QueuePool only; NullPool (serverless) has no pool to report
+        if pool is not None and hasattr(pool, 'checkedout'):
+            for name, help, value in (('db_pool_size', 'Configured pool size', pool.size()),
+                                      ('db_pool_checked_out', 'Connections currently checked out', pool.checkedout()),
+                                      ('db_pool_overflow', 'Connections open beyond the pool size', pool.overflow())):
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} gauge', f'{name}{_labels((), (), pid)} {value}']
+        lines += ['# HELP process_info Worker process serving this scrape', '# TYPE process_info gauge',
+                  f'process_info{_labels((), (), pid)} 1']
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
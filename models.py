@@ -1,6 +1,35 @@
 from extensions import db
 from flask_login import UserMixin
 from datetime import datetime
+import hashlib
+import re
+import uuid
+from sqlalchemy import and_
+from sqlalchemy.ext.hybrid import hybrid_property
+from dates import parse_date
+from deadlines import STAGE_SOURCE_FIELDS, SOURCE_FIELD_STAGES, compute_deadline, deadline_column
+
+# Kolom tanggal tahapan yang masih disimpan sebagai string (legacy).
+# Setiap kolom punya pasangan kolom DateTime bertipe dengan akhiran _dt.
+STAGE_DATE_FIELDS = (
+    'spdp_tgl_terima', 'spdp_tgl_polisi', 'berkas_tahap_1',
+    'p18_p19', 'p21', 'tahap_2', 'limpah_pn'
+)
+
+# Kolom yang dibaca importer.py dari file; kunci natural re-import (--key) dipilih dari sini
+IMPORT_FIELDS = (
+    'nama_tersangka', 'umur_tersangka', 'kategori_umur', 'pasal', 'jpu', 'spdp',
+    'spdp_tgl_terima', 'spdp_ket_terima', 'spdp_tgl_polisi', 'spdp_ket_polisi',
+    'berkas_tahap_1', 'p18_p19', 'p21', 'tahap_2', 'limpah_pn', 'keterangan'
+)
+
+_WS_RE = re.compile(r'\s+')
+
+
+def natural_key(texts):
+    """Hash of the natural key values of a case, ignoring case and repeated whitespace"""
+    raw = '\x1f'.join(_WS_RE.sub(' ', text).lower() for text in texts)
+    return hashlib.sha1(raw.encode()).hexdigest()
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -31,10 +60,42 @@ class Case(db.Model):
     limpah_pn = db.Column(db.String(200))
     keterangan = db.Column(db.Text)
     
+    # Typed copies of the stage dates, parsed once on write (see _sync_stage_date)
+    spdp_tgl_terima_dt = db.Column(db.DateTime)
+    spdp_tgl_polisi_dt = db.Column(db.DateTime)
+    berkas_tahap_1_dt = db.Column(db.DateTime)
+    p18_p19_dt = db.Column(db.DateTime)
+    p21_dt = db.Column(db.DateTime)
+    tahap_2_dt = db.Column(db.DateTime)
+    limpah_pn_dt = db.Column(db.DateTime)
+    
+    # Materialized SOP deadlines per stage (stage date + limit - 1), see _refresh_deadline.
+    # Indexed so "overdue at stage X" is a range scan: <stage>_deadline < today
+    spdp_deadline = db.Column(db.Date, index=True)
+    berkas_tahap_1_deadline = db.Column(db.Date, index=True)
+    p18_p19_deadline = db.Column(db.Date, index=True)
+    p21_deadline = db.Column(db.Date, index=True)
+    tahap_2_deadline = db.Column(db.Date, index=True)
+    
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, index=True)
+    # Global identity shared by the central DB and desktop replicas (local ids may differ)
+    uid = db.Column(db.String(32), unique=True, default=lambda: uuid.uuid4().hex)
+    # Re-import (importer.py): hash of the natural key and of the last imported row content
+    import_key = db.Column(db.String(40), index=True)
+    # Key columns import_key was hashed from (e.g. "nama_tersangka,spdp"); another --key rebuilds it
+    import_key_fields = db.Column(db.String(200))
+    import_hash = db.Column(db.String(40))
+
+    __table_args__ = (
+        # Backs keyset pagination on the dashboard (newest first)
+        db.Index('ix_case_created_at_id', created_at.desc(), id.desc()),
+        # Backs the change feed (/api/changes): WHERE (updated_at, id) > cursor ORDER BY updated_at, id
+        db.Index('ix_case_updated_at_id', updated_at, id),
+    )
 
-    @property
+    @hybrid_property
     def is_complete(self):
         """Check if SPDP, Tahap 1, P18/19, P21, and Tahap 2 are all filled"""
         return all([
@@ -45,6 +106,19 @@ class Case(db.Model):
             self.tahap_2
         ])
 
+    @is_complete.expression
+    def is_complete(cls):
+        return and_(*[
+            and_(column.isnot(None), column != '')
+            for column in (cls.spdp_tgl_terima, cls.berkas_tahap_1, cls.p18_p19, cls.p21, cls.tahap_2)
+        ])
+
+    @classmethod
+    def overdue_at(cls, stage, today=None):
+        """SQL predicate: case is still open and its deadline for `stage` has passed"""
+        today = today or datetime.now().date()
+        return and_(getattr(cls, deadline_column(stage)) < today, ~cls.is_complete)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -61,3 +135,109 @@ class Case(db.Model):
             'limpah_pn': self.limpah_pn,
             'keterangan': self.keterangan
         }
+
+
+class CaseTombstone(db.Model):
+    """Record of a deleted Case, so replicas and clients can learn about deletes"""
+    id = db.Column(db.Integer, primary_key=True)
+    uid = db.Column(db.String(32), index=True)
+    case_id = db.Column(db.Integer)
+    deleted_at = db.Column(db.DateTime, default=datetime.now, index=True)
+
+
+class CaseAudit(db.Model):
+    """Append-only history of case changes (written in batches by audit.py)"""
+    __tablename__ = 'case_audit'
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)   # create / update / delete
+    field = db.Column(db.String(50))                    # None for create / delete
+    old_value = db.Column(db.Text)                      # delete: JSON snapshot of the case
+    new_value = db.Column(db.Text)
+    username = db.Column(db.String(150))
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    # Per-case history, newest first
+    __table_args__ = (db.Index('ix_case_audit_case_id_id', 'case_id', 'id'),)
+
+
+class DeadlineAlert(db.Model):
+    """A stage deadline falling inside the digest window, maintained incrementally by digest.py"""
+    __tablename__ = 'deadline_alert'
+    case_id = db.Column(db.Integer, primary_key=True)
+    stage = db.Column(db.String(20), primary_key=True)
+    deadline = db.Column(db.Date, index=True)
+
+
+class DigestState(db.Model):
+    """Single row: where the last digest refresh left off and which day was already sent"""
+    __tablename__ = 'digest_state'
+    id = db.Column(db.Integer, primary_key=True)
+    days = db.Column(db.Integer)
+    window_end = db.Column(db.Date)
+    refreshed_at = db.Column(db.DateTime)
+    sent_for = db.Column(db.Date)
+
+
+@db.event.listens_for(Case, 'after_delete')
+def _record_tombstone(mapper, connection, target):
+    connection.execute(CaseTombstone.__table__.insert().values(
+        uid=target.uid, case_id=target.id, deleted_at=datetime.now()
+    ))
+
+
+def _sync_stage_date(field):
+    """Keep <field>_dt in sync whenever the legacy string column is assigned"""
+    def listener(target, value, oldvalue, initiator):
+        setattr(target, field + '_dt', parse_date(value))
+    return listener
+
+for _field in STAGE_DATE_FIELDS:
+    db.event.listen(getattr(Case, _field), 'set', _sync_stage_date(_field))
+
+
+def _refresh_deadline(stage):
+    """Recompute <stage>_deadline whenever the typed stage date is assigned"""
+    def listener(target, value, oldvalue, initiator):
+        setattr(target, deadline_column(stage), compute_deadline(value, stage, target.kategori_umur))
+    return listener
+
+for _field, _stage in SOURCE_FIELD_STAGES.items():
+    db.event.listen(getattr(Case, _field + '_dt'), 'set', _refresh_deadline(_stage))
+
+
+@db.event.listens_for(Case.kategori_umur, 'set')
+def _refresh_all_deadlines(target, value, oldvalue, initiator):
+    """Limits differ for Dewasa/Anak, so every deadline moves with kategori_umur"""
+    for stage, field in STAGE_SOURCE_FIELDS.items():
+        setattr(target, deadline_column(stage), compute_deadline(getattr(target, field + '_dt'), stage, value))
+
+
+def _refresh_import_key(field):
+    """Re-hash import_key when a column of its natural key is assigned (inline edit), so re-import still matches"""
+    def listener(target, value, oldvalue, initiator):
+        if not target.import_key_fields:
+            return
+        key_fields = target.import_key_fields.split(',')
+        if field not in key_fields:
+            return
+        values = (value if name == field else getattr(target, name) for name in key_fields)
+        target.import_key = natural_key('' if v is None else str(v).strip() for v in values)
+    return listener
+
+for _field in IMPORT_FIELDS:
+    db.event.listen(getattr(Case, _field), 'set', _refresh_import_key(_field))
+
+
+def compute_stage_columns(values):
+    """
+    Derived columns (<field>_dt and <stage>_deadline) for a plain dict of Case values.
+    Used by Core/bulk write paths that bypass the attribute listeners above.
+    """
+    derived = {}
+    for field in STAGE_DATE_FIELDS:
+        derived[field + '_dt'] = parse_date(values.get(field))
+    for stage, field in STAGE_SOURCE_FIELDS.items():
+        derived[deadline_column(stage)] = compute_deadline(
+            derived[field + '_dt'], stage, values.get('kategori_umur'))
+    return derived
@@ -0,0 +1,120 @@
+"""
+Pagination untuk dashboard.
+
+Keyset (seek): cursor membawa (created_at, id) dari baris terakhir/pertama di halaman, sehingga
+halaman berikutnya diambil dengan WHERE (created_at, id) < cursor memakai index
+ix_case_created_at_id, tanpa OFFSET dan tanpa COUNT(*). Halaman ke-N sama murahnya dengan halaman 1.
+
+Pagination bernomor: total perkara disimpan di cache (lihat case_count) supaya COUNT(*)
+tidak dijalankan di setiap request.
+"""
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+from extensions import db
+from models import Case
+from cache import TTLCache
+
+
+def encode_cursor(created_at, case_id):
+    """Opaque, URL-safe cursor for a (created_at, id) position"""
+    raw = f"{created_at.isoformat()}|{case_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; returns None for missing or malformed cursors"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, case_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(case_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPagination:
+    """Result of keyset_paginate, exposing what the dashboard template needs"""
+
+    def __init__(self, items, per_page, start, has_prev, has_next):
+        self.items = items
+        self.per_page = per_page
+        self.start = start  # number of rows before this page, for the NO column
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.prev_cursor = encode_cursor(items[0].created_at, items[0].id) if items else None
+        self.next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if items else None
+
+
+def keyset_paginate(query, model, per_page, after=None, before=None, start=0):
+    """
+    Page through `query` newest-first by (created_at, id).
+    
+    Args:
+        after: cursor of the last row of the previous page (go forward)
+        before: cursor of the first row of the next page (go back)
+        start: rows before the requested page, carried along only for display
+    """
+    order_key = tuple_(model.created_at, model.id)
+    after, before = decode_cursor(after), decode_cursor(before)
+
+    if before:
+        # Walk backwards in ascending order, then flip to newest-first
+        rows = (query.filter(order_key > tuple_(*before))
+                .order_by(model.created_at.asc(), model.id.asc())
+                .limit(per_page + 1).all())
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        return KeysetPagination(items, per_page, max(start, 0), has_prev, True)
+
+    if after:
+        query = query.filter(order_key < tuple_(*after))
+    rows = (query.order_by(model.created_at.desc(), model.id.desc())
+            .limit(per_page + 1).all())
+    return KeysetPagination(rows[:per_page], per_page, max(start, 0), bool(after), len(rows) > per_page)
+
+
+# ---------------------------------------------------------------------------
+# Total perkara untuk header pagination bernomor
+# ---------------------------------------------------------------------------
+
+_count_cache = TTLCache(ttl=30)
+
+
+def _estimated_case_count():
+    """
+    Planner estimate from pg_class on PostgreSQL, None on other databases.
+
+    reltuples is -1 (PostgreSQL 14+) or 0 (older) until the table is first vacuumed/analyzed.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    return db.session.execute(db.text(
+        "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"
+    ), {'table': f'"{Case.__tablename__}"'}).scalar()
+
+
+def case_count(mode='exact', ttl=None):
+    """
+    Total number of cases, cached for a short TTL.
+    
+    Args:
+        mode: 'exact' runs COUNT(*); 'approximate' reads the planner estimate on
+              PostgreSQL and falls back to COUNT(*) elsewhere (e.g. SQLite) or when
+              the estimate is missing or not positive (table never analyzed)
+        ttl: cache lifetime in seconds (defaults to 30)
+    """
+    def compute():
+        if mode == 'approximate':
+            estimate = _estimated_case_count()
+            if estimate is not None and estimate > 0:
+                return estimate
+        return db.session.query(db.func.count(Case.id)).scalar()
+
+    return _count_cache.get_or_set(mode, compute, ttl)
+
+
+def invalidate_case_count():
+    """Call after inserting or deleting cases"""
+    _count_cache.clear()
@@ -0,0 +1,116 @@
+"""
+Cache fragmen HTML baris tabel dashboard (isi _case_cells.html).
+
+Kuncinya (versi template, id perkara, updated_at, tanggal hari ini): setiap penulisan menaikkan
+updated_at, jadi fragmen lama tidak pernah dipakai lagi dan tidak perlu di-invalidate; tanggal
+di kunci menjaga warna overdue tetap benar setelah tengah malam. Dashboard hanya me-render
+baris yang belum ada di cache.
+
+Per worker: LRU di memori (ROW_CACHE_SIZE fragmen). Opsional, ROW_CACHE_URL=redis://...
+membagi fragmen antar worker gunicorn (butuh `pip install redis`); LRU lokal tetap dipakai
+di depannya.
+"""
+import hashlib
+from datetime import datetime
+from flask import current_app, render_template
+from markupsafe import Markup
+from cache import LRUCache
+from deadlines import evaluate_cases
+
+try:
+    import redis
+except ImportError:  # optional: only needed for a shared cache (ROW_CACHE_URL)
+    redis = None
+
+ROW_CACHE_SIZE = 5000
+# Shared fragments expire on their own: keys of old versions / past days are never read again
+SHARED_TTL = 2 * 24 * 3600
+CELLS_TEMPLATE = '_case_cells.html'
+
+
+class RedisFragmentStore:
+    """Fragments shared by every worker, stored with an expiry"""
+
+    def __init__(self, url, ttl=SHARED_TTL, prefix='rowcache:'):
+        if redis is None:
+            raise RuntimeError('ROW_CACHE_URL butuh package redis (pip install redis)')
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get_many(self, keys):
+        values = self.client.mget([self.prefix + key for key in keys])
+        return {key: value.decode('utf-8') for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, mapping):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.setex(self.prefix + key, self.ttl, value)
+        pipe.execute()
+
+
+class RowCache:
+    """Local LRU in front of an optional shared store; counts hits/misses for tuning"""
+
+    def __init__(self, maxsize=ROW_CACHE_SIZE, shared=None):
+        self.local = LRUCache(maxsize)
+        self.shared = shared
+        self.stats = {'hits': 0, 'misses': 0}
+        self._template_version = None
+
+    def init_app(self, app):
+        self.local = LRUCache(app.config.get('ROW_CACHE_SIZE', ROW_CACHE_SIZE))
+        if app.config.get('ROW_CACHE_URL'):
+            self.shared = RedisFragmentStore(app.config['ROW_CACHE_URL'])
+
+    def get_many(self, keys):
+        found = self.local.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing and self.shared is not None:
+            shared = self.shared.get_many(missing)
+            self.local.set_many(shared)
+            found.update(shared)
+        return found
+
+    def set_many(self, mapping):
+        self.local.set_many(mapping)
+        if self.shared is not None:
+            self.shared.set_many(mapping)
+
+    def template_version(self):
+        """Short hash of the cells template, so a deploy never serves fragments of the old markup"""
+        if self._template_version is None:
+            source, _, _ = current_app.jinja_loader.get_source(current_app.jinja_env, CELLS_TEMPLATE)
+            self._template_version = hashlib.sha1(source.encode('utf-8')).hexdigest()[:8]
+        return self._template_version
+
+    def key(self, case, today):
+        if case.updated_at is None:
+            return None  # no version to key on (legacy row): always rendered
+        return f'{self.template_version()}:{case.id}:{case.updated_at.isoformat()}:{today.isoformat()}'
+
+    def render(self, cases, today=None):
+        """
+        Cells HTML for each case, rendering (and evaluating deadlines for) only the cache misses.
+
+        Returns:
+            dict: case id -> Markup
+        """
+        today = today or datetime.now().date()
+        keys = {case.id: self.key(case, today) for case in cases}
+        cached = self.get_many([key for key in keys.values() if key])
+        missing = [case for case in cases if keys[case.id] not in cached]
+        self.stats['hits'] += len(cases) - len(missing)
+        self.stats['misses'] += len(missing)
+
+        rendered = {}
+        if missing:
+            statuses = evaluate_cases(missing, today)
+            for case in missing:
+                rendered[case.id] = render_template(CELLS_TEMPLATE, case=case, status=statuses[case.id])
+            self.set_many({keys[case_id]: html for case_id, html in rendered.items() if keys[case_id]})
+        return {case.id: Markup(rendered[case.id] if case.id in rendered else cached[keys[case.id]])
+                for case in cases}
+
+
+row_cache = RowCache()
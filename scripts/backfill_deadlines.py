@@ -0,0 +1,76 @@
+"""
+Script untuk menghitung ulang kolom deadline per tahapan (<stage>_deadline)
+dari kolom tanggal bertipe (<field>_dt) dan kategori_umur.
+
+Jalankan setelah backfill_stage_dates.py, atau setelah batas waktu SOP di deadlines.py diubah.
+Diproses per chunk (berdasarkan id); hanya baris yang berubah yang di-update.
+
+Usage: python scripts/backfill_deadlines.py [chunk_size]
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, update
+from app import app, db
+from models import Case
+from deadlines import STAGE_SOURCE_FIELDS, compute_deadline, deadline_column
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def backfill_deadlines(chunk_size=DEFAULT_CHUNK_SIZE, verbose=True):
+    """
+    Recompute every stage deadline, chunk by chunk.
+
+    Returns:
+        int: number of rows whose deadlines changed
+    """
+    columns = [Case.id, Case.kategori_umur]
+    for stage, field in STAGE_SOURCE_FIELDS.items():
+        columns += [getattr(Case, field + '_dt'), getattr(Case, deadline_column(stage))]
+
+    last_id = 0
+    updated = 0
+
+    while True:
+        rows = db.session.execute(
+            select(*columns).where(Case.id > last_id).order_by(Case.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+
+        params = []
+        for row in rows:
+            values = {}
+            for stage, field in STAGE_SOURCE_FIELDS.items():
+                deadline = compute_deadline(getattr(row, field + '_dt'), stage, row.kategori_umur)
+                if deadline != getattr(row, deadline_column(stage)):
+                    values[deadline_column(stage)] = deadline
+            if values:
+                params.append({'id': row.id, **values})
+
+        if params:
+            db.session.execute(update(Case), params)
+        db.session.commit()
+
+        updated += len(params)
+        last_id = rows[-1].id
+        if verbose:
+            print(f"  ... processed up to id {last_id} ({updated} rows updated)")
+
+    return updated
+
+
+if __name__ == '__main__':
+    chunk_size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CHUNK_SIZE
+    with app.app_context():
+        try:
+            print(f"Recomputing stage deadlines (chunk size {chunk_size})...")
+            updated = backfill_deadlines(chunk_size)
+            print(f"✓ {updated} rows updated")
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            db.session.rollback()
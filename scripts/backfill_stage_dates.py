@@ -0,0 +1,108 @@
+"""
+Script untuk mengisi kolom tanggal bertipe (<field>_dt) dari kolom string legacy.
+
+Diproses per chunk (berdasarkan id) dengan commit per chunk, jadi aman dijalankan
+saat aplikasi sedang dipakai. Nilai yang tidak bisa di-parse dilaporkan di akhir.
+Setelah itu kolom deadline per tahapan dihitung ulang (lihat backfill_deadlines.py).
+
+Usage: python scripts/backfill_stage_dates.py [chunk_size]
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, update, or_, and_
+from app import app, db
+from models import Case, STAGE_DATE_FIELDS
+from dates import parse_date
+from scripts.sync_schema import sync_schema
+from scripts.backfill_deadlines import backfill_deadlines
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _pending_filter():
+    """Rows where a legacy string is filled but its typed column is still empty"""
+    return or_(*[
+        and_(getattr(Case, field).isnot(None),
+             getattr(Case, field) != '',
+             getattr(Case, field + '_dt').is_(None))
+        for field in STAGE_DATE_FIELDS
+    ])
+
+
+def backfill_stage_dates(chunk_size=DEFAULT_CHUNK_SIZE, verbose=True):
+    """
+    Parse legacy stage strings into the typed columns, chunk by chunk.
+
+    Returns:
+        tuple: (number of rows updated, list of (case_id, field, value) that could not be parsed)
+    """
+    columns = [Case.id]
+    for field in STAGE_DATE_FIELDS:
+        columns += [getattr(Case, field), getattr(Case, field + '_dt')]
+
+    last_id = 0
+    updated = 0
+    unparseable = []
+
+    while True:
+        rows = db.session.execute(
+            select(*columns)
+            .where(Case.id > last_id, _pending_filter())
+            .order_by(Case.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+
+        params = []
+        for row in rows:
+            values = {}
+            for field in STAGE_DATE_FIELDS:
+                raw = getattr(row, field)
+                if not raw or getattr(row, field + '_dt') is not None:
+                    continue
+                parsed = parse_date(raw)
+                if parsed is None:
+                    unparseable.append((row.id, field, raw))
+                else:
+                    values[field + '_dt'] = parsed
+            if values:
+                params.append({'id': row.id, **values})
+
+        if params:
+            # ORM bulk UPDATE by primary key (executemany)
+            db.session.execute(update(Case), params)
+        db.session.commit()
+
+        updated += len(params)
+        last_id = rows[-1].id
+        if verbose:
+            print(f"  ... processed up to id {last_id} ({updated} rows updated)")
+
+    return updated, unparseable
+
+
+if __name__ == '__main__':
+    chunk_size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CHUNK_SIZE
+    with app.app_context():
+        try:
+            sync_schema()
+
+            print(f"Backfilling stage dates (chunk size {chunk_size})...")
+            updated, unparseable = backfill_stage_dates(chunk_size)
+            print(f"✓ {updated} rows updated")
+
+            if unparseable:
+                print(f"✗ {len(unparseable)} values could not be parsed:")
+                for case_id, field, value in unparseable:
+                    print(f"   - case {case_id} {field}: {value!r}")
+
+            print("Recomputing stage deadlines...")
+            print(f"✓ {backfill_deadlines(chunk_size, verbose=False)} rows updated")
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            db.session.rollback()
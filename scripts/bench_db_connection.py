@@ -0,0 +1,55 @@
+"""
+Benchmark overhead koneksi per request untuk setiap strategi engine
+(serverless/NullPool, server/QueuePool, desktop/QueuePool kecil).
+
+Setiap "request" = checkout koneksi + SELECT 1 + kembalikan koneksi, seperti satu
+request Flask yang menjalankan satu query. Jalankan terhadap database lokal
+(mis. PostgreSQL di localhost) supaya yang terukur adalah biaya handshake, bukan latensi internet.
+
+Usage: python scripts/bench_db_connection.py [requests] [database_url]
+"""
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, text
+from app import get_database_url, get_engine_options
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def bench_mode(database_url, mode, requests):
+    engine = create_engine(database_url, **get_engine_options(database_url, mode))
+    timings = []
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            with engine.connect() as conn:
+                conn.execute(text('SELECT 1')).scalar()
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        engine.dispose()
+    timings.sort()
+    return {
+        'pool': engine.pool.__class__.__name__,
+        'mean': sum(timings) / len(timings),
+        'p50': percentile(timings, 50),
+        'p99': percentile(timings, 99),
+    }
+
+
+if __name__ == '__main__':
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    database_url = sys.argv[2] if len(sys.argv) > 2 else get_database_url()
+
+    print(f"Connection overhead per request ({requests} requests) on {database_url.split('@')[-1]}")
+    print(f"  {'mode':<12} {'pool':<12} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode in ('serverless', 'server', 'desktop'):
+        result = bench_mode(database_url, mode, requests)
+        print(f"  {mode:<12} {result['pool']:<12} {result['mean']:9.3f} {result['p50']:9.3f} {result['p99']:9.3f}")
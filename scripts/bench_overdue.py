@@ -0,0 +1,63 @@
+"""
+Micro-benchmark evaluasi overdue untuk satu halaman dashboard:
+filter Jinja check_overdue per cell (cara lama) vs evaluate_cases per halaman.
+Objek Case dibuat di memori, tidak butuh data di database.
+
+Usage: python scripts/bench_overdue.py [per_page]
+"""
+import sys
+import os
+import timeit
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, check_overdue
+from models import Case
+from deadlines import evaluate_cases
+
+STAGES = (('spdp', 'spdp_tgl_terima'), ('berkas_tahap_1', 'berkas_tahap_1'),
+          ('p18_p19', 'p18_p19'), ('p21', 'p21'), ('tahap_2', 'tahap_2'))
+
+
+def sample_cases(count):
+    today = datetime.now()
+    cases = []
+    for i in range(count):
+        values = {field: (today - timedelta(days=(i * (n + 3)) % 40)).strftime('%Y-%m-%d')
+                  for n, (_, field) in enumerate(STAGES) if (i + n) % 6}
+        case = Case(id=i + 1, kategori_umur='Anak' if i % 4 == 0 else 'Dewasa', **values)
+        cases.append(case)
+    return cases
+
+
+def per_cell(cases):
+    """What dashboard.html used to do: is_complete ~10x and check_overdue 5x per row"""
+    result = []
+    for case in cases:
+        row = []
+        for _ in range(5):
+            case.is_complete
+        for stage, field in STAGES:
+            if case.is_complete:
+                row.append('text-success-bold')
+            else:
+                row.append(check_overdue(getattr(case, field), stage, case.kategori_umur or 'Dewasa'))
+        result.append(row)
+    return result
+
+
+if __name__ == '__main__':
+    per_page = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    number = 50
+    with app.app_context():
+        cases = sample_cases(per_page)
+
+        old = timeit.timeit(lambda: per_cell(cases), number=number) / number * 1000
+        new = timeit.timeit(lambda: evaluate_cases(cases), number=number) / number * 1000
+
+        print(f"Overdue evaluation for per_page={per_page}, {number} runs")
+        print(f"  check_overdue per cell:  {old:7.3f} ms/page")
+        print(f"  evaluate_cases batch:    {new:7.3f} ms/page")
+        print(f"  speedup:                 {old / new:7.1f}x")
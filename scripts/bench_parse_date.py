@@ -0,0 +1,54 @@
+"""
+Micro-benchmark parse_date: parser dateutil lama vs fast path (tanpa cache) vs fast path + LRU cache.
+Tidak butuh database.
+
+Usage: python scripts/bench_parse_date.py [rows]
+"""
+import sys
+import os
+import timeit
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dates import parse_date, _parse_date_dateutil, _parse_date_fast
+
+
+def sample_values(rows):
+    """Simulate a dashboard page: 5 date cells per row in the formats the app stores"""
+    base = datetime(2024, 1, 1)
+    formats = ['%Y-%m-%d', '%Y-%m-%d %H:%M', '%d-%m-%Y', '%d/%m/%Y', '%Y-%m-%d']
+    values = []
+    for i in range(rows):
+        day = base + timedelta(days=i % 365, hours=i % 24)
+        values += [day.strftime(fmt) for fmt in formats]
+    return values
+
+
+def bench(label, func, values, number):
+    seconds = timeit.timeit(lambda: [func(v) for v in values], number=number)
+    per_call = seconds / (number * len(values)) * 1e6
+    print(f"  {label:<28} {per_call:8.2f} µs/call")
+    return per_call
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    values = sample_values(rows)
+    number = 20
+
+    mismatches = [v for v in values if parse_date(v) != _parse_date_dateutil(v)]
+    if mismatches:
+        print(f"✗ {len(mismatches)} values differ from dateutil, e.g. {mismatches[:3]}")
+        sys.exit(1)
+
+    print(f"parse_date on {len(values)} values ({rows} rows x 5 date cells), {number} runs")
+    slow = bench('dateutil (previous)', _parse_date_dateutil, values, number)
+    fast = bench('fast path, no cache', lambda v: _parse_date_fast(v) or _parse_date_dateutil(v), values, number)
+    parse_date.cache_clear()
+    cached = bench('fast path + LRU cache', parse_date, values, number)
+
+    print(f"\n  speedup fast path:   {slow / fast:6.1f}x")
+    print(f"  speedup with cache:  {slow / cached:6.1f}x")
+    print(f"  cache: {parse_date.cache_info()}")
@@ -0,0 +1,328 @@
+"""
+Benchmark suite jalur-jalur panas aplikasi, dibandingkan dengan baseline yang disimpan.
+
+Micro: parse_date, filter check_overdue. Macro (lewat Flask test client, termasuk routing,
+login session, query dan render template): dashboard untuk setiap per_page, update_cell,
+add_case, login (hash scrypt) dan import CSV (importer.import_file, dipakai import_data.py).
+Setiap benchmark dilaporkan sebagai ops/detik dan latensi p50/p99 per operasi.
+
+Tanpa --database dipakai database SQLite sementara yang di-seed dengan --rows perkara, jadi hasil
+antar run bisa dibandingkan. Dengan --database (mis. PostgreSQL lokal) data benchmark ditandai
+"Bench ..." dan dihapus lagi di akhir. Jangan jalankan terhadap database produksi.
+
+Baseline: --save-baseline menyimpan hasil ke file JSON; run berikutnya membandingkan p50 dengan
+baseline itu dan keluar dengan kode 1 bila ada yang lebih lambat dari --threshold (default 25%).
+Baseline hanya bermakna di mesin dan database yang sama.
+
+Usage: python scripts/bench_suite.py [--database URL] [--rows N] [--only NAME,...] [--quick]
+                                     [--baseline FILE] [--save-baseline] [--threshold 0.25]
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(SCRIPTS_DIR, '..'))
+
+# Add parent directory to path
+sys.path.insert(0, ROOT_DIR)
+
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'bench_baseline.json')
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_ROWS = 5000
+IMPORT_ROWS = 1000
+PER_PAGE_OPTIONS = (10, 30, 50, 100)
+BENCH_PREFIX = 'Bench '
+
+STAGE_FIELDS = ('spdp_tgl_terima', 'berkas_tahap_1', 'p18_p19', 'p21', 'tahap_2')
+
+
+def expect(condition, message):
+    """Fail the benchmark when a request doesn't do what it should (timings would be meaningless)"""
+    if not condition:
+        raise RuntimeError(message)
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples):
+    """ops/sec and p50/p99 latency (ms) of per-operation timings in seconds"""
+    timings = sorted(samples)
+    return {
+        'ops': len(timings),
+        'ops_per_sec': len(timings) / sum(timings) if sum(timings) else float('inf'),
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+    }
+
+
+def measure(func, iterations, warmup=3, batch=1):
+    """
+    Time `iterations` calls of func; each call performs `batch` operations.
+
+    Returns:
+        list: seconds per operation, one entry per call
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) / batch)
+    return samples
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare p50 latency with the baseline.
+
+    Returns:
+        dict: name -> (status, change) with status 'regression', 'faster', 'ok' or 'new';
+              change is the relative p50 difference (None for 'new')
+    """
+    verdicts = {}
+    for name, result in results.items():
+        base = (baseline or {}).get(name)
+        if not base or not base.get('p50_ms'):
+            verdicts[name] = ('new', None)
+            continue
+        change = result['p50_ms'] / base['p50_ms'] - 1
+        if change > threshold:
+            verdicts[name] = ('regression', change)
+        elif change < -threshold:
+            verdicts[name] = ('faster', change)
+        else:
+            verdicts[name] = ('ok', change)
+    return verdicts
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(path, results, database):
+    data = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.node(),
+        'database': database,
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def write_cases_csv(path, rows, label='Seed'):
+    """CSV in the import format with `rows` cases spread over the last 60 days"""
+    today = datetime.now()
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('nama_tersangka', 'umur_tersangka', 'kategori_umur', 'pasal', 'jpu') + STAGE_FIELDS)
+        for i in range(rows):
+            dates = [(today - timedelta(days=(i * (n + 3)) % 60)).strftime('%Y-%m-%d') if (i + n) % 6 else ''
+                     for n in range(len(STAGE_FIELDS))]
+            writer.writerow([f'{BENCH_PREFIX}{label} {i}', 15 + i % 40, 'Anak' if i % 4 == 0 else 'Dewasa',
+                             f'Pasal {300 + i % 80} KUHP', f'JPU {i % 12}'] + dates)
+
+
+def seed(rows, workdir):
+    """Import bench cases until the table holds at least `rows` cases"""
+    from app import db
+    from models import Case
+    from importer import import_file
+
+    missing = rows - db.session.query(Case.id).count()
+    if missing > 0:
+        path = os.path.join(workdir, 'seed.csv')
+        write_cases_csv(path, missing)
+        import_file(path, username='bench')
+    return db.session.query(Case.id).order_by(Case.id).limit(100).all()
+
+
+def cleanup():
+    """Remove the cases (and their audit entries) created by the suite"""
+    from app import db
+    from models import Case, CaseAudit
+    from audit import audit_log
+
+    audit_log.flush()
+    ids = db.session.query(Case.id).filter(Case.nama_tersangka.like(f'{BENCH_PREFIX}%'))
+    db.session.query(CaseAudit).filter(CaseAudit.case_id.in_(ids.scalar_subquery())).delete(synchronize_session=False)
+    removed = ids.delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+
+def build_benchmarks(client, case_ids, workdir, username, password, quick=False):
+    """
+    Ordered list of (name, func, iterations, batch).
+    """
+    from app import app, check_overdue
+    from dates import parse_date
+    from bench_parse_date import sample_values
+    from bench_overdue import sample_cases, STAGES
+
+    scale = 5 if quick else 1
+    benchmarks = []
+
+    # Micro: cold cache each batch, otherwise this only measures LRU hits
+    values = sample_values(100)
+
+    def parse_cold():
+        parse_date.cache_clear()
+        return [parse_date(v) for v in values]
+    benchmarks.append(('parse_date', parse_cold, 200 // scale, len(values)))
+
+    with app.app_context():
+        cases = sample_cases(100)
+    cells = [(getattr(case, field), stage, case.kategori_umur) for case in cases for stage, field in STAGES]
+    benchmarks.append(('check_overdue', lambda: [check_overdue(*cell) for cell in cells],
+                       200 // scale, len(cells)))
+
+    # Macro: full requests through the test client. The dashboard is measured warm (row cache
+    # filled by the warmup requests), which is what users see between edits
+    def get(url):
+        def run():
+            response = client.get(url)
+            expect(response.status_code == 200, f'{url}: HTTP {response.status_code}')
+        return run
+
+    for per_page in PER_PAGE_OPTIONS:
+        benchmarks.append((f'dashboard_per_page_{per_page}', get(f'/dashboard?per_page={per_page}'),
+                           100 // scale, 1))
+
+    counter = iter(range(10 ** 9))
+
+    def update_cell():
+        i = next(counter)
+        response = client.post('/update_cell', json={
+            'id': case_ids[i % len(case_ids)], 'field': 'keterangan', 'value': f'bench {i}'})
+        expect(response.get_json()['success'], f'update_cell: {response.get_json()}')
+    benchmarks.append(('update_cell', update_cell, 200 // scale, 1))
+
+    def add_case():
+        i = next(counter)
+        response = client.post('/add_case', data={
+            'nama_tersangka': f'{BENCH_PREFIX}Add {i}', 'umur_tersangka': '30', 'kategori_umur': 'Dewasa',
+            'pasal': 'Pasal 362 KUHP', 'jpu': 'JPU Bench', 'spdp_tgl_terima': '2024-01-15'})
+        expect(response.status_code == 302, f'add_case: HTTP {response.status_code}')
+    benchmarks.append(('add_case', add_case, 100 // scale, 1))
+
+    def login():
+        fresh = app.test_client()
+        response = fresh.post('/login', data={'username': username, 'password': password})
+        expect(response.status_code == 302 and '/login' not in response.location, 'login failed')
+    benchmarks.append(('login_scrypt', login, 20 // scale, 1))
+
+    import_path = os.path.join(workdir, 'import.csv')
+    write_cases_csv(import_path, IMPORT_ROWS // scale, label='Import')
+
+    def import_csv():
+        from importer import import_file
+        with app.app_context():
+            import_file(import_path, username='bench')
+    # One op = one file; rows/sec = ops_per_sec * rows
+    benchmarks.append((f'import_data_{IMPORT_ROWS // scale}_rows', import_csv, 10 // scale, 1))
+    return benchmarks
+
+
+def run_suite(args, workdir):
+    from app import app, db, init_db
+
+    init_db()
+    with app.app_context():
+        case_ids = [row.id for row in seed(args.rows, workdir)]
+
+    client = app.test_client()
+    response = client.post('/login', data={'username': args.username, 'password': args.password})
+    if response.status_code != 302 or '/login' in response.location:
+        raise RuntimeError(f'Login as {args.username} failed')
+
+    only = set(args.only.split(',')) if args.only else None
+    results = {}
+    for name, func, iterations, batch in build_benchmarks(client, case_ids, workdir, args.username,
+                                                          args.password, args.quick):
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = summarize(measure(func, max(iterations, 2), warmup=1 if args.quick else 3, batch=batch))
+        print(f"  ✓ {name}", flush=True)
+
+    if args.database:
+        with app.app_context():
+            print(f"  {cleanup()} bench cases removed")
+    return results
+
+
+def print_report(results, verdicts, baseline):
+    print(f"\n  {'benchmark':<28} {'ops/sec':>12} {'p50 ms':>10} {'p99 ms':>10} {'baseline p50':>13} {'change':>8}")
+    for name, result in results.items():
+        status, change = verdicts[name]
+        base = (baseline or {}).get(name, {}).get('p50_ms')
+        base_text = f"{base:13.3f}" if base else f"{'-':>13}"
+        change_text = f"{change:+8.0%}" if change is not None else f"{'new':>8}"
+        flag = {'regression': '  ✗ slower', 'faster': '  faster'}.get(status, '')
+        print(f"  {name:<28} {result['ops_per_sec']:12,.1f} {result['p50_ms']:10.3f} {result['p99_ms']:10.3f}"
+              f" {base_text} {change_text}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite jalur panas dengan perbandingan baseline')
+    parser.add_argument('--database', help='database URL (default: SQLite sementara yang di-seed)')
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help='jumlah perkara minimal di database')
+    parser.add_argument('--only', help='hanya benchmark dengan awalan nama ini (dipisah koma)')
+    parser.add_argument('--quick', action='store_true', help='iterasi lebih sedikit (smoke test, bukan untuk baseline)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='simpan hasil run ini sebagai baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='p50 lebih lambat dari ini (relatif) dihitung regresi')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='12345')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Must be set before app is imported: the engine is configured at import time
+        os.environ['DATABASE_URL'] = args.database or 'sqlite:///' + os.path.join(workdir, 'bench.db')
+        database = args.database.split('://')[0] if args.database else 'sqlite (temporary)'
+        print(f"Benchmark suite on {database}, {args.rows} cases{' (quick)' if args.quick else ''}")
+        try:
+            results = run_suite(args, workdir)
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            return 1
+
+    stored = load_baseline(args.baseline)
+    baseline = stored['results'] if stored else None
+    verdicts = compare(results, baseline, args.threshold)
+    print_report(results, verdicts, baseline)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, {**(baseline or {}), **results}, database)
+        print(f"\n✓ Baseline saved to {args.baseline}")
+        return 0
+    if stored is None:
+        print(f"\n  No baseline at {args.baseline} yet; run with --save-baseline to store one")
+        return 0
+    regressions = [name for name, (status, _) in verdicts.items() if status == 'regression']
+    if regressions:
+        print(f"\n✗ {len(regressions)} regression(s) over {args.threshold:.0%} vs baseline "
+              f"({stored['created_at']}): {', '.join(regressions)}")
+        return 1
+    print(f"\n✓ No regressions over {args.threshold:.0%} vs baseline ({stored['created_at']})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
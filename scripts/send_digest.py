@@ -0,0 +1,61 @@
+"""
+Script untuk mengirim digest harian tenggat SOP yang akan jatuh, per JPU (lihat digest.py).
+
+Jalankan dari cron / Task Scheduler sekali sehari; digest untuk hari yang sama hanya dikirim
+sekali (pakai --force untuk mengirim ulang). Tujuan pengiriman dari .env (DIGEST_SMTP_HOST
+atau DIGEST_DIR), atau --dir untuk menulis ke folder, atau --print untuk menampilkan saja.
+
+Usage: python scripts/send_digest.py [--days N] [--dir DIR | --print] [--force]
+"""
+import argparse
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+from app import app, db
+from digest import FileSink, sink_from_config, run_digest, refresh_alerts, collect_digest, format_digest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kirim digest tenggat SOP per JPU')
+    parser.add_argument('--days', type=int, default=app.config['DIGEST_DAYS'])
+    parser.add_argument('--dir', help='tulis digest ke folder ini (mengabaikan SMTP)')
+    parser.add_argument('--print', action='store_true', help='tampilkan digest tanpa mengirim')
+    parser.add_argument('--force', action='store_true', help='kirim ulang walaupun hari ini sudah terkirim')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        if args.print:
+            today = datetime.now().date()
+            report = refresh_alerts(today, args.days)
+            subject, body = format_digest(collect_digest(today), today, args.days)
+            print(f"Subject: {subject}\n\n{body}")
+            print(f"(refresh {report['mode']}, {report['evaluated']} perkara dievaluasi ulang)")
+            return 0
+
+        sink = FileSink(args.dir) if args.dir else sink_from_config(app.config)
+        if sink is None:
+            print("✗ Set DIGEST_SMTP_HOST atau DIGEST_DIR di .env, atau pakai --dir / --print")
+            return 1
+        try:
+            report = run_digest(sink, days=args.days, force=args.force)
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            return 1
+
+    if report is None:
+        print("✓ Digest hari ini sudah terkirim (pakai --force untuk mengirim ulang)")
+    elif report['delivered_to'] is None:
+        print(f"✓ Tidak ada tenggat dalam {args.days} hari ke depan, tidak ada yang dikirim")
+    else:
+        print(f"✓ {report['cases']} tenggat untuk {report['jpus']} JPU dikirim ke {report['delivered_to']}"
+              f" (refresh {report['mode']}, {report['evaluated']} perkara dievaluasi ulang)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Script untuk menambahkan kolom dan index baru dari models.py ke database yang sudah ada.
+
+db.create_all() hanya membuat tabel yang belum ada, tidak mengubah tabel lama.
+Script ini menambahkan kolom yang belum ada via ALTER TABLE dan membuat index yang belum ada.
+Kolom unique (mis. case.uid) yang ditambahkan belakangan dibuatkan unique index; jika datanya
+sudah berisi duplikat, script berhenti dan menampilkan nilainya supaya dibereskan dulu.
+Aman dijalankan berulang kali.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, db
+from search import ensure_search_index
+
+
+class DuplicateValuesError(Exception):
+    """A column that must be unique already holds duplicate values"""
+
+
+def _has_unique(inspector, table_name, column_name):
+    """True if a unique constraint or unique index covers exactly this column"""
+    for constraint in inspector.get_unique_constraints(table_name):
+        if constraint['column_names'] == [column_name]:
+            return True
+    for index in inspector.get_indexes(table_name):
+        if index.get('unique') and index['column_names'] == [column_name]:
+            return True
+    return False
+
+
+def ensure_unique_indexes(conn, inspector, table):
+    """
+    Create a unique index for every unique=True column that has none yet (ADD COLUMN can't add it).
+
+    Raises:
+        DuplicateValuesError: if the existing data would violate the index
+    """
+    created = []
+    for column in table.columns:
+        if not column.unique or _has_unique(inspector, table.name, column.name):
+            continue
+        duplicates = conn.execute(
+            db.select(column, db.func.count()).where(column.isnot(None))
+            .group_by(column).having(db.func.count() > 1).limit(10)
+        ).all()
+        if duplicates:
+            sample = ', '.join(f'{value!r} ({count}x)' for value, count in duplicates)
+            raise DuplicateValuesError(
+                f"{table.name}.{column.name} has duplicate values, fix them before syncing: {sample}")
+        index = db.Index(f'uq_{table.name}_{column.name}', column, unique=True)
+        index.create(conn, checkfirst=True)
+        created.append(f'{table.name}.{column.name}')
+    return created
+
+
+def sync_schema():
+    """Add missing columns and indexes for every model table"""
+    db.create_all()
+    inspector = db.inspect(db.engine)
+    dialect = db.engine.dialect
+    quote = dialect.identifier_preparer.quote
+    added = []
+
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=dialect)
+                conn.execute(db.text(
+                    f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {col_type}'
+                ))
+                added.append(f'{table.name}.{column.name}')
+                print(f"✓ Added column '{table.name}.{column.name}' ({col_type})")
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+            for name in ensure_unique_indexes(conn, inspector, table):
+                added.append(f'{name} (unique)')
+                print(f"✓ Added unique index on '{name}'")
+
+    # Full-text search index (FTS5 on SQLite, pg_trgm/tsvector on PostgreSQL)
+    ensure_search_index(db.engine)
+    print("✓ Search index ready")
+
+    if not added:
+        print("✓ Schema already up to date")
+    return added
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        try:
+            sync_schema()
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            sys.exit(1)
@@ -0,0 +1,187 @@
+"""
+Pencarian perkara (nama tersangka, pasal, JPU, keterangan) memakai index full-text.
+
+- PostgreSQL: pg_trgm (GIN trigram) + tsvector. Kecocokan kata memakai word_similarity,
+  sehingga salah ketik kecil tetap ketemu, dan hasil diurutkan dari skor tertinggi.
+- SQLite (lokal / desktop): tabel virtual FTS5 `case_fts` yang disinkronkan dengan trigger.
+  Jika tidak ada hasil, setiap kata dicocokkan ke kosakata index (fts5vocab) yang mirip
+  untuk menoleransi salah ketik.
+- Database lain: fallback ILIKE (tanpa index).
+
+ensure_search_index() dipanggil dari init_db() dan scripts/sync_schema.py; aman diulang.
+"""
+import difflib
+import re
+from sqlalchemy import text, select, func, or_, literal
+from extensions import db
+from models import Case
+
+SEARCH_FIELDS = ('nama_tersangka', 'pasal', 'jpu', 'keterangan')
+# bm25 weight per field (SQLite): a hit on the name counts most
+SEARCH_WEIGHTS = (10.0, 4.0, 3.0, 1.0)
+# PostgreSQL word_similarity threshold for the fuzzy operator (<%)
+TRGM_THRESHOLD = 0.4
+# SQLite: how similar an index term must be to a query word to count as a typo of it
+FUZZY_CUTOFF = 0.75
+FUZZY_MAX_TERMS = 5
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+_PG_DOCUMENT = " || ' ' || ".join(f"coalesce({field}, '')" for field in SEARCH_FIELDS)
+
+_SQLITE_SETUP = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS case_fts USING fts5(
+        {', '.join(SEARCH_FIELDS)},
+        content='case', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS case_fts_vocab USING fts5vocab(case_fts, 'row')",
+    f"""CREATE TRIGGER IF NOT EXISTS case_fts_ai AFTER INSERT ON "case" BEGIN
+        INSERT INTO case_fts(rowid, {', '.join(SEARCH_FIELDS)})
+        VALUES (new.id, {', '.join('new.' + f for f in SEARCH_FIELDS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS case_fts_ad AFTER DELETE ON "case" BEGIN
+        INSERT INTO case_fts(case_fts, rowid, {', '.join(SEARCH_FIELDS)})
+        VALUES ('delete', old.id, {', '.join('old.' + f for f in SEARCH_FIELDS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS case_fts_au AFTER UPDATE OF {', '.join(SEARCH_FIELDS)} ON "case" BEGIN
+        INSERT INTO case_fts(case_fts, rowid, {', '.join(SEARCH_FIELDS)})
+        VALUES ('delete', old.id, {', '.join('old.' + f for f in SEARCH_FIELDS)});
+        INSERT INTO case_fts(rowid, {', '.join(SEARCH_FIELDS)})
+        VALUES (new.id, {', '.join('new.' + f for f in SEARCH_FIELDS)});
+    END""",
+]
+
+_PG_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f'CREATE INDEX IF NOT EXISTS ix_case_search_trgm ON "case" USING gin (({_PG_DOCUMENT}) gin_trgm_ops)',
+    f"""CREATE INDEX IF NOT EXISTS ix_case_search_tsv ON "case"
+        USING gin (to_tsvector('simple', {_PG_DOCUMENT}))""",
+]
+
+
+def ensure_search_index(engine=None):
+    """Create the search index structures for the engine's dialect (idempotent)"""
+    engine = engine or db.engine
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == 'sqlite':
+            created = not conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'case_fts'")).first()
+            for statement in _SQLITE_SETUP:
+                conn.execute(text(statement))
+            if created:
+                # Index the rows that existed before the triggers
+                conn.execute(text("INSERT INTO case_fts(case_fts) VALUES ('rebuild')"))
+        elif dialect == 'postgresql':
+            for statement in _PG_SETUP:
+                conn.execute(text(statement))
+    return dialect
+
+
+def query_words(query):
+    return [word.lower() for word in _WORD_RE.findall(query or '')]
+
+
+def _fts_match(words, fuzzy_terms=None):
+    """FTS5 MATCH expression: every word must match (as a prefix, or one of its typo variants)"""
+    groups = []
+    for word in words:
+        variants = [f'"{word}"*'] + [f'"{term}"' for term in (fuzzy_terms or {}).get(word, ())]
+        groups.append('(' + ' OR '.join(variants) + ')')
+    return ' AND '.join(groups)
+
+
+def _similar_terms(conn, words):
+    """Index terms that look like typos of each query word (same first letter, close spelling)"""
+    similar = {}
+    for word in words:
+        if len(word) < 3:
+            continue
+        candidates = conn.execute(
+            text("SELECT term FROM case_fts_vocab WHERE term >= :lo AND term < :hi"),
+            {'lo': word[0], 'hi': word[0] + '\uffff'}
+        ).scalars().all()
+        matches = difflib.get_close_matches(word, candidates, n=FUZZY_MAX_TERMS, cutoff=FUZZY_CUTOFF)
+        if matches:
+            similar[word] = matches
+    return similar
+
+
+def _search_sqlite(words, limit, offset):
+    conn = db.session.connection()
+    weights = ', '.join(str(w) for w in SEARCH_WEIGHTS)
+    stmt = text(f"""
+        SELECT rowid AS id, -bm25(case_fts, {weights}) AS score
+        FROM case_fts WHERE case_fts MATCH :match
+        ORDER BY score DESC, rowid DESC LIMIT :limit OFFSET :offset
+    """)
+    match, fuzzy = _fts_match(words), False
+    exists = conn.execute(text("SELECT 1 FROM case_fts WHERE case_fts MATCH :match LIMIT 1"),
+                          {'match': match}).first()
+    if not exists:
+        # No exact/prefix hit at all: retry with spelling variants found in the index
+        similar = _similar_terms(conn, words)
+        if similar:
+            match, fuzzy = _fts_match(words, similar), True
+    rows = conn.execute(stmt, {'match': match, 'limit': limit, 'offset': offset}).all()
+    return rows, fuzzy
+
+
+def _search_postgresql(query, limit, offset):
+    document = text(_PG_DOCUMENT)
+    tsv = func.to_tsvector('simple', document)
+    tsq = func.plainto_tsquery('simple', query)
+    q = literal(query)
+    score = func.greatest(func.word_similarity(q, document), func.ts_rank(tsv, tsq))
+    conn = db.session.connection()
+    conn.execute(text(f"SET LOCAL pg_trgm.word_similarity_threshold = {TRGM_THRESHOLD}"))
+    stmt = (select(Case.id, score.label('score'))
+            .where(or_(tsv.op('@@')(tsq), q.op('<%')(document)))
+            .order_by(score.desc(), Case.id.desc()).limit(limit).offset(offset))
+    return conn.execute(stmt).all(), False
+
+
+def like_escape(word):
+    """Escape LIKE wildcards so % and _ in a search match literally (use with escape='\\')"""
+    return word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _search_fallback(words, limit, offset):
+    conditions = [
+        or_(*[getattr(Case, f).ilike(f'%{like_escape(word)}%', escape='\\') for f in SEARCH_FIELDS])
+        for word in words
+    ]
+    stmt = (select(Case.id, literal(1.0).label('score')).where(*conditions)
+            .order_by(Case.created_at.desc(), Case.id.desc()).limit(limit).offset(offset))
+    return db.session.execute(stmt).all(), False
+
+
+def search_cases(query, page=1, per_page=20):
+    """
+    Ranked search over SEARCH_FIELDS.
+
+    Returns:
+        dict: items [(Case, score)], has_next, fuzzy (True if typo-tolerant matching was used)
+    """
+    words = query_words(query)
+    if not words:
+        return {'items': [], 'has_next': False, 'fuzzy': False}
+    limit, offset = per_page + 1, (page - 1) * per_page
+
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        rows, fuzzy = _search_sqlite(words, limit, offset)
+    elif dialect == 'postgresql':
+        rows, fuzzy = _search_postgresql(' '.join(words), limit, offset)
+    else:
+        rows, fuzzy = _search_fallback(words, limit, offset)
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    # One query for the page's cases, then back into rank order
+    cases = {case.id: case for case in Case.query.filter(Case.id.in_([row.id for row in rows]))}
+    return {
+        'items': [(cases[row.id], float(row.score)) for row in rows if row.id in cases],
+        'has_next': has_next,
+        'fuzzy': fuzzy,
+    }
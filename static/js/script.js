@@ -1,6 +1,4 @@
 document.addEventListener('DOMContentLoaded', function() {
-    const editableCells = document.querySelectorAll('.editable');
-    const dateCells = document.querySelectorAll('.date-cell');
     const dateModal = document.getElementById('dateModal');
     const modalInput = document.getElementById('modalDateInput');
     const saveBtn = document.getElementById('saveDateBtn');
@@ -11,7 +9,6 @@ document.addEventListener('DOMContentLoaded', function() {
     const deleteMessage = document.getElementById('deleteMessage');
     const confirmDeleteBtn = document.getElementById('confirmDeleteBtn');
     const cancelDeleteBtn = document.getElementById('cancelDeleteBtn');
-    const deleteButtons = document.querySelectorAll('.btn-delete');
     
     // Pagination Elements
     const perPageSelect = document.getElementById('perPageSelect');
@@ -25,42 +22,64 @@ document.addEventListener('DOMContentLoaded', function() {
             const urlParams = new URLSearchParams(window.location.search);
             urlParams.set('per_page', this.value);
             urlParams.set('page', '1'); // Reset to first page
+            // Cursor mode: restart from the newest rows
+            urlParams.delete('after');
+            urlParams.delete('before');
+            urlParams.delete('start');
             window.location.search = urlParams.toString();
         });
     }
 
+    // Rows are swapped in place after edits, so listen on the document (event delegation)
+    // instead of binding every cell once at load time.
+
     // Handle ContentEditable (Text areas)
-    editableCells.forEach(cell => {
-        let originalContent = cell.innerText;
-        cell.addEventListener('focus', function() { originalContent = cell.innerText; });
-        cell.addEventListener('blur', function() {
-            const newContent = cell.innerText.trim();
-            if (newContent !== originalContent) {
-                saveData(cell.dataset.id, cell.dataset.field, newContent);
-            }
-        });
-        cell.addEventListener('keydown', function(e) {
-            if (e.key === 'Enter') { e.preventDefault(); cell.blur(); }
-        });
+    const originalContent = new WeakMap();
+    document.addEventListener('focusin', function(e) {
+        const cell = e.target.closest('.editable');
+        if (cell) originalContent.set(cell, cell.innerText);
+    });
+    document.addEventListener('focusout', function(e) {
+        const cell = e.target.closest('.editable');
+        if (!cell) return;
+        const newContent = cell.innerText.trim();
+        if (newContent !== originalContent.get(cell)) {
+            // Kategori decides the SOP limits, so the row's highlighting must be refreshed
+            saveData(cell.dataset.id, cell.dataset.field, newContent, cell.dataset.field === 'kategori_umur');
+        }
+    });
+    document.addEventListener('keydown', function(e) {
+        const cell = e.target.closest && e.target.closest('.editable');
+        if (cell && e.key === 'Enter') { e.preventDefault(); cell.blur(); }
     });
 
-    // Handle Date Cells - Open Modal
-    dateCells.forEach(cell => {
-        cell.addEventListener('click', function() {
-            currentCell = cell;
-            const currentVal = cell.dataset.value;
-            
-            // Try to parse existing value to ISO format for input
-            // Format in DB might be '2025-07-09 00:00:00', input needs '2025-07-09T00:00'
-            let isoValue = '';
-            if (currentVal && currentVal.length > 5) {
-                // simple heuristic replace space with T
-                isoValue = currentVal.replace(' ', 'T').substring(0, 16);
-            }
-            
-            modalInput.value = isoValue;
-            dateModal.style.display = 'flex';
-        });
+    // Handle Date Cells - Open Modal / Delete Buttons
+    document.addEventListener('click', function(e) {
+        const deleteBtn = e.target.closest('.btn-delete');
+        if (deleteBtn) {
+            e.stopPropagation();
+            currentDeleteId = deleteBtn.dataset.id;
+            const caseName = deleteBtn.dataset.name;
+            deleteMessage.textContent = `Apakah Anda yakin ingin menghapus data "${caseName}"?`;
+            deleteModal.style.display = 'flex';
+            return;
+        }
+
+        const cell = e.target.closest('.date-cell');
+        if (!cell) return;
+        currentCell = cell;
+        const currentVal = cell.dataset.value;
+        
+        // Try to parse existing value to ISO format for input
+        // Format in DB might be '2025-07-09 00:00:00', input needs '2025-07-09T00:00'
+        let isoValue = '';
+        if (currentVal && currentVal.length > 5) {
+            // simple heuristic replace space with T
+            isoValue = currentVal.replace(' ', 'T').substring(0, 16);
+        }
+        
+        modalInput.value = isoValue;
+        dateModal.style.display = 'flex';
     });
 
     // Modal Actions
@@ -83,17 +102,6 @@ document.addEventListener('DOMContentLoaded', function() {
         dateModal.style.display = 'none';
     });
 
-    // Handle Delete Buttons
-    deleteButtons.forEach(btn => {
-        btn.addEventListener('click', function(e) {
-            e.stopPropagation();
-            currentDeleteId = this.dataset.id;
-            const caseName = this.dataset.name;
-            deleteMessage.textContent = `Apakah Anda yakin ingin menghapus data "${caseName}"?`;
-            deleteModal.style.display = 'flex';
-        });
-    });
-
     // Delete Modal Actions
     cancelDeleteBtn.addEventListener('click', function() {
         deleteModal.style.display = 'none';
@@ -111,7 +119,8 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(data => {
             if (data.success) {
                 deleteModal.style.display = 'none';
-                window.location.reload();
+                removeRow(currentDeleteId);
+                currentDeleteId = null;
             } else {
                 alert('Gagal menghapus: ' + data.error);
             }
@@ -122,28 +131,238 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
-    function saveData(id, field, value, reload = false) {
-        fetch('/update_cell', {
+    // Partial Refresh: replace/remove single rows instead of reloading the whole page
+    function findRow(id) {
+        return document.querySelector(`tr[data-case-id="${id}"]`);
+    }
+
+    function replaceRow(id, html) {
+        const row = findRow(id);
+        // Don't yank a cell out from under the user while they're still typing in it
+        if (!row || row.contains(document.activeElement)) return;
+        const template = document.createElement('template');
+        template.innerHTML = html.trim();
+        const fresh = template.content.firstElementChild;
+        if (!fresh) return;
+        fresh.cells[0].textContent = row.cells[0].textContent; // keep the NO column
+        row.replaceWith(fresh);
+    }
+
+    function removeRow(id) {
+        const row = findRow(id);
+        if (!row) return;
+        const tbody = row.parentNode;
+        const first = parseInt(tbody.rows[0].cells[0].textContent, 10) || 1;
+        row.remove();
+        Array.from(tbody.rows).forEach((tr, i) => { tr.cells[0].textContent = first + i; });
+    }
+
+    // Save Queue: coalesce inline edits and send them in one /update_cells request
+    const SAVE_DEBOUNCE_MS = 400;
+    const MAX_RETRY_DELAY_MS = 30000;
+    const TRANSIENT_STATUSES = [502, 503, 504]; // proxy/worker restarts: worth retrying as-is
+    const pendingEdits = new Map(); // "id:field" -> {id, field, value}; last edit of a cell wins
+    const pendingRenders = new Set(); // case ids whose row must be re-rendered after saving
+    let flushTimer = null;
+    let inFlight = null;
+    let retryDelay = 1000;
+
+    function queueEdit(id, field, value) {
+        pendingEdits.set(`${id}:${field}`, { id: id, field: field, value: value });
+    }
+
+    function requeue(entries) {
+        // Edits made to the same cell since the batch was sent are newer and win
+        entries.forEach(([key, edit]) => {
+            if (!pendingEdits.has(key)) pendingEdits.set(key, edit);
+        });
+    }
+
+    function scheduleFlush(delay = SAVE_DEBOUNCE_MS) {
+        clearTimeout(flushTimer);
+        flushTimer = setTimeout(flushEdits, delay);
+    }
+
+    function flushEdits() {
+        clearTimeout(flushTimer);
+        if (inFlight) {
+            // One batch at a time; edits queued meanwhile go in the next one
+            return inFlight.then(() => pendingEdits.size ? flushEdits() : true);
+        }
+        if (!pendingEdits.size) return Promise.resolve(true);
+
+        const batch = Array.from(pendingEdits.entries());
+        const render = Array.from(pendingRenders);
+        pendingEdits.clear();
+        pendingRenders.clear();
+
+        inFlight = fetch('/update_cells', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ id: id, field: field, value: value })
+            body: JSON.stringify({ edits: batch.map(([, edit]) => edit), render: render })
+        })
+        .catch(error => { throw Object.assign(error, { transient: true }); }) // offline / connection reset
+        .then(response => {
+            if (TRANSIENT_STATUSES.includes(response.status)) {
+                throw Object.assign(new Error('Server unavailable ' + response.status), { transient: true });
+            }
+            return response.json();
         })
-        .then(response => response.json())
         .then(data => {
-            if (data.success) {
-                if (reload) {
-                    window.location.reload();
-                } else if (!reload) {
-                    // Update UI manually if not reloading
-                    // currentCell.innerText = value; // simple update
-                }
-            } else {
+            retryDelay = 1000;
+            if (data.errors) {
+                rejectEdits(batch, render, data.errors);
+                return false;
+            }
+            if (!data.success) {
                 alert('Gagal menyimpan: ' + data.error);
+                return false;
             }
+            Object.entries(data.rows || {}).forEach(([id, html]) => replaceRow(id, html));
+            (data.missing || []).forEach(id => removeRow(id)); // deleted elsewhere meanwhile
+            return true;
         })
         .catch(error => {
             console.error('Error:', error);
-            alert('Kesalahan koneksi');
+            if (!error.transient) {
+                // Retrying wouldn't help (server bug, expired session): report it instead of looping
+                alert('Gagal menyimpan: ' + error.message);
+                return false;
+            }
+            // Transient failure: put the batch back and retry with backoff
+            requeue(batch);
+            render.forEach(id => pendingRenders.add(id));
+            scheduleFlush(retryDelay);
+            retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY_MS);
+            return 'retrying';
+        })
+        .finally(() => { inFlight = null; });
+
+        return inFlight;
+    }
+
+    function rejectEdits(batch, render, errors) {
+        // Nothing was saved: drop the invalid edits, restore their cells, and resend the rest
+        const rejected = new Set(errors.map(error => error.index));
+        const valid = batch.filter((_, index) => !rejected.has(index));
+        requeue(valid);
+        if (valid.length) {
+            render.forEach(id => pendingRenders.add(id));
+            scheduleFlush(0);
+        }
+        errors.forEach(error => {
+            if (findRow(error.id)) staleRows.add(String(error.id));
+        });
+        scheduleRefresh();
+        alert('Gagal menyimpan:\n' + errors.map(error => error.error).join('\n'));
+    }
+
+    // Don't lose queued edits when leaving the page
+    window.addEventListener('beforeunload', function() {
+        if (!pendingEdits.size) return;
+        const body = JSON.stringify({ edits: Array.from(pendingEdits.values()) });
+        navigator.sendBeacon('/update_cells', new Blob([body], { type: 'application/json' }));
+        pendingEdits.clear();
+    });
+
+    function saveData(id, field, value, refreshRow = false) {
+        queueEdit(id, field, value);
+        if (!refreshRow) {
+            scheduleFlush();
+            return;
+        }
+        // Date/kategori edits change overdue highlighting: save now and swap in the re-rendered row
+        pendingRenders.add(id);
+        flushEdits().then(result => {
+            if (result === 'retrying') {
+                alert('Kesalahan koneksi');
+            }
         });
     }
+    // Live Updates: edits made elsewhere (other users, other workers) patch the visible rows in place
+    const LIVE_DEBOUNCE_MS = 300;
+    const POLL_INTERVAL_MS = 10000;
+    const MAX_RENDER_ROWS = 100;
+    const staleRows = new Set();
+    let liveTimer = null;
+
+    function patchRow(id, html) {
+        const row = findRow(id);
+        if (!row) return;
+        const template = document.createElement('template');
+        template.innerHTML = html.trim();
+        const fresh = template.content.firstElementChild;
+        if (!fresh || fresh.cells.length !== row.cells.length) return;
+        // Only swap the cells that differ, and never the one being edited or still waiting to be saved
+        for (let i = 1; i < fresh.cells.length; i++) {
+            const cell = row.cells[i];
+            const field = cell.dataset.field;
+            if (cell.contains(document.activeElement) || (field && pendingEdits.has(`${id}:${field}`))) continue;
+            if (cell.outerHTML !== fresh.cells[i].outerHTML) {
+                cell.replaceWith(fresh.cells[i].cloneNode(true));
+            }
+        }
+    }
+
+    function refreshRows() {
+        const ids = Array.from(staleRows).slice(0, MAX_RENDER_ROWS);
+        ids.forEach(id => staleRows.delete(id));
+        if (!ids.length) return;
+        fetch(`/rows?ids=${ids.join(',')}`)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) return;
+                Object.entries(data.rows || {}).forEach(([id, html]) => patchRow(id, html));
+                (data.missing || []).forEach(id => removeRow(id));
+            })
+            .catch(error => console.error('Error:', error))
+            .finally(() => { if (staleRows.size) scheduleRefresh(); });
+    }
+
+    function scheduleRefresh() {
+        clearTimeout(liveTimer);
+        liveTimer = setTimeout(refreshRows, LIVE_DEBOUNCE_MS);
+    }
+
+    function markStale(change) {
+        if (!findRow(change.id)) return; // not on this page
+        if (change.op === 'delete') {
+            removeRow(change.id);
+            return;
+        }
+        staleRows.add(String(change.id));
+        scheduleRefresh();
+    }
+
+    function resyncVisibleRows() {
+        document.querySelectorAll('tr[data-case-id]').forEach(tr => staleRows.add(tr.dataset.caseId));
+        scheduleRefresh();
+    }
+
+    // Without SSE (serverless, or a proxy that drops the stream): poll the change feed instead
+    function pollChanges(cursor) {
+        const params = new URLSearchParams({ since: cursor || 'latest', fields: 'id' });
+        fetch(`/api/changes?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) return;
+                if (cursor) data.changes.forEach(markStale);
+                setTimeout(() => pollChanges(data.next_cursor), data.has_more ? 0 : POLL_INTERVAL_MS);
+            })
+            .catch(() => setTimeout(() => pollChanges(cursor), POLL_INTERVAL_MS));
+    }
+
+    if (document.querySelector('tr[data-case-id]')) {
+        if (window.EventSource) {
+            const source = new EventSource('/events');
+            source.addEventListener('case', e => markStale(JSON.parse(e.data)));
+            source.addEventListener('resync', resyncVisibleRows);
+            source.addEventListener('error', () => {
+                // 204 / 503 close the stream for good; network errors reconnect on their own
+                if (source.readyState === EventSource.CLOSED) pollChanges();
+            });
+        } else {
+            pollChanges();
+        }
+    }
 });
@@ -0,0 +1,111 @@
+"""
+Ringkasan beban kerja per JPU: jumlah perkara aktif / terlambat / selesai per tahapan
+dan kategori umur.
+
+Semua angka dihitung database dalam satu query GROUP BY (jpu, kategori_umur) dengan
+agregat bersyarat (SUM(CASE ...)), jadi tidak ada objek Case yang dimuat ke Python.
+Hasilnya di-cache sebentar dan di-invalidate setiap kali perkara ditulis lewat ORM;
+penulisan bulk (import) memanggil invalidate_summary() sendiri.
+"""
+from datetime import datetime
+from sqlalchemy import select, func, case, and_, or_
+from extensions import db
+from models import Case
+from cache import TTLCache
+from deadlines import STAGE_SOURCE_FIELDS
+
+SUMMARY_CACHE_TTL = 60
+
+_summary_cache = TTLCache(ttl=SUMMARY_CACHE_TTL, maxsize=16)
+
+
+def _filled(column):
+    return and_(column.isnot(None), column != '')
+
+
+def current_stage_expression():
+    """SQL CASE: the furthest stage a case has reached (None if no stage date yet)"""
+    whens = [(_filled(getattr(Case, field)), stage)
+             for stage, field in reversed(STAGE_SOURCE_FIELDS.items())]
+    return case(*whens, else_=None)
+
+
+def _count(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+def summary_statement(today=None):
+    """One GROUP BY over (jpu, kategori_umur) with every counter as a conditional aggregate"""
+    today = today or datetime.now().date()
+    jpu = func.coalesce(Case.jpu, '')
+    kategori = func.coalesce(Case.kategori_umur, 'Dewasa')
+    is_open = ~Case.is_complete
+    stage = current_stage_expression()
+
+    columns = [
+        jpu.label('jpu'),
+        kategori.label('kategori_umur'),
+        func.count(Case.id).label('total'),
+        _count(Case.is_complete).label('completed'),
+        _count(or_(*[Case.overdue_at(s, today) for s in STAGE_SOURCE_FIELDS])).label('overdue'),
+    ]
+    for s in STAGE_SOURCE_FIELDS:
+        columns.append(_count(and_(is_open, stage == s)).label(f'at_{s}'))
+        columns.append(_count(Case.overdue_at(s, today)).label(f'overdue_{s}'))
+    return select(*columns).group_by(jpu, kategori).order_by(jpu, kategori)
+
+
+COUNT_KEYS = ('total', 'completed', 'open', 'overdue') + tuple(
+    f'{prefix}_{s}' for s in STAGE_SOURCE_FIELDS for prefix in ('at', 'overdue'))
+
+
+def _empty_counts():
+    return dict.fromkeys(COUNT_KEYS, 0)
+
+
+def _add(into, row):
+    for key in COUNT_KEYS:
+        into[key] += row[key]
+
+
+def compute_summary(today=None):
+    """
+    Returns:
+        dict: rows (per jpu + kategori), jpus (per jpu, with its kategori rows), totals
+    """
+    rows = []
+    for row in db.session.execute(summary_statement(today)).mappings():
+        counts = {key: int(row[key] or 0) for key in COUNT_KEYS if key != 'open'}
+        counts['open'] = counts['total'] - counts['completed']
+        rows.append(dict(counts, jpu=row['jpu'], kategori_umur=row['kategori_umur']))
+
+    # Per-JPU subtotals and the grand total come from the grouped rows (a few hundred at most)
+    jpus, totals = {}, _empty_counts()
+    for row in rows:
+        entry = jpus.setdefault(row['jpu'], dict(_empty_counts(), jpu=row['jpu'], kategori=[]))
+        entry['kategori'].append(row)
+        _add(entry, row)
+        _add(totals, row)
+    return {
+        'rows': rows,
+        'jpus': sorted(jpus.values(), key=lambda e: (-e['overdue'], -e['open'], e['jpu'])),
+        'totals': totals,
+        'generated_at': datetime.now(),
+    }
+
+
+def get_summary(today=None, ttl=None):
+    """compute_summary() through the short-lived cache"""
+    today = today or datetime.now().date()
+    return _summary_cache.get_or_set(today, lambda: compute_summary(today), ttl)
+
+
+def invalidate_summary():
+    _summary_cache.clear()
+
+
+@db.event.listens_for(Case, 'after_insert')
+@db.event.listens_for(Case, 'after_update')
+@db.event.listens_for(Case, 'after_delete')
+def _invalidate_on_write(mapper, connection, target):
+    invalidate_summary()
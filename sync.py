@@ -0,0 +1,388 @@
+"""
+Mode offline untuk desktop: replika SQLite lokal + sinkronisasi dua arah di background.
+
+Aplikasi desktop membaca dan menulis ke file SQLite lokal (WAL mode), jadi UI tidak pernah
+menunggu jaringan. Thread background secara berkala:
+  - push: mengirim perubahan lokal (dicatat di tabel sync_outbox) ke database pusat
+  - pull: mengambil baris yang berubah di database pusat sejak pull terakhir, plus tombstone delete
+
+Identitas baris antar database memakai Case.uid (id lokal bisa berbeda dengan id pusat).
+Konflik diselesaikan last-writer-wins berdasarkan updated_at: perubahan yang lebih baru menang,
+dan delete kalah dari edit yang terjadi setelahnya.
+"""
+import threading
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import MetaData, Table, Column, String, DateTime, create_engine, event, select, insert, update, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Case, CaseTombstone, User, compute_stage_columns
+
+SYNC_INTERVAL = 30          # detik antar siklus sync
+MAX_BACKOFF = 300           # detik, saat database pusat tidak bisa dihubungi
+BATCH_SIZE = 200
+# Pull ulang sedikit ke belakang untuk menutup selisih jam dan transaksi yang commit terlambat
+PULL_OVERLAP = timedelta(minutes=5)
+
+# Tabel khusus replika (tidak ada di database pusat)
+replica_metadata = MetaData()
+
+outbox = Table(
+    'sync_outbox', replica_metadata,
+    Column('uid', String(32), primary_key=True),
+    Column('op', String(10), nullable=False),          # 'upsert' atau 'delete'
+    Column('changed_at', DateTime, nullable=False),
+)
+
+sync_meta = Table(
+    'sync_meta', replica_metadata,
+    Column('key', String(50), primary_key=True),
+    Column('value', String(100)),
+)
+
+case_table = Case.__table__
+tombstone_table = CaseTombstone.__table__
+user_table = User.__table__
+SYNC_COLUMNS = [column.name for column in case_table.columns if column.name != 'id']
+
+# Engines whose ORM writes are recorded in the outbox (only the local replica)
+_tracked_engines = set()
+
+
+def _newer(a, b):
+    """True if timestamp a is strictly newer than b (None counts as oldest)"""
+    if a is None:
+        return False
+    return b is None or a > b
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.close()
+
+
+def _record_changes(session, flush_context):
+    """after_flush hook: queue every Case insert/update/delete of the replica in the outbox"""
+    if session.get_bind() not in _tracked_engines:
+        return
+
+    changes = {}
+    for obj in session.new:
+        if isinstance(obj, Case):
+            changes[obj.uid] = 'upsert'
+    for obj in session.dirty:
+        if isinstance(obj, Case) and session.is_modified(obj):
+            changes[obj.uid] = 'upsert'
+    for obj in session.deleted:
+        if isinstance(obj, Case):
+            changes[obj.uid] = 'delete'
+    _queue_changes(session.connection(), changes)
+
+
+def _queue_changes(connection, changes):
+    """Upsert {uid: op} into the outbox and wake the sync threads"""
+    if not changes:
+        return
+
+    now = datetime.now()
+    for uid, op in changes.items():
+        stmt = sqlite_insert(outbox).values(uid=uid, op=op, changed_at=now)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=['uid'], set_={'op': op, 'changed_at': now}
+        ))
+
+    for syncer in ReplicaSync.running:
+        syncer.wake()
+
+
+def record_bulk_changes(session, uids, op='upsert'):
+    """Queue Case rows written with Core bulk statements (no ORM flush) for sync"""
+    if uids and session.get_bind() in _tracked_engines:
+        _queue_changes(session.connection(), {uid: op for uid in uids})
+
+
+def enable_change_tracking(engine):
+    """Record ORM writes made through `engine` in sync_outbox"""
+    replica_metadata.create_all(engine)
+    _tracked_engines.add(engine)
+    if not event.contains(Session, 'after_flush', _record_changes):
+        event.listen(Session, 'after_flush', _record_changes)
+
+
+class ReplicaSync:
+    """Two-way sync between the local replica engine and the central database engine"""
+
+    running = []
+
+    def __init__(self, local_engine, remote_engine, interval=SYNC_INTERVAL, on_users_changed=None):
+        self.local = local_engine
+        self.remote = remote_engine
+        self.interval = interval
+        # Called after a pull changed or removed local users (Core writes skip the ORM cache hooks)
+        self.on_users_changed = on_users_changed
+        self.status = {'online': None, 'last_sync': None, 'last_error': None, 'pending': 0}
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Background thread
+    # ------------------------------------------------------------------
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='replica-sync', daemon=True)
+        self._thread.start()
+        ReplicaSync.running.append(self)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self in ReplicaSync.running:
+            ReplicaSync.running.remove(self)
+
+    def wake(self):
+        """Push soon after a local edit instead of waiting for the next interval"""
+        self._wake.set()
+
+    def _run(self):
+        delay = 0
+        while not self._stop.is_set():
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.run_once()
+                delay = self.interval
+            except SQLAlchemyError as e:
+                # Offline or central DB unavailable: keep working locally, retry with backoff
+                self.status.update(online=False, last_error=str(e).splitlines()[0])
+                delay = min(max(delay, self.interval) * 2, MAX_BACKOFF)
+
+    def run_once(self):
+        """One push + pull cycle; returns (pushed, pulled)"""
+        pushed = self.push()
+        pulled = self.pull()
+        with self.local.connect() as conn:
+            pending = conn.execute(select(db.func.count()).select_from(outbox)).scalar()
+        self.status.update(online=True, last_sync=datetime.now(), last_error=None, pending=pending)
+        return pushed, pulled
+
+    # ------------------------------------------------------------------
+    # Push: local outbox -> central database
+    # ------------------------------------------------------------------
+
+    def push(self):
+        pushed = 0
+        while True:
+            with self.local.connect() as lconn:
+                entries = lconn.execute(
+                    select(outbox).order_by(outbox.c.changed_at).limit(BATCH_SIZE)
+                ).all()
+                uids = [entry.uid for entry in entries if entry.op == 'upsert']
+                local_rows = {
+                    row['uid']: row for row in
+                    lconn.execute(select(case_table).where(case_table.c.uid.in_(uids))).mappings()
+                } if uids else {}
+            if not entries:
+                return pushed
+
+            stamp = datetime.now()
+            stamped, lost = [], []
+            with self.remote.begin() as rconn:
+                for entry in entries:
+                    remote_row = rconn.execute(
+                        select(case_table.c.id, case_table.c.updated_at).where(case_table.c.uid == entry.uid)
+                    ).first()
+
+                    if entry.op == 'delete':
+                        if remote_row and _newer(remote_row.updated_at, entry.changed_at):
+                            continue  # edited centrally after our delete: the edit wins, pull restores it
+                        if remote_row:
+                            rconn.execute(delete(case_table).where(case_table.c.uid == entry.uid))
+                            rconn.execute(insert(tombstone_table).values(
+                                uid=entry.uid, case_id=remote_row.id, deleted_at=stamp))
+                        continue
+
+                    local_row = local_rows.get(entry.uid)
+                    if local_row is None:
+                        continue
+                    values = {name: local_row[name] for name in SYNC_COLUMNS}
+                    # Stamp with push time so other replicas' pull cursors see the change
+                    values['updated_at'] = stamp
+
+                    if remote_row is None:
+                        tombstone = rconn.execute(
+                            select(tombstone_table.c.deleted_at)
+                            .where(tombstone_table.c.uid == entry.uid)
+                            .order_by(tombstone_table.c.deleted_at.desc())
+                        ).first()
+                        if tombstone and not _newer(local_row['updated_at'], tombstone.deleted_at):
+                            lost.append(entry.uid)  # deleted centrally after our edit: delete wins
+                            continue
+                        rconn.execute(insert(case_table).values(**values))
+                    elif _newer(remote_row.updated_at, local_row['updated_at']):
+                        continue  # central copy is newer: it wins, pull overwrites ours
+                    else:
+                        rconn.execute(update(case_table).where(case_table.c.uid == entry.uid).values(**values))
+                    stamped.append(entry.uid)
+
+            with self.local.begin() as lconn:
+                for entry in entries:
+                    # Keep entries re-queued by an edit made while we were pushing
+                    lconn.execute(delete(outbox).where(
+                        outbox.c.uid == entry.uid, outbox.c.changed_at == entry.changed_at))
+                if stamped:
+                    lconn.execute(update(case_table).where(case_table.c.uid.in_(stamped))
+                                  .values(updated_at=stamp))
+                if lost:
+                    lconn.execute(delete(case_table).where(case_table.c.uid.in_(lost)))
+            pushed += len(entries)
+
+    # ------------------------------------------------------------------
+    # Pull: central database -> local replica
+    # ------------------------------------------------------------------
+
+    def _get_cursor(self, conn):
+        value = conn.execute(select(sync_meta.c.value).where(sync_meta.c.key == 'last_pull')).scalar()
+        return datetime.fromisoformat(value) if value else None
+
+    def _set_cursor(self, conn, value):
+        stmt = sqlite_insert(sync_meta).values(key='last_pull', value=value.isoformat())
+        conn.execute(stmt.on_conflict_do_update(index_elements=['key'], set_={'value': value.isoformat()}))
+
+    def _assign_missing_uids(self, rconn):
+        """Rows created before the uid column existed get one, so they can be replicated"""
+        while True:
+            ids = rconn.execute(
+                select(case_table.c.id).where(case_table.c.uid.is_(None)).limit(BATCH_SIZE)
+            ).scalars().all()
+            if not ids:
+                return
+            for case_id in ids:
+                rconn.execute(update(case_table)
+                              .where(case_table.c.id == case_id, case_table.c.uid.is_(None))
+                              .values(uid=uuid.uuid4().hex))
+
+    def pull(self):
+        with self.local.connect() as lconn:
+            cursor = self._get_cursor(lconn)
+            pending = dict(lconn.execute(select(outbox.c.uid, outbox.c.changed_at)).all())
+        since = cursor - PULL_OVERLAP if cursor else None
+        newest = cursor
+        pulled = 0
+
+        with self.remote.begin() as rconn:
+            self._assign_missing_uids(rconn)
+
+        with self.remote.connect() as rconn:
+            last_id = 0
+            while True:
+                query = select(case_table).where(case_table.c.id > last_id).order_by(case_table.c.id).limit(BATCH_SIZE)
+                if since:
+                    query = query.where(case_table.c.updated_at > since)
+                rows = rconn.execute(query).mappings().all()
+                if not rows:
+                    break
+                last_id = rows[-1]['id']
+                with self.local.begin() as lconn:
+                    for row in rows:
+                        if _newer(row['updated_at'], newest):
+                            newest = row['updated_at']
+                        if self._apply_remote_row(lconn, row, pending):
+                            pulled += 1
+
+            tomb_query = select(tombstone_table.c.uid, tombstone_table.c.deleted_at)
+            if since:
+                tomb_query = tomb_query.where(tombstone_table.c.deleted_at > since)
+            tombstones = rconn.execute(tomb_query).all()
+            users = rconn.execute(select(user_table.c.username, user_table.c.password_hash)).all()
+
+        with self.local.begin() as lconn:
+            for uid, deleted_at in tombstones:
+                if _newer(deleted_at, newest):
+                    newest = deleted_at
+                if uid in pending and _newer(pending[uid], deleted_at):
+                    continue  # edited locally after the central delete: push re-creates it
+                lconn.execute(delete(case_table).where(case_table.c.uid == uid))
+                lconn.execute(delete(outbox).where(outbox.c.uid == uid))
+            users_changed = self._apply_users(lconn, users)
+            if newest:
+                self._set_cursor(lconn, newest)
+        if users_changed and self.on_users_changed:
+            self.on_users_changed()
+        return pulled
+
+    def _apply_remote_row(self, lconn, row, pending):
+        local = lconn.execute(
+            select(case_table.c.id, case_table.c.updated_at).where(case_table.c.uid == row['uid'])
+        ).first()
+        if row['uid'] in pending:
+            if not _newer(row['updated_at'], pending[row['uid']]):
+                return False  # our pending edit/delete is newer: push sends it
+            # Central copy changed after our pending change: it wins
+            lconn.execute(delete(outbox).where(outbox.c.uid == row['uid']))
+
+        values = {name: row[name] for name in SYNC_COLUMNS}
+        # Central rows may predate the typed/deadline columns: derive them locally
+        values.update(compute_stage_columns(values))
+        if local is None:
+            lconn.execute(insert(case_table).values(**values))
+        elif local.updated_at != row['updated_at'] or row['updated_at'] is None:
+            lconn.execute(update(case_table).where(case_table.c.id == local.id).values(**values))
+        else:
+            return False
+        return True
+
+    def _apply_users(self, lconn, users):
+        """
+        Read-only mirror of the central users so login works offline (removed users lose access too).
+        Returns True if an existing local user was removed or changed.
+        """
+        local = dict(lconn.execute(select(user_table.c.username, user_table.c.password_hash)).all())
+        removed = set(local) - {username for username, _ in users}
+        if removed:
+            lconn.execute(delete(user_table).where(user_table.c.username.in_(removed)))
+        changed = bool(removed)
+        for username, password_hash in users:
+            if username not in local:
+                lconn.execute(insert(user_table).values(username=username, password_hash=password_hash))
+            elif local[username] != password_hash:
+                lconn.execute(update(user_table).where(user_table.c.username == username)
+                              .values(password_hash=password_hash))
+                changed = True
+        return changed
+
+
+def create_remote_engine(url):
+    """Small pooled engine for the sync thread; short connect timeout so offline is detected fast"""
+    options = {'pool_size': 1, 'max_overflow': 1, 'pool_pre_ping': True, 'pool_recycle': 300}
+    if make_url(url).get_backend_name() == 'postgresql':
+        options['connect_args'] = {'connect_timeout': 10}
+    return create_engine(url, **options)
+
+
+def start_replica(app):
+    """
+    Prepare the local replica (WAL mode, outbox tracking) and start background sync.
+    Call before init_db() so the WAL pragma applies to the first connection.
+    """
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, 'connect', _set_sqlite_pragmas)
+        db.create_all()
+        enable_change_tracking(engine)
+
+    user_cache = app.extensions.get('user_cache')
+    syncer = ReplicaSync(engine, create_remote_engine(app.config['REMOTE_DATABASE_URI']),
+                         interval=app.config.get('SYNC_INTERVAL', SYNC_INTERVAL),
+                         on_users_changed=user_cache.clear if user_cache else None)
+    syncer.start()
+    app.extensions['replica_sync'] = syncer
+    return syncer
@@ -0,0 +1,125 @@
+"""
+Tests for the case audit trail (buffered ORM audit, importer audit, history endpoint).
+"""
+import json
+import os
+import tempfile
+import unittest
+from sqlalchemy import event
+from app import app, db
+from models import Case, CaseAudit
+from audit import AuditLog, audit_log, entry
+from importer import reimport_file
+
+
+class AuditTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.case = Case(nama_tersangka='Audit Case', p21='2024-01-10')
+        db.session.add(self.case)
+        db.session.commit()
+        self.ids = [self.case.id]
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        audit_log.flush()
+        Case.query.filter(Case.nama_tersangka.like('Audit%')).delete(synchronize_session=False)
+        CaseAudit.query.filter(CaseAudit.case_id.in_(self.ids)).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def history(self, case_id, **params):
+        return self.client.get(f'/api/cases/{case_id}/history', query_string=params).get_json()
+
+    def test_cell_edit_is_buffered_then_recorded(self):
+        inserts = []
+        listener = lambda conn, cursor, stmt, *args: \
+            inserts.append(stmt) if stmt.startswith('INSERT INTO case_audit') else None
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = self.client.post('/update_cell', json={'id': self.case.id, 'field': 'p21', 'value': '2024-01-12'})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertTrue(response.get_json()['success'])
+        self.assertEqual(inserts, [])  # not written on the request path
+        self.assertGreaterEqual(audit_log.pending(), 1)
+
+        items = self.history(self.case.id)['items']
+        self.assertEqual([(i['action'], i['field'], i['old_value'], i['new_value'], i['username']) for i in items],
+                         [('update', 'p21', '2024-01-10', '2024-01-12', 'admin'), ('create', None, None, None, None)])
+
+    def test_writer_thread_flushes_in_background_and_stops(self):
+        log = AuditLog(flush_interval=0.01)
+        log.add([entry(self.case.id, 'update', 'pasal', 'a', 'b')])
+        self.assertIsNotNone(log._thread)
+        log.stop()
+        self.assertIsNone(log._thread)
+        self.assertEqual(log.pending(), 0)
+        self.assertEqual(CaseAudit.query.filter_by(case_id=self.case.id, field='pasal').count(), 1)
+
+    def test_unchanged_value_and_rollback_are_not_recorded(self):
+        self.client.post('/update_cell', json={'id': self.case.id, 'field': 'p21', 'value': '2024-01-10'})
+        self.case.pasal = 'Pasal batal'
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual([i['action'] for i in self.history(self.case.id)['items']], ['create'])
+
+    def test_add_batch_edit_and_delete(self):
+        self.client.post('/add_case', data={'nama_tersangka': 'Audit Baru', 'jpu': 'JPU A'})
+        new = Case.query.filter_by(nama_tersangka='Audit Baru').one()
+        self.ids.append(new.id)
+        self.client.post('/update_cells', json={'edits': [
+            {'id': new.id, 'field': 'pasal', 'value': 'Pasal 1'},
+            {'id': new.id, 'field': 'jpu', 'value': 'JPU B'},
+        ]})
+        self.client.delete(f'/delete_case/{new.id}')
+
+        items = self.history(new.id)['items']
+        self.assertEqual([(i['action'], i['field']) for i in items],
+                         [('delete', None), ('update', 'jpu'), ('update', 'pasal'), ('create', None)])
+        self.assertEqual(items[1]['old_value'], 'JPU A')
+        snapshot = json.loads(items[0]['old_value'])
+        self.assertEqual((snapshot['nama_tersangka'], snapshot['jpu']), ('Audit Baru', 'JPU B'))
+
+    def test_history_paging(self):
+        for i in range(5):
+            self.client.post('/update_cell', json={'id': self.case.id, 'field': 'keterangan', 'value': f'Ket {i}'})
+        first = self.history(self.case.id, limit=4)
+        self.assertTrue(first['has_next'])
+        self.assertEqual(first['items'][0]['new_value'], 'Ket 4')
+        second = self.history(self.case.id, limit=4, before=first['next_before'])
+        self.assertFalse(second['has_next'])
+        self.assertEqual([i['action'] for i in second['items']], ['update', 'create'])
+
+    def test_importer_records_creates_and_changed_fields(self):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('NAMA TERSANGKA,SPDP,PASAL YANG DISANGKAKAN\nAudit Import,SPDP/A,Pasal 1\n')
+            reimport_file(path)
+            case = Case.query.filter_by(nama_tersangka='Audit Import').one()
+            self.ids.append(case.id)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('NAMA TERSANGKA,SPDP,PASAL YANG DISANGKAKAN\nAudit Import,SPDP/A,Pasal 2\n')
+            reimport_file(path, dry_run=True)
+            reimport_file(path)
+        finally:
+            os.remove(path)
+
+        items = self.history(case.id)['items']
+        self.assertEqual([(i['action'], i['field'], i['old_value'], i['new_value'], i['username']) for i in items],
+                         [('update', 'pasal', 'Pasal 1', 'Pasal 2', 'import'), ('create', None, None, None, 'import')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Tests for the benchmark suite helpers (scripts/bench_suite.py): statistics and baseline comparison.
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from bench_suite import summarize, measure, compare, save_baseline, load_baseline, write_cases_csv
+
+
+class BenchSuiteTests(unittest.TestCase):
+
+    def test_summarize_reports_throughput_and_percentiles(self):
+        result = summarize([0.001] * 98 + [0.010, 0.020])
+        self.assertEqual(result['ops'], 100)
+        self.assertAlmostEqual(result['ops_per_sec'], 100 / 0.128)
+        self.assertAlmostEqual(result['p50_ms'], 1.0)
+        self.assertAlmostEqual(result['p99_ms'], 10.0)
+
+    def test_measure_divides_by_batch_and_skips_warmup(self):
+        calls = []
+        samples = measure(lambda: calls.append(1), iterations=5, warmup=2, batch=10)
+        self.assertEqual(len(calls), 7)
+        self.assertEqual(len(samples), 5)
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        baseline = {'a': {'p50_ms': 10.0}, 'b': {'p50_ms': 10.0}, 'c': {'p50_ms': 10.0}}
+        results = {'a': {'p50_ms': 13.0}, 'b': {'p50_ms': 11.0}, 'c': {'p50_ms': 5.0}, 'd': {'p50_ms': 1.0}}
+        verdicts = compare(results, baseline, threshold=0.25)
+        self.assertEqual(verdicts['a'][0], 'regression')
+        self.assertAlmostEqual(verdicts['a'][1], 0.3)
+        self.assertEqual(verdicts['b'][0], 'ok')
+        self.assertEqual(verdicts['c'][0], 'faster')
+        self.assertEqual(verdicts['d'], ('new', None))
+        self.assertEqual(compare(results, None)['a'], ('new', None))
+
+    def test_baseline_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            self.assertIsNone(load_baseline(path))
+            save_baseline(path, {'parse_date': summarize([0.001, 0.002])}, 'sqlite')
+            stored = load_baseline(path)
+        self.assertEqual(stored['database'], 'sqlite')
+        self.assertEqual(stored['results']['parse_date']['ops'], 2)
+
+    def test_seed_csv_is_in_import_format(self):
+        from importer import iter_records
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cases.csv')
+            write_cases_csv(path, 12)
+            records = list(iter_records(path))
+        self.assertEqual(len(records), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
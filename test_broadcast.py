@@ -0,0 +1,240 @@
+"""
+Tests for live dashboard updates (broadcast.py, /events, /rows).
+"""
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from http.cookiejar import CookieJar
+from datetime import timedelta
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from app import app, db
+from models import Case
+from changes import encode_change_cursor, decode_change_cursor
+from broadcast import (LocalBroker, BrokerFull, ChangeRelay, event_stream, format_event, replay_events,
+                       broker)
+
+
+def parse_events(chunks):
+    """[(event name, data dict)] of the SSE text chunks"""
+    events = []
+    for chunk in chunks:
+        fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class BrokerTests(unittest.TestCase):
+
+    def test_publish_fans_out_to_every_subscriber(self):
+        local = LocalBroker()
+        first, second = local.subscribe(), local.subscribe()
+        local.publish([{'op': 'upsert', 'id': 1}])
+        self.assertEqual(first.get(0), {'op': 'upsert', 'id': 1})
+        self.assertEqual(second.get(0), {'op': 'upsert', 'id': 1})
+        local.unsubscribe(first)
+        self.assertEqual(len(local), 1)
+
+    def test_subscribers_are_limited(self):
+        local = LocalBroker(max_subscribers=1)
+        local.subscribe()
+        with self.assertRaises(BrokerFull):
+            local.subscribe()
+
+    def test_slow_subscriber_is_dropped_to_resync_instead_of_buffering(self):
+        local = LocalBroker(queue_size=3)
+        subscription = local.subscribe()
+        local.publish([{'op': 'upsert', 'id': i} for i in range(10)])
+        self.assertTrue(subscription.overflowed)
+        self.assertEqual(subscription.queue.qsize(), 0)
+
+        chunks = list(event_stream(local, subscription, heartbeat=0.01, max_seconds=1))
+        self.assertEqual([name for name, _ in parse_events(chunks)], ['resync'])
+        self.assertEqual(len(local), 0)
+
+    def test_stream_sends_heartbeats_and_unsubscribes_when_done(self):
+        local = LocalBroker()
+        subscription = local.subscribe()
+        local.publish([{'op': 'delete', 'id': 5, 'v': 'x', 'cursor': 'abc'}])
+        chunks = list(event_stream(local, subscription, heartbeat=0.01, max_seconds=0.05))
+        self.assertTrue(chunks[0].startswith('retry:'))
+        self.assertIn('id: abc\nevent: case\n', chunks[1])
+        self.assertEqual(parse_events(chunks), [('case', {'op': 'delete', 'id': 5, 'v': 'x'})])
+        self.assertIn(': ping\n\n', chunks)
+        self.assertEqual(len(local), 0)
+
+    def test_format_event_omits_cursor_from_data(self):
+        self.assertEqual(format_event({'op': 'upsert', 'id': 1, 'v': 't', 'cursor': 'c'}),
+                         'id: c\nevent: case\ndata: {"op":"upsert","id":1,"v":"t"}\n\n')
+
+
+class LiveUpdateTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.case = Case(nama_tersangka='Live A', pasal='Pasal 1')
+        db.session.add(self.case)
+        db.session.commit()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Live %')).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def test_relay_publishes_each_change_once(self):
+        local = LocalBroker()
+        subscription = local.subscribe()
+        relay = ChangeRelay(self.app, local)
+        relay.position = decode_change_cursor(replay_position(self.case))
+        relay.poll_once()
+        drain(subscription, self.case.id)  # the insert, and whatever else was written in the last second
+
+        self.case.pasal = 'Pasal 2'
+        db.session.commit()
+        self.assertGreaterEqual(relay.poll_once(), 1)
+        # Within the settle window the feed returns the change again; the relay doesn't repeat it
+        self.assertEqual(relay.poll_once(), 0)
+
+        events = drain(subscription, self.case.id)
+        self.assertEqual([event['op'] for event in events], ['upsert'])
+        self.assertIsNotNone(decode_change_cursor(events[0]['cursor']))
+
+        case_id = self.case.id
+        db.session.delete(self.case)
+        db.session.commit()
+        relay.poll_once()
+        self.assertEqual([event['op'] for event in drain(subscription, case_id)], ['delete'])
+
+    def test_replay_after_reconnect(self):
+        last_event_id = replay_position(self.case)
+        self.case.pasal = 'Pasal 3'
+        db.session.commit()
+        events = replay_events(last_event_id)
+        self.assertIn(self.case.id, [event['id'] for event in events])
+        self.assertEqual(replay_events(None), [])
+
+    def test_rows_renders_requested_cases_and_reports_missing(self):
+        response = self.client.get(f'/rows?ids={self.case.id},999999999')
+        data = response.get_json()
+        self.assertTrue(data['success'])
+        self.assertIn(f'data-case-id="{self.case.id}"', data['rows'][str(self.case.id)])
+        self.assertIn('Pasal 1', data['rows'][str(self.case.id)])
+        self.assertEqual(data['missing'], [999999999])
+
+        self.assertEqual(self.client.get('/rows?ids=abc').status_code, 400)
+        self.assertEqual(self.client.get('/rows').status_code, 400)
+
+    def test_events_stream_starts_and_releases_subscription(self):
+        before = len(broker)
+        response = self.client.get('/events', buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(len(broker), before + 1)
+        self.assertTrue(next(response.response).startswith(b'retry:'))
+        response.close()
+        self.assertEqual(len(broker), before)
+
+    def test_events_disabled_returns_no_content(self):
+        self.app.config['LIVE_UPDATES'] = False
+        try:
+            self.assertEqual(self.client.get('/events').status_code, 204)
+        finally:
+            self.app.config['LIVE_UPDATES'] = True
+
+
+class PooledServer(BaseWSGIServer):
+    """Serves each request on its own thread, at most `threads` at once (like gunicorn gthread)"""
+
+    def __init__(self, app, threads):
+        class Handler(WSGIRequestHandler):
+            protocol_version = 'HTTP/1.0'
+
+            def log_request(self, *args):
+                pass
+
+        super().__init__('127.0.0.1', 0, app, handler=Handler)
+        self._slots = threading.BoundedSemaphore(threads)
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()  # all threads busy: the connection waits in the backlog
+        threading.Thread(target=self._serve, args=(request, client_address), daemon=True).start()
+
+    def _serve(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+
+class StreamLimitTests(unittest.TestCase):
+    """Open event streams must leave worker threads for normal requests"""
+
+    THREADS = 4
+
+    def setUp(self):
+        self.server = PooledServer(app, self.THREADS)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f'http://127.0.0.1:{self.server.port}'
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+        self.opener.open(f'{self.base}/login', data=b'username=admin&password=12345', timeout=5).close()
+        self.limit = broker.max_subscribers
+        broker.max_subscribers = self.THREADS - 2
+        self.streams = []
+
+    def tearDown(self):
+        for stream in self.streams:
+            stream.close()
+        broker.max_subscribers = self.limit
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_more_streams_than_threads_still_serves_requests(self):
+        statuses = []
+        for _ in range(self.THREADS + 2):
+            try:
+                stream = self.opener.open(f'{self.base}/events', timeout=5)
+            except urllib.error.HTTPError as e:
+                statuses.append(e.code)
+                e.close()
+                continue
+            self.streams.append(stream)
+            statuses.append(stream.status)
+            self.assertTrue(stream.readline().startswith(b'retry:'))
+
+        self.assertEqual(statuses, [200, 200, 503, 503, 503, 503])
+        for _ in range(3):
+            with self.opener.open(f'{self.base}/dashboard', timeout=5) as response:
+                self.assertEqual(response.status, 200)
+
+
+def drain(subscription, case_id):
+    """Queued events of one case (other tests may have written cases in the same second)"""
+    events = []
+    while (event := subscription.get(0)) is not None:
+        events.append(event)
+    return [event for event in events if event['id'] == case_id]
+
+
+def replay_position(case):
+    """Cursor just before `case`'s current version, with no settle hold-back"""
+    position = (case.updated_at - timedelta(seconds=1), 0)
+    return encode_change_cursor(position, position)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Tests for the read-only /api/cases endpoint (projection, cursor paging, filters, ETag).
+"""
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import app, db
+from models import Case
+
+
+class CasesApiTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        base = datetime(2030, 1, 1)
+        self.cases = [
+            Case(nama_tersangka=f'Api Case {i}', jpu='JPU API', pasal=f'Pasal {i}',
+                 created_at=base + timedelta(minutes=i))
+            for i in range(5)
+        ]
+        self.cases[0].jpu = 'JPU Lain'
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.id.in_(self.ids)).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def test_projection_selects_only_requested_columns(self):
+        statements = []
+        listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = self.client.get('/api/cases?fields=nama_tersangka&jpu=JPU+API')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        data = response.get_json()
+        self.assertEqual(data['fields'], ['id', 'nama_tersangka'])
+        self.assertEqual(set(data['items'][0]), {'id', 'nama_tersangka'})
+        select_sql = [s for s in statements if 'FROM "case"' in s or 'FROM case' in s][-1]
+        self.assertNotIn('keterangan', select_sql)
+        self.assertNotIn('pasal', select_sql)
+
+    def test_default_fields_match_to_dict(self):
+        data = self.client.get('/api/cases?jpu=JPU+API&limit=1').get_json()
+        self.assertEqual(set(data['items'][0]), set(self.cases[4].to_dict()))
+
+    def test_unknown_field_rejected(self):
+        response = self.client.get('/api/cases?fields=password_hash')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_pages_through_filtered_cases(self):
+        seen = []
+        url = '/api/cases?fields=id&jpu=JPU+API&limit=2'
+        while url:
+            data = self.client.get(url).get_json()
+            seen.extend(item['id'] for item in data['items'])
+            url = f"/api/cases?fields=id&jpu=JPU+API&limit=2&after={data['next_cursor']}" if data['has_next'] else None
+        self.assertEqual(seen, list(reversed(self.ids[1:])))
+
+    def test_name_filter_matches_wildcards_literally(self):
+        data = self.client.get('/api/cases?fields=nama_tersangka&jpu=JPU+API&q=Api_Case').get_json()
+        self.assertEqual(data['items'], [])
+        data = self.client.get('/api/cases?fields=nama_tersangka&jpu=JPU+API&q=Api+Case+3').get_json()
+        self.assertEqual([item['nama_tersangka'] for item in data['items']], ['Api Case 3'])
+
+    def test_etag_returns_304_until_a_row_changes(self):
+        url = '/api/cases?fields=pasal&jpu=JPU+API'
+        first = self.client.get(url)
+        etag = first.headers['ETag']
+        self.assertTrue(etag)
+        cached = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.get_data(), b'')
+
+        self.cases[2].pasal = 'Pasal Baru'
+        self.cases[2].updated_at = datetime.now() + timedelta(seconds=1)
+        db.session.commit()
+        changed = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn('Pasal Baru', changed.get_data(as_text=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Tests for the change feed (changes.py, /api/changes).
+"""
+import unittest
+from datetime import timedelta
+from sqlalchemy import event
+from app import app, db
+from models import Case
+from changes import fetch_changes, decode_change_cursor, latest_cursor
+
+NO_SETTLE = timedelta(0)
+
+
+class ChangeFeedTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.cases = [Case(nama_tersangka=f'Feed {i}') for i in range(2)]
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Feed %')).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def make_changes(self):
+        self.cases[0].pasal = 'Pasal Feed'
+        db.session.commit()
+        db.session.delete(self.cases[1])
+        db.session.commit()
+        added = Case(nama_tersangka='Feed Baru')
+        db.session.add(added)
+        db.session.commit()
+        return added
+
+    def test_returns_upserts_and_deletes_after_cursor_in_order(self):
+        cursor = decode_change_cursor(latest_cursor(settle=NO_SETTLE))
+        added = self.make_changes()
+
+        changes, next_cursor, has_more = fetch_changes(['nama_tersangka', 'pasal'], cursor, settle=NO_SETTLE)
+        self.assertFalse(has_more)
+        self.assertEqual([(c['op'], c['id']) for c in changes],
+                         [('upsert', self.ids[0]), ('delete', self.ids[1]), ('upsert', added.id)])
+        self.assertEqual(changes[0]['pasal'], 'Pasal Feed')
+        self.assertEqual(changes[1]['uid'], self.cases[1].uid)
+
+        self.assertEqual(fetch_changes(['nama_tersangka'], decode_change_cursor(next_cursor), settle=NO_SETTLE)[0], [])
+
+    def test_recent_changes_are_sent_again_within_settle_window(self):
+        cursor = decode_change_cursor(latest_cursor(settle=NO_SETTLE))
+        self.make_changes()
+        first, next_cursor, _ = fetch_changes(['nama_tersangka'], cursor)
+        again, _, _ = fetch_changes(['nama_tersangka'], decode_change_cursor(next_cursor))
+        self.assertEqual([c['id'] for c in again], [c['id'] for c in first])
+
+    def test_paging_moves_forward_inside_settle_window(self):
+        cursor = decode_change_cursor(latest_cursor(settle=NO_SETTLE))
+        self.make_changes()
+        seen = []
+        for _ in range(10):
+            changes, next_cursor, has_more = fetch_changes(['nama_tersangka'], cursor, limit=1)
+            seen += [(c['op'], c['id']) for c in changes]
+            cursor = decode_change_cursor(next_cursor)
+            if not has_more:
+                break
+        self.assertEqual(len(seen), 3)
+
+    def test_poll_is_two_keyset_queries(self):
+        cursor = decode_change_cursor(latest_cursor(settle=NO_SETTLE))
+        statements = []
+        listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            fetch_changes(['nama_tersangka'], cursor)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(all('ORDER BY' in stmt and 'LIMIT' in stmt for stmt in statements))
+
+    def test_endpoint(self):
+        head = self.client.get('/api/changes?since=latest').get_json()
+        self.assertEqual(head['changes'], [])
+        self.make_changes()
+
+        data = self.client.get('/api/changes', query_string={'since': head['next_cursor'],
+                                                             'fields': 'nama_tersangka'}).get_json()
+        self.assertTrue(data['success'])
+        self.assertIn(('delete', self.ids[1]), [(c['op'], c['id']) for c in data['changes']])
+        self.assertIn('Feed Baru', [c.get('nama_tersangka') for c in data['changes']])
+
+        self.assertEqual(self.client.get('/api/changes?since=garbage').status_code, 400)
+        self.assertEqual(self.client.get('/api/changes?fields=password').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Tests for the fast-path date parser: results must match the dateutil-based parser.
+"""
+import unittest
+from datetime import date, datetime
+from dates import parse_date, _parse_date_dateutil, _parse_date_fast
+
+
+SAMPLES = [
+    '2024-01-15', '2024-12-31', '2024-02-29', '2023-02-29', '2024-13-01', '2024-00-10',
+    '2024-01-15 09:30', '2024-05-06 13:30', '2024-05-06T13:30', '2024-05-06 13:30:45',
+    '2024-05-06 25:00', '2024-05-06 13:30:',
+    '15-01-2024', '01-02-2023', '31-12-2024', '31-02-2024', '05-13-2024', '13-13-2024',
+    '15/01/2024', '01/02/2023', '05/13/2024', '00/01/2024',
+    '15-01/2024', ' 2024-01-15', '2024-01-15 ', '1-2-2024', '15 Januari 2024',
+    '5 Jan 2024', 'Jan 5 2024', '2024/01/15', 'invalid', '１５-01-2024', '2024-1_-15',
+]
+
+
+class FastDateParserTests(unittest.TestCase):
+    """Fast path and cache are drop-in replacements for the dateutil parser"""
+
+    def test_matches_dateutil_for_all_samples(self):
+        parse_date.cache_clear()
+        for sample in SAMPLES:
+            with self.subTest(sample=sample):
+                self.assertEqual(parse_date(sample), _parse_date_dateutil(sample))
+
+    def test_fast_path_covers_stored_formats(self):
+        self.assertEqual(_parse_date_fast('2024-01-15'), datetime(2024, 1, 15))
+        self.assertEqual(_parse_date_fast('2024-01-15 09:30'), datetime(2024, 1, 15, 9, 30))
+        self.assertEqual(_parse_date_fast('15-01-2024'), datetime(2024, 1, 15))
+        self.assertEqual(_parse_date_fast('01/02/2023'), datetime(2023, 2, 1))
+        self.assertIsNone(_parse_date_fast('15 Januari 2024'))
+
+    def test_non_string_values(self):
+        self.assertIsNone(parse_date(None))
+        self.assertIsNone(parse_date(''))
+        self.assertIsNone(parse_date(20240115))
+        self.assertEqual(parse_date(date(2024, 1, 15)), datetime(2024, 1, 15))
+        self.assertEqual(parse_date(datetime(2024, 1, 15, 8)), datetime(2024, 1, 15, 8))
+
+    def test_results_are_cached(self):
+        parse_date.cache_clear()
+        parse_date('2024-01-15')
+        parse_date('2024-01-15')
+        self.assertEqual(parse_date.cache_info().hits, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests for the materialized per-stage deadline columns and the overdue SQL predicate.
+"""
+import unittest
+from datetime import date, datetime, timedelta
+from app import app, db, check_overdue
+from deadlines import evaluate_cases
+from models import Case
+from scripts.backfill_deadlines import backfill_deadlines
+
+
+class StageDeadlineTests(unittest.TestCase):
+    """<stage>_deadline follows the stage date and kategori_umur"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.created = []
+
+    def tearDown(self):
+        db.session.rollback()
+        for case in self.created:
+            case = db.session.get(Case, case.id)
+            if case:
+                db.session.delete(case)
+        db.session.commit()
+        self.ctx.pop()
+
+    def _create(self, **kwargs):
+        case = Case(**kwargs)
+        db.session.add(case)
+        db.session.commit()
+        self.created.append(case)
+        return case
+
+    def _login(self):
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def test_deadlines_computed_on_create(self):
+        case = self._create(nama_tersangka='Deadline Ctor', spdp_tgl_terima='2024-01-01',
+                            p21='2024-01-10 09:00')
+        self.assertEqual(case.spdp_deadline, date(2024, 1, 25))
+        self.assertEqual(case.p21_deadline, date(2024, 1, 21))
+        self.assertIsNone(case.tahap_2_deadline)
+
+    def test_kategori_anak_uses_anak_limits(self):
+        case = self._create(nama_tersangka='Deadline Anak', kategori_umur='Anak', berkas_tahap_1='2024-01-01')
+        self.assertEqual(case.berkas_tahap_1_deadline, date(2024, 1, 3))
+
+    def test_update_cell_recomputes_deadlines(self):
+        case = self._create(nama_tersangka='Deadline Update', berkas_tahap_1='2024-01-01')
+        self.assertEqual(case.berkas_tahap_1_deadline, date(2024, 1, 6))
+        self._login()
+
+        self.client.post('/update_cell', json={'id': case.id, 'field': 'kategori_umur', 'value': 'Anak'})
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Case, case.id).berkas_tahap_1_deadline, date(2024, 1, 3))
+
+        self.client.post('/update_cell', json={'id': case.id, 'field': 'berkas_tahap_1', 'value': '2024-02-01'})
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Case, case.id).berkas_tahap_1_deadline, date(2024, 2, 3))
+
+        self.client.post('/update_cell', json={'id': case.id, 'field': 'berkas_tahap_1', 'value': ''})
+        db.session.expire_all()
+        self.assertIsNone(db.session.get(Case, case.id).berkas_tahap_1_deadline)
+
+    def test_overdue_predicate_matches_check_overdue(self):
+        today = datetime.now()
+        overdue = self._create(nama_tersangka='Predicate Late',
+                               p21=(today - timedelta(days=20)).strftime('%Y-%m-%d'))
+        on_time = self._create(nama_tersangka='Predicate On Time',
+                               p21=(today - timedelta(days=11)).strftime('%Y-%m-%d'))
+        ids = [overdue.id, on_time.id]
+
+        late_ids = {row.id for row in Case.query.filter(Case.id.in_(ids), Case.overdue_at('p21'))}
+
+        self.assertEqual(late_ids, {overdue.id})
+        self.assertEqual(check_overdue(overdue.p21, 'p21'), 'overdue-cell')
+        self.assertEqual(check_overdue(on_time.p21, 'p21'), '')
+
+    def test_overdue_predicate_skips_complete_cases(self):
+        old = (datetime.now() - timedelta(days=60)).strftime('%Y-%m-%d')
+        complete = self._create(nama_tersangka='Predicate Complete', spdp_tgl_terima=old,
+                                berkas_tahap_1=old, p18_p19=old, p21=old, tahap_2=old)
+        self.assertEqual(Case.query.filter(Case.id == complete.id, Case.overdue_at('spdp')).count(), 0)
+
+    def test_backfill_deadlines_fills_missing_values(self):
+        case = self._create(nama_tersangka='Deadline Backfill', tahap_2='2024-03-01')
+        db.session.execute(db.update(Case).where(Case.id == case.id).values(tahap_2_deadline=None))
+        db.session.commit()
+
+        backfill_deadlines(chunk_size=2, verbose=False)
+
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Case, case.id).tahap_2_deadline, date(2024, 3, 7))
+
+    def test_evaluate_cases_matches_per_cell_filter(self):
+        today = datetime.now()
+        late = (today - timedelta(days=30)).strftime('%Y-%m-%d')
+        recent = (today - timedelta(days=2)).strftime('%Y-%m-%d')
+        open_case = self._create(nama_tersangka='Batch Open', spdp_tgl_terima=late, berkas_tahap_1=recent)
+        anak = self._create(nama_tersangka='Batch Anak', kategori_umur='Anak', berkas_tahap_1=late)
+        complete = self._create(nama_tersangka='Batch Complete', spdp_tgl_terima=late, berkas_tahap_1=late,
+                                p18_p19=late, p21=late, tahap_2=late)
+        # Legacy row without materialized deadlines still gets evaluated
+        legacy = self._create(nama_tersangka='Batch Legacy', p21=late)
+        db.session.execute(db.update(Case).where(Case.id == legacy.id).values(p21_dt=None, p21_deadline=None))
+        db.session.commit()
+        db.session.expire_all()
+        cases = [db.session.get(Case, c.id) for c in (open_case, anak, complete, legacy)]
+
+        statuses = evaluate_cases(cases)
+
+        for case in cases:
+            for stage, field in (('spdp', 'spdp_tgl_terima'), ('berkas_tahap_1', 'berkas_tahap_1'),
+                                 ('p18_p19', 'p18_p19'), ('p21', 'p21'), ('tahap_2', 'tahap_2')):
+                expected = 'text-success-bold' if case.is_complete else \
+                    check_overdue(getattr(case, field), stage, case.kategori_umur or 'Dewasa')
+                self.assertEqual(statuses[case.id].css[stage], expected, (case.nama_tersangka, stage))
+        self.assertTrue(statuses[complete.id].complete)
+        self.assertEqual(statuses[open_case.id].days_left['berkas_tahap_1'], 3)
+        self.assertIsNone(statuses[open_case.id].days_left['p21'])
+
+    def test_dashboard_renders_overdue_class(self):
+        case = self._create(nama_tersangka='Batch Dashboard',
+                            p21=(datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
+        self._login()
+        response = self.client.get('/dashboard?per_page=100')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response.data, rb'date-cell overdue-cell"\s+data-id="%d"\s+data-field="p21"' % case.id)
+
+
+if __name__ == '__main__':
+    unittest.main()
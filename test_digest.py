@@ -0,0 +1,132 @@
+"""
+Tests for the deadline digest: incremental alert refresh, grouping per JPU, delivery once a day.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+from sqlalchemy import select, delete
+from app import app, db
+from models import Case, DeadlineAlert, DigestState
+from digest import refresh_alerts, collect_digest, run_digest, FileSink, SmtpSink
+
+JPU = 'JPU Digest'
+
+
+def received(days_ago):
+    """spdp_tgl_terima so that the SPDP deadline (25 days, Dewasa) is `24 - days_ago` days from today"""
+    return (date.today() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+
+class DigestTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.today = date.today()
+        db.session.execute(delete(DeadlineAlert))
+        db.session.execute(delete(DigestState))
+        self.due = Case(nama_tersangka='Due Soon', jpu=JPU, spdp_tgl_terima=received(22))
+        self.today_case = Case(nama_tersangka='Due Today', jpu=JPU, spdp_tgl_terima=received(24))
+        self.later = Case(nama_tersangka='Later', jpu=JPU, spdp_tgl_terima=received(20))
+        self.overdue = Case(nama_tersangka='Overdue', jpu=JPU, spdp_tgl_terima=received(30))
+        self.other = Case(nama_tersangka='Other JPU', jpu='JPU Digest Lain', spdp_tgl_terima=received(23))
+        self.cases = [self.due, self.today_case, self.later, self.overdue, self.other]
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        db.session.rollback()
+        for case in self.cases:
+            if db.session.get(Case, case.id) is not None:
+                db.session.delete(case)
+        db.session.execute(delete(DeadlineAlert))
+        db.session.execute(delete(DigestState))
+        db.session.commit()
+        self.ctx.pop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def names(self, today=None, jpu=JPU):
+        groups = {group['jpu']: group for group in collect_digest(today or self.today)}
+        return [item['nama_tersangka'] for item in groups.get(jpu, {'items': []})['items']]
+
+    def alerts(self):
+        return set(db.session.execute(select(DeadlineAlert.case_id, DeadlineAlert.stage, DeadlineAlert.deadline)).all())
+
+    def test_full_refresh_groups_due_cases_per_jpu(self):
+        self.assertEqual(refresh_alerts(self.today, days=3)['mode'], 'full')
+        self.assertEqual(self.names(), ['Due Today', 'Due Soon'])
+        self.assertEqual(self.names(jpu='JPU Digest Lain'), ['Other JPU'])
+        item = collect_digest(self.today)[0]['items'][0]
+        self.assertEqual((item['stage'], item['days_left']), ('spdp', 0))
+
+    def test_incremental_refresh_matches_full_rebuild(self):
+        refresh_alerts(self.today, days=3)
+
+        self.later.spdp_tgl_terima = received(21)       # now due in 3 days
+        self.due.spdp_tgl_terima = received(10)         # deadline moved out of the window
+        db.session.commit()
+        db.session.delete(self.other)
+        db.session.commit()
+
+        report = refresh_alerts(self.today, days=3)
+        self.assertEqual(report['mode'], 'incremental')
+        self.assertEqual(self.names(), ['Due Today', 'Later'])
+        self.assertEqual(self.names(jpu='JPU Digest Lain'), [])
+        incremental = self.alerts()
+
+        db.session.execute(delete(DigestState))
+        db.session.commit()
+        refresh_alerts(self.today, days=3)
+        self.assertEqual(incremental, self.alerts())
+
+    def test_date_boundary_moves_without_changes(self):
+        refresh_alerts(self.today, days=3)
+        tomorrow = self.today + timedelta(days=1)
+        report = refresh_alerts(tomorrow, days=3)
+        self.assertEqual(report['mode'], 'incremental')
+        # Due Today is now in the past; Later (due in 4 days) entered the window
+        self.assertEqual(self.names(tomorrow), ['Due Soon', 'Later'])
+
+    def test_run_digest_sends_once_per_day(self):
+        sink = FileSink(self.tmpdir)
+        report = run_digest(sink, self.today, days=3)
+        self.assertGreaterEqual(report['cases'], 3)
+        with open(report['delivered_to'], encoding='utf-8') as f:
+            content = f.read()
+        self.assertIn(f'JPU: {JPU} (2)', content)
+        self.assertIn('Due Today', content)
+
+        self.assertIsNone(run_digest(sink, self.today, days=3))
+        self.assertIsNotNone(run_digest(sink, self.today, days=3, force=True))
+
+    def test_failed_delivery_is_retried(self):
+        class BrokenSink:
+            def send(self, subject, body, today):
+                raise OSError('connection refused')
+        with self.assertRaises(OSError):
+            run_digest(BrokenSink(), self.today, days=3)
+        self.assertIsNotNone(run_digest(FileSink(self.tmpdir), self.today, days=3))
+
+    def test_smtp_sink(self):
+        with mock.patch('smtplib.SMTP') as smtp:
+            sink = SmtpSink('smtp.example.com', 587, 'user', 'secret', 'from@example.com',
+                            ['a@example.com', 'b@example.com'])
+            self.assertEqual(sink.send('Subject', 'Body', self.today), 'a@example.com, b@example.com')
+        session = smtp.return_value.__enter__.return_value
+        session.starttls.assert_called_once()
+        session.login.assert_called_once_with('user', 'secret')
+        message = session.send_message.call_args[0][0]
+        self.assertEqual(message['To'], 'a@example.com, b@example.com')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+"""
+Tests for the deployment-aware SQLAlchemy engine options.
+"""
+import os
+import unittest
+from unittest import mock
+from sqlalchemy.pool import NullPool
+from app import get_deployment_mode, get_engine_options
+
+PG_URL = 'postgresql://user:pw@localhost:5432/db'
+
+
+class EngineOptionsTests(unittest.TestCase):
+
+    def test_mode_detection(self):
+        with mock.patch.dict(os.environ, {'VERCEL': '1'}, clear=True):
+            self.assertEqual(get_deployment_mode(), 'serverless')
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(get_deployment_mode(), 'server')
+        with mock.patch.dict(os.environ, {'VERCEL': '1', 'DEPLOYMENT_MODE': 'desktop'}, clear=True):
+            self.assertEqual(get_deployment_mode(), 'desktop')
+
+    def test_serverless_uses_null_pool(self):
+        self.assertEqual(get_engine_options(PG_URL, 'serverless'), {'poolclass': NullPool})
+
+    def test_long_running_modes_use_bounded_pool(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            server = get_engine_options(PG_URL, 'server')
+            desktop = get_engine_options(PG_URL, 'desktop')
+        self.assertNotIn('poolclass', server)
+        self.assertTrue(server['pool_pre_ping'])
+        self.assertEqual(server['pool_recycle'], 300)
+        self.assertGreater(server['pool_size'], desktop['pool_size'])
+
+    def test_sqlite_keeps_default_pool(self):
+        self.assertEqual(get_engine_options('sqlite:///local.db', 'server'), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for the streaming /export endpoint (CSV and XLSX).
+"""
+import csv
+import io
+import unittest
+import zipfile
+from datetime import date, timedelta
+from app import app, db
+from models import Case
+from exporter import EXPORT_COLUMNS, stream_csv, stream_xlsx
+from importer import COLUMN_ALIASES, normalize_header, _text
+
+
+class ExportTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        overdue = (date.today() - timedelta(days=30)).strftime('%Y-%m-%d')
+        self.cases = [
+            Case(nama_tersangka='Export A', jpu='JPU Export', pasal='Pasal <1> & "2"', berkas_tahap_1=overdue),
+            Case(nama_tersangka='Export B', jpu='JPU Export', umur_tersangka=40),
+            Case(nama_tersangka='Export C', jpu='JPU Lain Export'),
+        ]
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.id.in_(self.ids)).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def test_csv_streams_filtered_rows(self):
+        response = self.client.get('/export?jpu=JPU+Export&flags=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True).lstrip('\ufeff'))))
+        self.assertEqual([row['NAMA TERSANGKA'] for row in rows], ['Export B', 'Export A'])
+        self.assertEqual([row['NO'] for row in rows], ['1', '2'])
+        self.assertEqual(rows[1]['PASAL YANG DISANGKAKAN'], 'Pasal <1> & "2"')
+        self.assertEqual(rows[1]['TERLAMBAT BERKAS TAHAP I'], 'Ya')
+        self.assertEqual(rows[0]['TERLAMBAT BERKAS TAHAP I'], '')
+
+    def test_flags_are_optional(self):
+        response = self.client.get('/export?jpu=JPU+Export')
+        header = response.get_data(as_text=True).lstrip('\ufeff').splitlines()[0]
+        self.assertNotIn('TERLAMBAT', header)
+
+    def test_xlsx_is_valid_workbook(self):
+        response = self.client.get('/export?format=xlsx&q=Export')
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+        self.assertIsNone(archive.testzip())
+        self.assertIn('xl/workbook.xml', archive.namelist())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 4)  # header + 3 cases
+        self.assertIn('Pasal &lt;1&gt; &amp; "2"', sheet)
+        self.assertIn('<c><v>40</v></c>', sheet)
+
+    def test_headers_round_trip_through_importer(self):
+        for header, field in EXPORT_COLUMNS:
+            self.assertEqual(COLUMN_ALIASES[normalize_header(header)], field)
+
+    def test_formulas_are_exported_as_text(self):
+        row = [1, '=HYPERLINK("http://x","klik")', '+62 811', '-1+2', '@SUM(A1)', '\tx', 'Pasal 1', -5]
+        text = ''.join(stream_csv(['H'] * len(row), [row])).lstrip('\ufeff')
+        cells = list(csv.reader(io.StringIO(text)))[1]
+        self.assertEqual(cells, ['1', '\'=HYPERLINK("http://x","klik")', "'+62 811", "'-1+2", "'@SUM(A1)", "'\tx",
+                                 'Pasal 1', '-5'])
+
+        # Inline strings are never evaluated: XLSX text stays as typed
+        workbook = b''.join(stream_xlsx(['H'], [['=1+1'], ['-'], [-5]]))
+        sheet = zipfile.ZipFile(io.BytesIO(workbook)).read('xl/worksheets/sheet1.xml')
+        self.assertIn(b'<c t="inlineStr"><is><t xml:space="preserve">=1+1</t></is></c>', sheet)
+        self.assertIn(b'<t xml:space="preserve">-</t>', sheet)
+        self.assertIn(b'<c><v>-5</v></c>', sheet)
+
+        # Re-importing an export gives back the original text
+        self.assertEqual([_text(cell) for cell in cells[1:5]], [row[1], row[2], row[3], row[4]])
+        self.assertEqual(_text("'biasa"), "'biasa")
+
+    def test_rejects_unknown_format(self):
+        self.assertEqual(self.client.get('/export?format=pdf').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+"""
+Tests for the streaming bulk importer (importer.py) using CSV input.
+"""
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+from sqlalchemy import event
+from app import app, db
+from models import Case
+from importer import import_file, reimport_file, iter_records, prepare_chunk, ImportReport
+
+HEADER = 'NAMA TERSANGKA;UMUR;KATEGORI UMUR;PASAL YANG DISANGKAKAN;BERKAS TAHAP I;P-21;KETERANGAN;KOLOM LAIN\n'
+
+
+class ImportTestCase(unittest.TestCase):
+    """Temp file + cleanup of every case named 'Import ...'"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        fd, self.path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Import %')).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+        os.remove(self.path)
+
+
+class ImporterTests(ImportTestCase):
+
+    def write(self, *lines):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(HEADER + ''.join(line + '\n' for line in lines))
+
+    def test_imports_rows_with_derived_columns(self):
+        self.write(
+            'Import A;25;Dewasa;Pasal 1;01-03-2024;;Ket A;x',
+            'Import B;15 tahun;anak;Pasal 2;2024-03-01;2024-03-05;;x',
+        )
+        report = import_file(self.path)
+        self.assertEqual((report.read, report.inserted, report.errors), (2, 2, []))
+
+        a = Case.query.filter_by(nama_tersangka='Import A').one()
+        self.assertEqual(a.umur_tersangka, 25)
+        self.assertEqual(a.berkas_tahap_1, '01-03-2024')
+        self.assertEqual(a.berkas_tahap_1_dt, datetime(2024, 3, 1))
+        self.assertEqual(a.berkas_tahap_1_deadline, date(2024, 3, 6))
+        self.assertEqual(a.p21, '')
+        self.assertIsNotNone(a.uid)
+
+        b = Case.query.filter_by(nama_tersangka='Import B').one()
+        self.assertEqual((b.umur_tersangka, b.kategori_umur), (15, 'Anak'))
+        self.assertEqual(b.berkas_tahap_1_deadline, date(2024, 3, 3))  # Anak: 3 days
+        self.assertEqual(b.p21_deadline, date(2024, 3, 14))
+
+    def test_bad_rows_reported_and_skipped(self):
+        self.write(
+            'Import Ok;30;;Pasal;;;;',
+            'Import Bad Umur;tiga puluh;;Pasal;;;;',
+            ';;;;;;;',
+            'Import Bad Kategori;30;Remaja;Pasal;;;;',
+            'Import Date Text;30;;Pasal;belum ada;;;',
+        )
+        report = import_file(self.path)
+        self.assertEqual(report.inserted, 2)
+        self.assertEqual(report.blank, 1)
+        self.assertEqual([row for row, _ in report.errors], [3, 5])
+        self.assertEqual([row for row, _ in report.date_warnings], [6])
+        text_date = Case.query.filter_by(nama_tersangka='Import Date Text').one()
+        self.assertEqual(text_date.berkas_tahap_1, 'belum ada')
+        self.assertIsNone(text_date.berkas_tahap_1_dt)
+
+    def test_chunks_are_bulk_statements_in_one_transaction(self):
+        self.write(*[f'Import Chunk {i};20;;Pasal;2024-01-0{i % 9 + 1};;;' for i in range(10)])
+        inserts, commits, progress = [], [], []
+        on_execute = lambda conn, cursor, stmt, params, context, executemany: \
+            inserts.append(executemany) if stmt.startswith('INSERT INTO "case"') else None
+        on_commit = lambda conn: commits.append(1)
+        event.listen(db.engine, 'before_cursor_execute', on_execute)
+        event.listen(db.engine, 'commit', on_commit)
+        try:
+            report = import_file(self.path, chunk_size=4, progress=lambda r: progress.append(r.inserted))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', on_execute)
+            event.remove(db.engine, 'commit', on_commit)
+        self.assertEqual(report.inserted, 10)
+        self.assertEqual(inserts, [True, True, True])
+        self.assertEqual(len(commits), 1)
+        self.assertEqual(progress, [4, 8, 10])
+
+    def test_excel_cell_types_normalized(self):
+        report = ImportReport()
+        rows = prepare_chunk([(2, {
+            'nama_tersangka': 'Import Excel', 'umur_tersangka': 17.0,
+            'berkas_tahap_1': datetime(2024, 5, 6), 'p21': datetime(2024, 5, 6, 13, 30),
+        })], report)
+        self.assertEqual(rows[0][1]['umur_tersangka'], 17)
+        self.assertEqual(rows[0][1]['berkas_tahap_1'], '2024-05-06')
+        self.assertEqual(rows[0][1]['p21'], '2024-05-06 13:30')
+        self.assertEqual(rows[0][1]['p21_dt'], datetime(2024, 5, 6, 13, 30))
+
+    def test_unknown_header_rejected(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('foo,bar\n1,2\n')
+        with self.assertRaises(ValueError):
+            list(iter_records(self.path))
+
+
+class ReimportTests(ImportTestCase):
+    """Incremental re-import: match by natural key, write only what changed"""
+
+    def write(self, *lines, header='NAMA TERSANGKA,SPDP,PASAL,BERKAS TAHAP I\n'):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(header + ''.join(line + '\n' for line in lines))
+
+    def count_writes(self, func):
+        writes = []
+        listener = lambda conn, cursor, stmt, *args: \
+            writes.append(stmt.split()[0]) if stmt.startswith(('INSERT', 'UPDATE')) else None
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            return func(), writes
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+    def test_same_file_twice_writes_nothing(self):
+        self.write('Import R1,SPDP/1,Pasal 1,2024-01-01', 'Import R2,SPDP/2,Pasal 2,')
+        first = reimport_file(self.path)
+        self.assertEqual((first.inserted, first.updated), (2, 0))
+
+        second, writes = self.count_writes(lambda: reimport_file(self.path))
+        self.assertEqual((second.inserted, second.updated, second.unchanged), (0, 0, 2))
+        self.assertEqual(writes, [])
+        self.assertEqual(Case.query.filter(Case.nama_tersangka.like('Import R%')).count(), 2)
+
+    def test_changed_and_new_rows(self):
+        self.write('Import R1,SPDP/1,Pasal 1,2024-01-01', 'Import R2,SPDP/2,Pasal 2,')
+        reimport_file(self.path)
+        self.write('import  r1,SPDP/1,Pasal 1,2024-02-01', 'Import R2,SPDP/2,Pasal 2,', 'Import R3,SPDP/3,Pasal 3,')
+        report = reimport_file(self.path)
+        self.assertEqual((report.inserted, report.updated, report.unchanged), (1, 1, 1))
+        r1 = Case.query.filter(Case.spdp == 'SPDP/1', Case.nama_tersangka.like('%r1')).one()
+        self.assertEqual(report.changes, [(2, r1.id, ['nama_tersangka', 'berkas_tahap_1'])])
+        self.assertEqual(r1.berkas_tahap_1_deadline, date(2024, 2, 6))
+
+    def test_dry_run_reports_without_writing(self):
+        self.write('Import R1,SPDP/1,Pasal 1,')
+        reimport_file(self.path)
+        self.write('Import R1,SPDP/1,Pasal Baru,', 'Import R4,SPDP/4,Pasal 4,')
+        report = reimport_file(self.path, dry_run=True)
+        self.assertEqual(report.new_rows, [(3, 'Import R4')])
+        self.assertEqual([fields for _, _, fields in report.changes], [['pasal']])
+        db.session.expire_all()
+        self.assertEqual(Case.query.filter_by(nama_tersangka='Import R1').one().pasal, 'Pasal 1')
+        self.assertIsNone(Case.query.filter_by(nama_tersangka='Import R4').first())
+
+    def test_matches_cases_created_in_the_app(self):
+        case = Case(nama_tersangka='Import Manual', spdp='SPDP/9', pasal='Pasal 9', kategori_umur='Anak')
+        db.session.add(case)
+        db.session.commit()
+        self.write('Import Manual,SPDP/9,Pasal 9,2024-03-01')
+        report = reimport_file(self.path)
+        self.assertEqual((report.inserted, report.updated), (0, 1))
+        db.session.refresh(case)
+        self.assertEqual(case.kategori_umur, 'Anak')  # not in the file: left alone
+        self.assertEqual(case.berkas_tahap_1_deadline, date(2024, 3, 3))  # Anak limits
+
+    def test_changing_the_key_rebuilds_stored_keys(self):
+        from import_data import import_excel
+        self.write('Import K1,SPDP/1,Pasal 1,', 'Import K2,SPDP/2,Pasal 2,')
+        import_excel(self.path, key_fields=('nama_tersangka', 'spdp'))
+        self.write('Import K1,SPDP/1,Pasal 1 baru,', 'Import K2,SPDP/2,Pasal 2,')
+        report = import_excel(self.path, key_fields=('nama_tersangka',))
+        self.assertEqual((report.inserted, report.updated, report.unchanged), (0, 1, 1))
+        self.assertEqual(Case.query.filter(Case.nama_tersangka.like('Import K%')).count(), 2)
+
+        report = import_excel(self.path, key_fields=('nama_tersangka', 'spdp'))
+        self.assertEqual((report.inserted, report.unchanged), (0, 2))
+
+    def test_inline_edit_of_a_key_column_keeps_the_match(self):
+        self.write('Import E,SPDP/7,Pasal 1,')
+        reimport_file(self.path)
+        case = Case.query.filter_by(nama_tersangka='Import E').one()
+        case.spdp = 'SPDP/7-REV'  # corrected on the dashboard
+        db.session.commit()
+
+        self.write('Import E,SPDP/7-REV,Pasal 1,')
+        report = reimport_file(self.path)
+        self.assertEqual(report.inserted, 0)
+        self.assertEqual(Case.query.filter_by(nama_tersangka='Import E').count(), 1)
+
+    def test_duplicate_key_in_file_reported(self):
+        self.write('Import D,SPDP/5,Pasal 1,', 'Import D,SPDP/5,Pasal 2,')
+        report = reimport_file(self.path)
+        self.assertEqual(report.inserted, 1)
+        self.assertEqual([row for row, _ in report.errors], [3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for the Prometheus metrics (metrics.py, /metrics).
+"""
+import re
+import unittest
+from app import app, db
+from models import Case
+from metrics import metrics, Counter, Histogram, BACKGROUND
+
+
+def sample(text, name, **labels):
+    """Value of one sample in the exposition text, None if absent"""
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        match = re.match(r'^(\w+)(\{.*\})? (\S+)$', line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2) or ''))
+        if all(found.get(key) == str(value) for key, value in labels.items()):
+            return float(match.group(3))
+    return None
+
+
+class MetricTypeTests(unittest.TestCase):
+
+    def test_counter_renders_labelled_samples(self):
+        counter = Counter('things_total', 'Things', ('kind',))
+        counter.inc(('a',))
+        counter.inc(('a',), 2)
+        counter.inc(('b"c',))
+        self.assertEqual(counter.samples(), [('things_total', '{kind="a"}', 3), ('things_total', '{kind="b\\"c"}', 1)])
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('latency_seconds', 'Latency', ('endpoint',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value, ('x',))
+        rendered = {name + labels: value for name, labels, value in histogram.samples()}
+        self.assertEqual(rendered['latency_seconds_bucket{endpoint="x",le="0.1"}'], 1)
+        self.assertEqual(rendered['latency_seconds_bucket{endpoint="x",le="1.0"}'], 3)
+        self.assertEqual(rendered['latency_seconds_bucket{endpoint="x",le="+Inf"}'], 4)
+        self.assertEqual(rendered['latency_seconds_count{endpoint="x"}'], 4)
+        self.assertAlmostEqual(rendered['latency_seconds_sum{endpoint="x"}'], 4.25)
+
+
+class MetricsEndpointTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        # No app context pushed here: each request gets its own, and checks out its own connection
+        self.client = self.app.test_client()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        self.app.config['METRICS_TOKEN'] = 'secret'
+        self.scrape_headers = {'Authorization': 'Bearer secret'}
+
+    def tearDown(self):
+        self.app.config['METRICS_TOKEN'] = None
+
+    def test_request_count_latency_sql_and_templates_per_endpoint(self):
+        requests_before = metrics.requests.value(('dashboard', 'GET', '200'))
+        latency_before = metrics.latency.count(('dashboard',))
+        queries_before = metrics.queries.value(('dashboard',))
+
+        self.assertEqual(self.client.get('/dashboard').status_code, 200)
+
+        self.assertEqual(metrics.requests.value(('dashboard', 'GET', '200')), requests_before + 1)
+        self.assertEqual(metrics.latency.count(('dashboard',)), latency_before + 1)
+        self.assertGreater(metrics.queries.value(('dashboard',)), queries_before)
+        self.assertGreater(metrics.sql_seconds.value(('dashboard',)), 0)
+        self.assertGreater(metrics.checkouts.value(('dashboard',)), 0)
+        self.assertGreater(metrics.template_seconds.value(('dashboard',)), 0)
+
+        text = self.client.get('/metrics', headers=self.scrape_headers).get_data(as_text=True)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertGreaterEqual(sample(text, 'http_requests_total', endpoint='dashboard', method='GET', status=200),
+                                requests_before + 1)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', endpoint='dashboard', le='+Inf'),
+                         latency_before + 1)
+        self.assertIsNotNone(sample(text, 'process_info'))
+
+    def test_status_codes_and_unmatched_routes(self):
+        before = metrics.requests.value(('(unmatched)', 'GET', '404'))
+        self.client.get('/no-such-page')
+        self.assertEqual(metrics.requests.value(('(unmatched)', 'GET', '404')), before + 1)
+
+        before = metrics.requests.value(('update_cell', 'POST', '400'))
+        self.client.post('/update_cell', json={})
+        self.assertEqual(metrics.requests.value(('update_cell', 'POST', '400')), before + 1)
+
+    def test_queries_outside_requests_count_as_background(self):
+        before = metrics.queries.value((BACKGROUND,))
+        with self.app.app_context():
+            db.session.query(Case.id).limit(1).all()
+        self.assertEqual(metrics.queries.value((BACKGROUND,)), before + 1)
+
+    def test_token_protects_the_endpoint(self):
+        anonymous = self.app.test_client()
+        self.assertEqual(anonymous.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics').status_code, 401)  # a login session is not enough
+        response = anonymous.get('/metrics', headers=self.scrape_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/plain'))
+
+    def test_endpoint_is_hidden_without_a_token(self):
+        self.app.config['METRICS_TOKEN'] = None
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer '}).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Tests for keyset (cursor) pagination on the dashboard.
+"""
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+from app import app, db
+from models import Case
+from pagination import keyset_paginate, encode_cursor, decode_cursor, case_count, invalidate_case_count
+from cache import TTLCache
+
+
+class KeysetPaginationTests(unittest.TestCase):
+    """Cursor pages walk (created_at, id) newest-first without gaps or repeats"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        base = datetime(2030, 1, 1, 8, 0)
+        # Two rows share a created_at to exercise the id tie-breaker
+        stamps = [base, base + timedelta(hours=1), base + timedelta(hours=1),
+                  base + timedelta(hours=2), base + timedelta(hours=3)]
+        self.cases = [Case(nama_tersangka=f'Keyset {i}', created_at=stamp) for i, stamp in enumerate(stamps)]
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+        self.query = Case.query.filter(Case.id.in_(self.ids))
+        self.expected = [case.id for case in sorted(self.cases, key=lambda c: (c.created_at, c.id), reverse=True)]
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.id.in_(self.ids)).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def test_cursor_round_trip(self):
+        stamp = datetime(2024, 5, 6, 13, 30, 1, 250)
+        self.assertEqual(decode_cursor(encode_cursor(stamp, 42)), (stamp, 42))
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        self.assertIsNone(decode_cursor(None))
+
+    def test_forward_and_backward_pages(self):
+        seen = []
+        page = keyset_paginate(self.query, Case, 2)
+        self.assertFalse(page.has_prev)
+        pages = [page]
+        while True:
+            seen += [case.id for case in page.items]
+            if not page.has_next:
+                break
+            page = keyset_paginate(self.query, Case, 2, after=page.next_cursor)
+            pages.append(page)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+
+        back = keyset_paginate(self.query, Case, 2, before=pages[2].prev_cursor)
+        self.assertEqual([case.id for case in back.items], self.expected[2:4])
+        self.assertTrue(back.has_prev)
+        self.assertTrue(back.has_next)
+
+    def test_dashboard_cursor_mode_renders(self):
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        response = self.client.get('/dashboard?paging=cursor&per_page=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Keyset 4', response.data)
+        self.assertIn(b'Halaman bernomor', response.data)
+
+
+class CaseCountCacheTests(unittest.TestCase):
+    """Pagination totals come from a cache that writes invalidate"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        invalidate_case_count()
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Count Cache%')).delete(synchronize_session=False)
+        db.session.commit()
+        invalidate_case_count()
+        self.ctx.pop()
+
+    def test_count_is_cached_until_invalidated(self):
+        before = case_count()
+        db.session.add(Case(nama_tersangka='Count Cache Direct'))
+        db.session.commit()
+        self.assertEqual(case_count(), before)
+
+        invalidate_case_count()
+        self.assertEqual(case_count(), before + 1)
+
+    def test_add_and_delete_case_invalidate(self):
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        before = case_count()
+
+        self.client.post('/add_case', data={'nama_tersangka': 'Count Cache Add', 'spdp_tgl_terima': '2024-01-01'})
+        self.assertEqual(case_count(), before + 1)
+
+        case = Case.query.filter_by(nama_tersangka='Count Cache Add').first()
+        self.client.delete(f'/delete_case/{case.id}')
+        self.assertEqual(case_count(), before)
+
+    def test_approximate_mode_falls_back_to_exact_on_sqlite(self):
+        if db.engine.dialect.name == 'postgresql':
+            self.skipTest('planner estimate only differs on PostgreSQL')
+        self.assertEqual(case_count('approximate'), case_count('exact'))
+
+    def test_approximate_mode_ignores_unanalyzed_estimate(self):
+        exact = case_count('exact')
+        for estimate, expected in ((-1, exact), (0, exact), (None, exact), (12345, 12345)):
+            invalidate_case_count()
+            with mock.patch('pagination._estimated_case_count', return_value=estimate):
+                self.assertEqual(case_count('approximate'), expected)
+        invalidate_case_count()
+
+    def test_ttl_cache_expires(self):
+        cache = TTLCache(ttl=0)
+        cache.set('key', 1)
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', 2, ttl=60)
+        self.assertEqual(cache.get('key'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
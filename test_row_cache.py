@@ -0,0 +1,103 @@
+"""
+Tests for the dashboard row-fragment cache (row_cache.py) and cache.LRUCache.
+"""
+import unittest
+from datetime import date, timedelta
+from app import app, db
+from models import Case
+from cache import LRUCache
+from row_cache import row_cache, RowCache
+
+
+class DictStore:
+    """Stands in for the shared (redis) store: what one worker writes, another reads"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get_many(self, keys):
+        return {key: self.data[key] for key in keys if key in self.data}
+
+    def set_many(self, mapping):
+        self.data.update(mapping)
+
+
+class RowCacheTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        # SPDP deadline (25 days) falls today
+        received = (date.today() - timedelta(days=24)).strftime('%Y-%m-%d')
+        self.cases = [Case(nama_tersangka=f'Row Cache {i}', spdp_tgl_terima=received) for i in range(3)]
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.id.in_(self.ids)).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def misses_during(self, func):
+        before = row_cache.stats['misses']
+        result = func()
+        return row_cache.stats['misses'] - before, result
+
+    def test_dashboard_renders_only_changed_rows(self):
+        view = lambda: self.client.get('/dashboard?per_page=100')
+        self.misses_during(view)
+        misses, response = self.misses_during(view)
+        self.assertEqual(misses, 0)
+        self.assertIn('Row Cache 0', response.get_data(as_text=True))
+
+        self.client.post('/update_cell', json={'id': self.ids[0], 'field': 'pasal', 'value': 'Pasal Baru'})
+        misses, response = self.misses_during(view)
+        self.assertEqual(misses, 1)
+        self.assertIn('Pasal Baru', response.get_data(as_text=True))
+
+    def test_day_is_part_of_the_key(self):
+        with self.app.test_request_context():
+            today = row_cache.render(self.cases)
+            self.assertNotIn('overdue-cell', today[self.ids[0]])
+            misses, tomorrow = self.misses_during(
+                lambda: row_cache.render(self.cases, date.today() + timedelta(days=1)))
+        self.assertEqual(misses, 3)
+        self.assertIn('overdue-cell', tomorrow[self.ids[0]])
+
+    def test_cached_fragment_matches_fresh_render(self):
+        with self.app.test_request_context():
+            cached = row_cache.render(self.cases)
+            fresh = RowCache().render(self.cases)
+        self.assertEqual(cached, fresh)
+
+    def test_shared_store_is_used_across_workers(self):
+        shared = DictStore()
+        with self.app.test_request_context():
+            RowCache(shared=shared).render(self.cases)
+            other_worker = RowCache(shared=shared)
+            other_worker.render(self.cases)
+        self.assertEqual(other_worker.stats, {'hits': 3, 'misses': 0})
+
+
+class LRUCacheTests(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(maxsize=2)
+        lru.set_many({'a': 1, 'b': 2})
+        lru.get_many(['a'])
+        lru.set_many({'c': 3})
+        self.assertEqual(lru.get_many(['a', 'b', 'c']), {'a': 1, 'c': 3})
+        self.assertEqual(len(lru), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Tests for partial row refresh: edit endpoints return the re-rendered dashboard <tr>.
+"""
+import unittest
+from datetime import date, timedelta
+from app import app, db
+from models import Case
+
+
+class RowRefreshTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.cases = [Case(nama_tersangka=f'Row Refresh {i}') for i in range(2)]
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.id.in_(self.ids)).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def test_update_cells_renders_requested_rows_only(self):
+        overdue = (date.today() - timedelta(days=30)).strftime('%Y-%m-%d')
+        response = self.client.post('/update_cells', json={
+            'edits': [
+                {'id': self.ids[0], 'field': 'berkas_tahap_1', 'value': overdue},
+                {'id': self.ids[1], 'field': 'pasal', 'value': 'Pasal 2'},
+            ],
+            'render': [self.ids[0]],
+        })
+        data = response.get_json()
+        self.assertTrue(data['success'])
+        self.assertEqual(list(data['rows']), [str(self.ids[0])])
+        html = data['rows'][str(self.ids[0])]
+        self.assertIn(f'data-case-id="{self.ids[0]}"', html)
+        self.assertIn('overdue-cell', html)
+        self.assertTrue(html.lstrip().startswith('<tr'))
+
+    def test_update_cells_without_render_returns_no_rows(self):
+        response = self.client.post('/update_cells', json={'edits': [
+            {'id': self.ids[0], 'field': 'pasal', 'value': 'Pasal 1'},
+        ]})
+        self.assertNotIn('rows', response.get_json())
+
+    def test_update_cell_row_html(self):
+        response = self.client.post('/update_cell', json={
+            'id': self.ids[1], 'field': 'nama_tersangka', 'value': 'Renamed', 'render': True,
+        })
+        data = response.get_json()
+        self.assertTrue(data['success'])
+        self.assertIn('Renamed', data['row_html'])
+        self.assertIn(f'data-case-id="{self.ids[1]}"', data['row_html'])
+
+    def test_dashboard_rows_keep_numbering(self):
+        response = self.client.get('/dashboard?per_page=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response.get_data(as_text=True), r'<tr data-case-id="\d+">\s*<td>1</td>')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for indexed case search (SQLite FTS5 path).
+"""
+import unittest
+from sqlalchemy import text
+from app import app, db
+from models import Case
+from search import search_cases, ensure_search_index, _search_fallback
+
+
+class SearchTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        ensure_search_index()
+        self.cases = [
+            Case(nama_tersangka='Bambang Sucipto', pasal='Pasal 362 KUHP', jpu='Siti Rahmawati'),
+            Case(nama_tersangka='Joko Bambang', pasal='Pasal 378 KUHP', jpu='Andi',
+                 keterangan='penipuan online'),
+            Case(nama_tersangka='Rudi Hartono', pasal='UU ITE', jpu='Siti Rahmawati'),
+        ]
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.id.in_(self.ids)).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def names(self, query, **kwargs):
+        return [case.nama_tersangka for case, _ in search_cases(query, **kwargs)['items']]
+
+    def test_name_hits_rank_above_other_fields(self):
+        self.assertEqual(self.names('bambang')[:2], ['Bambang Sucipto', 'Joko Bambang'])
+
+    def test_prefix_and_multiple_words(self):
+        self.assertEqual(self.names('rahma siti'), ['Rudi Hartono', 'Bambang Sucipto'])
+        self.assertEqual(self.names('penip'), ['Joko Bambang'])
+
+    def test_typo_tolerant(self):
+        result = search_cases('bambnag')
+        self.assertTrue(result['fuzzy'])
+        self.assertIn('Bambang Sucipto', [case.nama_tersangka for case, _ in result['items']])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.cases[2].nama_tersangka = 'Rudi Gunawan'
+        db.session.commit()
+        self.assertEqual(self.names('gunawan'), ['Rudi Gunawan'])
+        self.assertEqual(self.names('hartono'), [])
+        db.session.delete(self.cases[2])
+        db.session.commit()
+        self.assertEqual(self.names('gunawan'), [])
+
+    def test_uses_fts_index(self):
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT rowid FROM case_fts WHERE case_fts MATCH 'bambang'")).all()
+        self.assertIn('VIRTUAL TABLE INDEX', ' '.join(str(row[-1]) for row in plan))
+
+    def test_pagination(self):
+        first = search_cases('kuhp', page=1, per_page=1)
+        second = search_cases('kuhp', page=2, per_page=1)
+        self.assertTrue(first['has_next'])
+        self.assertFalse(second['has_next'])
+        self.assertNotEqual(first['items'][0][0].id, second['items'][0][0].id)
+
+    def test_fallback_treats_like_wildcards_literally(self):
+        self.cases += [Case(nama_tersangka='Wild a_b'), Case(nama_tersangka='Wild axb'), Case(nama_tersangka='Wild 50%')]
+        db.session.add_all(self.cases[3:])
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+
+        def names(words):
+            rows, _ = _search_fallback(words, 10, 0)
+            return {db.session.get(Case, row.id).nama_tersangka for row in rows}
+
+        self.assertEqual(names(['a_b']), {'Wild a_b'})
+        self.assertEqual(names(['50%']), {'Wild 50%'})
+        self.assertEqual(names(['%']), {'Wild 50%'})
+
+    def test_endpoints(self):
+        page = self.client.get('/search?q=bambang')
+        self.assertEqual(page.status_code, 200)
+        self.assertIn('Joko Bambang', page.get_data(as_text=True))
+        data = self.client.get('/api/search?q=siti').get_json()
+        self.assertEqual({item['id'] for item in data['items']} & set(self.ids), {self.ids[0], self.ids[2]})
+
+
+if __name__ == '__main__':
+    unittest.main()
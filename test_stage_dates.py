@@ -0,0 +1,100 @@
+"""
+Tests for the typed stage date columns (<field>_dt) and the legacy string backfill.
+"""
+import unittest
+from datetime import datetime
+from app import app, db
+from models import Case
+from scripts.backfill_stage_dates import backfill_stage_dates
+
+
+class StageDateColumnTests(unittest.TestCase):
+    """Typed stage dates stay in sync with the legacy string columns"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.created = []
+
+    def tearDown(self):
+        db.session.rollback()
+        for case in self.created:
+            case = db.session.get(Case, case.id)
+            if case:
+                db.session.delete(case)
+        db.session.commit()
+        self.ctx.pop()
+
+    def _create(self, **kwargs):
+        case = Case(**kwargs)
+        db.session.add(case)
+        db.session.commit()
+        self.created.append(case)
+        return case
+
+    def _login(self):
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def test_constructor_sets_typed_dates(self):
+        case = self._create(nama_tersangka='Typed Ctor', spdp_tgl_terima='2024-01-15',
+                            p21='20-02-2024', tahap_2='bukan tanggal')
+        self.assertEqual(case.spdp_tgl_terima_dt, datetime(2024, 1, 15))
+        self.assertEqual(case.p21_dt, datetime(2024, 2, 20))
+        self.assertIsNone(case.tahap_2_dt)
+        self.assertIsNone(case.berkas_tahap_1_dt)
+
+    def test_add_case_sets_typed_dates(self):
+        self._login()
+        self.client.post('/add_case', data={
+            'nama_tersangka': 'Typed Add Case',
+            'spdp_tgl_terima': '2024-03-01',
+            'spdp_tgl_polisi': '2024-02-28',
+        })
+        case = Case.query.filter_by(nama_tersangka='Typed Add Case').first()
+        self.created.append(case)
+        self.assertEqual(case.spdp_tgl_terima_dt, datetime(2024, 3, 1))
+        self.assertEqual(case.spdp_tgl_polisi_dt, datetime(2024, 2, 28))
+
+    def test_update_cell_keeps_typed_date_in_sync(self):
+        case = self._create(nama_tersangka='Typed Update', berkas_tahap_1='2024-01-01')
+        self._login()
+
+        response = self.client.post('/update_cell', json={
+            'id': case.id, 'field': 'berkas_tahap_1', 'value': '2024-05-06 13:30'
+        })
+        self.assertTrue(response.get_json()['success'])
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Case, case.id).berkas_tahap_1_dt, datetime(2024, 5, 6, 13, 30))
+
+        self.client.post('/update_cell', json={'id': case.id, 'field': 'berkas_tahap_1', 'value': ''})
+        db.session.expire_all()
+        self.assertIsNone(db.session.get(Case, case.id).berkas_tahap_1_dt)
+
+    def test_backfill_parses_legacy_strings_and_reports_failures(self):
+        good = self._create(nama_tersangka='Backfill Good', p18_p19='03/04/2024', limpah_pn='2024-06-01')
+        bad = self._create(nama_tersangka='Backfill Bad', p21='tanggal rusak')
+        # Simulate rows written before the typed columns existed
+        db.session.execute(
+            db.update(Case).where(Case.id.in_([good.id, bad.id]))
+            .values(p18_p19_dt=None, limpah_pn_dt=None, p21_dt=None)
+        )
+        db.session.commit()
+
+        updated, unparseable = backfill_stage_dates(chunk_size=1, verbose=False)
+
+        self.assertGreaterEqual(updated, 1)
+        self.assertIn((bad.id, 'p21', 'tanggal rusak'), unparseable)
+        db.session.expire_all()
+        refreshed = db.session.get(Case, good.id)
+        self.assertEqual(refreshed.p18_p19_dt, datetime(2024, 4, 3))
+        self.assertEqual(refreshed.limpah_pn_dt, datetime(2024, 6, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
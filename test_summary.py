@@ -0,0 +1,92 @@
+"""
+Tests for the per-JPU summary (single GROUP BY query + TTL cache).
+"""
+import unittest
+from datetime import date, timedelta
+from sqlalchemy import event
+from app import app, db
+from models import Case
+from summary import compute_summary, get_summary, invalidate_summary
+
+
+class SummaryTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        today = date.today()
+        old = (today - timedelta(days=40)).strftime('%Y-%m-%d')
+        recent = today.strftime('%Y-%m-%d')
+        self.cases = [
+            # Completed
+            Case(nama_tersangka='Sum 1', jpu='JPU Summary', spdp_tgl_terima=old, berkas_tahap_1=old,
+                 p18_p19=old, p21=old, tahap_2=old),
+            # Open, at berkas_tahap_1, overdue for spdp and berkas_tahap_1
+            Case(nama_tersangka='Sum 2', jpu='JPU Summary', spdp_tgl_terima=old, berkas_tahap_1=old),
+            # Open, at spdp, not overdue
+            Case(nama_tersangka='Sum 3', jpu='JPU Summary', spdp_tgl_terima=recent),
+            # Anak, open, at spdp, overdue
+            Case(nama_tersangka='Sum 4', jpu='JPU Summary', kategori_umur='Anak', spdp_tgl_terima=old),
+        ]
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+        invalidate_summary()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.id.in_(self.ids)).delete(synchronize_session=False)
+        db.session.commit()
+        invalidate_summary()
+        self.ctx.pop()
+
+    def rows(self, summary):
+        return {row['kategori_umur']: row for row in summary['rows'] if row['jpu'] == 'JPU Summary'}
+
+    def test_counts_per_jpu_and_kategori(self):
+        rows = self.rows(compute_summary())
+        dewasa, anak = rows['Dewasa'], rows['Anak']
+        self.assertEqual((dewasa['total'], dewasa['completed'], dewasa['open'], dewasa['overdue']), (3, 1, 2, 1))
+        self.assertEqual((dewasa['at_spdp'], dewasa['at_berkas_tahap_1']), (1, 1))
+        self.assertEqual((dewasa['overdue_spdp'], dewasa['overdue_berkas_tahap_1']), (1, 1))
+        self.assertEqual((anak['total'], anak['overdue'], anak['at_spdp']), (1, 1, 1))
+
+        jpu = next(entry for entry in compute_summary()['jpus'] if entry['jpu'] == 'JPU Summary')
+        self.assertEqual((jpu['total'], jpu['overdue']), (4, 2))
+        self.assertEqual(len(jpu['kategori']), 2)
+
+    def test_single_query(self):
+        statements = []
+        listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            compute_summary()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('GROUP BY', statements[0])
+
+    def test_cached_until_a_case_is_written(self):
+        first = get_summary()
+        self.assertIs(get_summary(), first)
+        self.cases[2].tahap_2 = date.today().strftime('%Y-%m-%d')
+        db.session.commit()
+        self.assertIsNot(get_summary(), first)
+
+    def test_pages(self):
+        page = self.client.get('/summary')
+        self.assertEqual(page.status_code, 200)
+        self.assertIn('JPU Summary', page.get_data(as_text=True))
+        data = self.client.get('/api/summary').get_json()
+        self.assertTrue(any(row['jpu'] == 'JPU Summary' for row in data['rows']))
+
+
+if __name__ == '__main__':
+    unittest.main()
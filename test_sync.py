@@ -0,0 +1,163 @@
+"""
+Tests for the desktop offline replica sync (push/pull, tombstones, conflicts).
+
+Two temporary SQLite files stand in for the local replica and the central database.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Case, CaseTombstone, User
+from sync import ReplicaSync, enable_change_tracking, outbox
+
+case_table = Case.__table__
+
+
+class ReplicaSyncTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.local = create_engine(f"sqlite:///{os.path.join(self.tmpdir, 'replica.db')}")
+        self.remote = create_engine(f"sqlite:///{os.path.join(self.tmpdir, 'central.db')}")
+        db.metadata.create_all(self.local)
+        db.metadata.create_all(self.remote)
+        enable_change_tracking(self.local)
+        self.sync = ReplicaSync(self.local, self.remote)
+
+    def tearDown(self):
+        self.local.dispose()
+        self.remote.dispose()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _remote_cases(self):
+        with Session(self.remote) as session:
+            return {case.uid: case for case in session.scalars(select(Case))}
+
+    def _local_users(self):
+        with self.local.connect() as conn:
+            return dict(conn.execute(select(User.username, User.password_hash)).all())
+
+    def _local_cases(self):
+        with Session(self.local) as session:
+            return {case.uid: case for case in session.scalars(select(Case))}
+
+    def test_local_edits_are_queued_and_pushed(self):
+        with Session(self.local) as session:
+            case = Case(nama_tersangka='Offline Baru', p21='2024-01-10')
+            session.add(case)
+            session.commit()
+            uid = case.uid
+        with self.local.connect() as conn:
+            self.assertEqual(conn.execute(select(outbox.c.op)).scalars().all(), ['upsert'])
+
+        self.sync.run_once()
+
+        remote = self._remote_cases()
+        self.assertEqual(remote[uid].nama_tersangka, 'Offline Baru')
+        self.assertEqual(remote[uid].p21_dt, datetime(2024, 1, 10))
+        with self.local.connect() as conn:
+            self.assertEqual(conn.execute(select(outbox)).all(), [])
+
+    def test_remote_changes_users_and_legacy_rows_are_pulled(self):
+        with Session(self.remote) as session:
+            session.add(User(username='jaksa', password_hash='hash'))
+            session.add(Case(nama_tersangka='Dari Pusat', kategori_umur='Anak', berkas_tahap_1='2024-01-01'))
+            session.commit()
+        with self.remote.begin() as conn:
+            # Row created before uid / derived columns existed
+            conn.execute(case_table.insert().values(nama_tersangka='Legacy', p21='2024-02-01'))
+
+        self.sync.run_once()
+
+        local = {case.nama_tersangka: case for case in self._local_cases().values()}
+        self.assertEqual(local['Dari Pusat'].berkas_tahap_1_deadline.isoformat(), '2024-01-03')
+        self.assertEqual(local['Legacy'].p21_deadline.isoformat(), '2024-02-12')
+        self.assertIsNotNone(local['Legacy'].uid)
+        with Session(self.local) as session:
+            self.assertIsNotNone(session.scalars(select(User).filter_by(username='jaksa')).first())
+        with self.local.connect() as conn:
+            self.assertEqual(conn.execute(select(outbox)).all(), [])
+
+    def test_users_mirror_central_including_removals(self):
+        with Session(self.remote) as session:
+            session.add_all([User(username='jaksa', password_hash='hash'), User(username='staf', password_hash='hash')])
+            session.commit()
+        with Session(self.local) as session:
+            session.add(User(username='admin', password_hash='seeded'))
+            session.commit()
+        invalidations = []
+        self.sync.on_users_changed = lambda: invalidations.append(1)
+        self.sync.run_once()
+        self.assertEqual(self._local_users(), {'jaksa': 'hash', 'staf': 'hash'})
+        self.assertEqual(len(invalidations), 1)  # admin removed
+
+        self.sync.run_once()
+        self.assertEqual(len(invalidations), 1)  # nothing changed
+
+        with self.remote.begin() as conn:
+            conn.execute(update(User.__table__).where(User.__table__.c.username == 'jaksa').values(password_hash='new'))
+            conn.execute(User.__table__.delete().where(User.__table__.c.username == 'staf'))
+        self.sync.run_once()
+        self.assertEqual(self._local_users(), {'jaksa': 'new'})
+        self.assertEqual(len(invalidations), 2)
+
+    def test_deletes_propagate_both_ways_with_tombstones(self):
+        with Session(self.remote) as session:
+            session.add_all([Case(nama_tersangka='Hapus Lokal'), Case(nama_tersangka='Hapus Pusat')])
+            session.commit()
+        self.sync.run_once()
+        local = {case.nama_tersangka: case.uid for case in self._local_cases().values()}
+
+        with Session(self.local) as session:
+            session.delete(session.scalars(select(Case).filter_by(uid=local['Hapus Lokal'])).one())
+            session.commit()
+        with Session(self.remote) as session:
+            session.delete(session.scalars(select(Case).filter_by(uid=local['Hapus Pusat'])).one())
+            session.commit()
+
+        self.sync.run_once()
+
+        self.assertEqual(self._remote_cases(), {})
+        self.assertEqual(self._local_cases(), {})
+        with Session(self.remote) as session:
+            tombstones = set(session.scalars(select(CaseTombstone.uid)))
+        self.assertEqual(tombstones, set(local.values()))
+
+    def test_conflict_newer_write_wins(self):
+        with Session(self.remote) as session:
+            session.add(Case(nama_tersangka='Konflik', pasal='awal'))
+            session.commit()
+        self.sync.run_once()
+        uid = next(iter(self._local_cases()))
+
+        # Local edit, then a later central edit before the next sync: central wins
+        with Session(self.local) as session:
+            session.scalars(select(Case).filter_by(uid=uid)).one().pasal = 'lokal'
+            session.commit()
+        with self.remote.begin() as conn:
+            conn.execute(update(case_table).where(case_table.c.uid == uid)
+                         .values(pasal='pusat', updated_at=datetime.now() + timedelta(seconds=5)))
+
+        self.sync.run_once()
+
+        self.assertEqual(self._remote_cases()[uid].pasal, 'pusat')
+        self.assertEqual(self._local_cases()[uid].pasal, 'pusat')
+
+    def test_offline_failure_keeps_outbox(self):
+        with Session(self.local) as session:
+            session.add(Case(nama_tersangka='Tetap Antri'))
+            session.commit()
+        self.sync.remote = create_engine(f"sqlite:///{os.path.join(self.tmpdir, 'missing', 'x.db')}")
+
+        with self.assertRaises(Exception):
+            self.sync.run_once()
+        with self.local.connect() as conn:
+            self.assertEqual(len(conn.execute(select(outbox)).all()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+Tests for scripts/sync_schema.py: unique columns added to existing tables get a unique index.
+"""
+import os
+import sys
+import unittest
+import sqlalchemy as sa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from sync_schema import ensure_unique_indexes, DuplicateValuesError
+
+
+def tables():
+    """The same table as an old database has it (no unique) and as the model declares it"""
+    old = sa.Table('item', sa.MetaData(), sa.Column('id', sa.Integer, primary_key=True), sa.Column('uid', sa.String(36)))
+    new = sa.Table('item', sa.MetaData(), sa.Column('id', sa.Integer, primary_key=True),
+                   sa.Column('uid', sa.String(36), unique=True))
+    return old, new
+
+
+class EnsureUniqueIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = sa.create_engine('sqlite://')
+        self.old, self.new = tables()
+        self.old.create(self.engine)
+
+    def test_creates_unique_index_once(self):
+        with self.engine.begin() as conn:
+            conn.execute(self.old.insert(), [{'uid': 'a'}, {'uid': 'b'}, {'uid': None}, {'uid': None}])
+            self.assertEqual(ensure_unique_indexes(conn, sa.inspect(conn), self.new), ['item.uid'])
+        with self.engine.begin() as conn:
+            self.assertEqual(ensure_unique_indexes(conn, sa.inspect(conn), self.new), [])
+            with self.assertRaises(sa.exc.IntegrityError):
+                conn.execute(self.old.insert(), {'uid': 'a'})
+
+    def test_refuses_when_duplicates_exist(self):
+        with self.engine.begin() as conn:
+            conn.execute(self.old.insert(), [{'uid': 'a'}, {'uid': 'a'}, {'uid': 'b'}])
+            with self.assertRaises(DuplicateValuesError) as raised:
+                ensure_unique_indexes(conn, sa.inspect(conn), self.new)
+        self.assertIn("'a' (2x)", str(raised.exception))
+        self.assertEqual([index for index in sa.inspect(self.engine).get_indexes('item') if index['unique']], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
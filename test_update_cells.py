@@ -0,0 +1,115 @@
+"""
+Tests for the batched /update_cells endpoint.
+"""
+import unittest
+from datetime import date
+from sqlalchemy import event
+from app import app, db
+from models import Case
+
+
+class UpdateCellsTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.cases = [Case(nama_tersangka=f'Batch Edit {i}') for i in range(3)]
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.id.in_(self.ids)).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def test_applies_all_edits_in_one_commit(self):
+        commits = []
+        listener = lambda conn: commits.append(1)
+        event.listen(db.engine, 'commit', listener)
+        try:
+            response = self.client.post('/update_cells', json={'edits': [
+                {'id': self.ids[0], 'field': 'pasal', 'value': 'Pasal 1'},
+                {'id': self.ids[0], 'field': 'jpu', 'value': 'JPU A'},
+                {'id': self.ids[1], 'field': 'berkas_tahap_1', 'value': '2024-01-01'},
+                {'id': self.ids[0], 'field': 'pasal', 'value': 'Pasal 2'},  # last edit wins
+            ]})
+        finally:
+            event.remove(db.engine, 'commit', listener)
+
+        data = response.get_json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['updated'], 4)
+        self.assertEqual(len(commits), 1)
+        db.session.expire_all()
+        first, second = db.session.get(Case, self.ids[0]), db.session.get(Case, self.ids[1])
+        self.assertEqual((first.pasal, first.jpu), ('Pasal 2', 'JPU A'))
+        self.assertEqual(second.berkas_tahap_1_deadline, date(2024, 1, 6))
+
+    def test_rejects_whole_batch_with_forbidden_field(self):
+        response = self.client.post('/update_cells', json={'edits': [
+            {'id': self.ids[0], 'field': 'pasal', 'value': 'Tidak tersimpan'},
+            {'id': self.ids[1], 'field': 'created_at', 'value': '2024-01-01'},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['errors'],
+                         [{'index': 1, 'id': self.ids[1], 'field': 'created_at', 'error': 'Field not editable'}])
+        db.session.expire_all()
+        self.assertIsNone(db.session.get(Case, self.ids[0]).pasal)
+
+    def test_invalid_values_are_reported_per_edit(self):
+        response = self.client.post('/update_cells', json={'edits': [
+            {'id': self.ids[0], 'field': 'umur_tersangka', 'value': 'dua puluh'},
+            {'id': self.ids[0], 'field': 'pasal', 'value': 'Tidak tersimpan'},
+            {'id': self.ids[1], 'field': 'kategori_umur', 'value': 'Remaja'},
+            {'id': self.ids[2], 'field': 'jpu', 'value': 'x' * 201},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        errors = response.get_json()['errors']
+        self.assertEqual([(error['index'], error['field']) for error in errors],
+                         [(0, 'umur_tersangka'), (2, 'kategori_umur'), (3, 'jpu')])
+        db.session.expire_all()
+        self.assertIsNone(db.session.get(Case, self.ids[0]).pasal)
+
+    def test_values_are_converted_to_the_column_type(self):
+        response = self.client.post('/update_cells', json={'edits': [
+            {'id': self.ids[0], 'field': 'umur_tersangka', 'value': ' 17 '},
+            {'id': self.ids[0], 'field': 'kategori_umur', 'value': 'anak'},
+            {'id': self.ids[1], 'field': 'umur_tersangka', 'value': ''},
+        ]})
+        self.assertTrue(response.get_json()['success'])
+        db.session.expire_all()
+        first, second = db.session.get(Case, self.ids[0]), db.session.get(Case, self.ids[1])
+        self.assertEqual((first.umur_tersangka, first.kategori_umur), (17, 'Anak'))
+        self.assertIsNone(second.umur_tersangka)
+
+    def test_single_cell_update_validates_value(self):
+        response = self.client.post('/update_cell', json={'id': self.ids[0], 'field': 'umur_tersangka', 'value': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.get_json()['success'])
+
+    def test_invalid_payloads(self):
+        for payload in ({}, {'edits': []}, {'edits': [{'id': 'x', 'field': 'pasal'}]}, {'edits': [{'field': 'pasal'}]}):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.client.post('/update_cells', json=payload).status_code, 400)
+
+    def test_missing_cases_are_reported(self):
+        response = self.client.post('/update_cells', json={'edits': [
+            {'id': self.ids[2], 'field': 'pasal', 'value': 'Ada'},
+            {'id': 999999, 'field': 'pasal', 'value': 'Hilang'},
+        ]})
+        data = response.get_json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['missing'], [999999])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for the cached user loader behind @login_required.
+"""
+import unittest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from app import app, db, load_user, _user_cache
+from models import User, Case
+
+
+class UserCacheTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        _user_cache.clear()
+        self.statements = []
+
+    def tearDown(self):
+        db.session.rollback()
+        User.query.filter_by(username='cache-test').delete()
+        Case.query.filter_by(nama_tersangka='User Cache Case').delete()
+        db.session.commit()
+        self.ctx.pop()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def test_load_user_hits_database_once(self):
+        admin_id = User.query.filter_by(username='admin').first().id
+        db.session.expunge_all()
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+        try:
+            first = load_user(str(admin_id))
+            second = load_user(str(admin_id))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', self._record)
+        self.assertEqual(first.username, 'admin')
+        self.assertIs(first, second)
+        self.assertEqual(len(self.statements), 1)
+
+    def test_password_change_invalidates(self):
+        user = User(username='cache-test', password_hash=generate_password_hash('a', method='scrypt'))
+        db.session.add(user)
+        db.session.commit()
+        cached = load_user(str(user.id))
+
+        user.password_hash = generate_password_hash('b', method='scrypt')
+        db.session.commit()
+
+        self.assertIsNot(load_user(str(user.id)), cached)
+
+    def test_update_cell_does_not_query_users(self):
+        case = Case(nama_tersangka='User Cache Case')
+        db.session.add(case)
+        db.session.commit()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        self.client.get('/dashboard')  # warm the user cache
+        db.session.expunge_all()  # the test shares the request's session; start cold like a real request
+
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+        try:
+            response = self.client.post('/update_cell', json={'id': case.id, 'field': 'pasal', 'value': 'Pasal 1'})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', self._record)
+
+        self.assertTrue(response.get_json()['success'])
+        self.assertFalse([s for s in self.statements if 'FROM user' in s or 'FROM "user"' in s])
+        # Only the case itself: load it, then write it
+        self.assertEqual([s.split()[0] for s in self.statements], ['SELECT', 'UPDATE'])
+
+
+if __name__ == '__main__':
+    unittest.main()
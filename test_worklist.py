@@ -0,0 +1,85 @@
+"""
+Tests for the overdue / due-soon worklist query, page and JSON endpoint.
+"""
+import unittest
+from datetime import datetime, timedelta
+from app import app, db, get_worklist
+from models import Case
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+class WorklistTests(unittest.TestCase):
+    """Worklist only returns open cases that are late or due soon"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        # P-21 limit for Dewasa is 12 days: deadline = date + 11
+        self.late = self._create(nama_tersangka='WL Late', p21=days_ago(20))        # 9 days late
+        self.due_soon = self._create(nama_tersangka='WL Due Soon', p21=days_ago(10))  # due in 1 day
+        self.far = self._create(nama_tersangka='WL Far', p21=days_ago(0))            # due in 11 days
+        self.anak = self._create(nama_tersangka='WL Anak', kategori_umur='Anak', p21=days_ago(10))  # 1 day late
+        self.ids = {self.late.id, self.due_soon.id, self.far.id, self.anak.id}
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.id.in_(self.ids)).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def _create(self, **kwargs):
+        case = Case(**kwargs)
+        db.session.add(case)
+        db.session.commit()
+        return case
+
+    def _ours(self, items):
+        return [(item['case'].id, item['days_left']) for item in items if item['case'].id in self.ids]
+
+    def test_returns_late_and_due_soon_ordered_by_time_remaining(self):
+        items, _ = get_worklist('p21', within_days=3, per_page=100)
+        self.assertEqual(self._ours(items), [(self.late.id, -9), (self.anak.id, -1), (self.due_soon.id, 1)])
+
+    def test_filters_by_kategori_umur(self):
+        items, _ = get_worklist('p21', kategori_umur='Anak', within_days=3, per_page=100)
+        self.assertEqual(self._ours(items), [(self.anak.id, -1)])
+
+    def test_all_stages_returns_one_row_per_stage(self):
+        self.late.berkas_tahap_1 = days_ago(30)
+        db.session.commit()
+        items, _ = get_worklist(within_days=0, per_page=100)
+        stages = {item['stage'] for item in items if item['case'].id == self.late.id}
+        self.assertEqual(stages, {'berkas_tahap_1', 'p21'})
+
+    def test_pagination_has_next(self):
+        first, has_next = get_worklist('p21', kategori_umur='Dewasa', within_days=3, per_page=1)
+        self.assertEqual(len(first), 1)
+        self.assertTrue(has_next)
+
+    def test_json_endpoint_and_page_render(self):
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+        response = self.client.get('/api/worklist?stage=p21&within=3&per_page=100')
+        data = response.get_json()
+        self.assertTrue(data['success'])
+        ids = [item['id'] for item in data['items']]
+        self.assertIn(self.late.id, ids)
+        self.assertNotIn(self.far.id, ids)
+
+        response = self.client.get('/worklist?stage=p21&within=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'WL Late', response.data)
+        self.assertNotIn(b'WL Far', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()